@@ -0,0 +1,142 @@
+"""
+Бенчмарк маршрутов аутентификации: /register, /login, /me и /logout.
+
+Маршруты вызываются внутри процесса через ASGI транспорт httpx.
+Вместо Postgres используется SQLite во временном файле, вместо Redis — LocalConnection.
+"""
+
+import asyncio
+import tempfile
+import time
+import uuid
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+
+import httpx
+from cryptography.fernet import Fernet
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.utils import BenchmarkResult
+from config.settings import settings
+
+BENCHMARK_PASSWORD = "benchmark_password"
+
+
+async def measure(
+    name: str,
+    concurrency: int,
+    requests_count: int,
+    send_request: Callable[[int], Awaitable[httpx.Response]],
+) -> BenchmarkResult:
+    """
+    Выполняет requests_count запросов, не более concurrency одновременно.
+
+    :param send_request: Функция, отправляющая запрос с заданным порядковым номером.
+    """
+    result = BenchmarkResult(name=name, concurrency=concurrency)
+    request_numbers = iter(range(requests_count))
+
+    async def worker() -> None:
+        for number in request_numbers:
+            start = time.perf_counter()
+            response = await send_request(number)
+            result.latencies.append(time.perf_counter() - start)
+            if response.is_error:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def run_auth_benchmark(
+    concurrency_levels: list[int],
+    requests_count: int,
+    bcrypt_rounds: int | None = None,
+) -> list[BenchmarkResult]:
+    """
+    Запуск бенчмарка маршрутов аутентификации для каждого уровня конкурентности.
+
+    :param bcrypt_rounds: Стоимость bcrypt, по умолчанию используется стоимость из passlib.
+    """
+    if not settings.fernet_key:
+        settings.fernet_key = Fernet.generate_key().decode()
+
+    from config.app import server_init
+    from logic.utils.auth_utils import jw_key_cache
+    from logic.utils.auth_utils import token_blacklist
+    from logic.utils.password_utils import pwd_context
+    from managers.repository.local_redis_manager import LocalConnection
+    from models.db.base import Base
+    from models.db.dependencies import get_db
+
+    if bcrypt_rounds is not None:
+        pwd_context.update(bcrypt__rounds=bcrypt_rounds)
+
+    database_dir = tempfile.TemporaryDirectory()
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{database_dir.name}/benchmark.sqlite3",
+        connect_args={"timeout": 60},
+    )
+    async with engine.begin() as connection:
+        await connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        await connection.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+
+    async def get_benchmark_db() -> AsyncIterator[AsyncSession]:
+        async with session_factory() as session:
+            yield session
+
+    app = server_init()
+    app.dependency_overrides[get_db] = get_benchmark_db
+
+    jw_key_cache.connection = token_blacklist.connection = LocalConnection()
+    await jw_key_cache.load()
+
+    results = []
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for concurrency in concurrency_levels:
+            prefix = f"c{concurrency}_{uuid.uuid4().hex[:8]}"
+            tokens: dict[int, str] = {}
+
+            async def register(number: int, prefix: str = prefix) -> httpx.Response:
+                return await client.post(
+                    "/register",
+                    json={
+                        "username": f"{prefix}_{number}",
+                        "email": f"{prefix}_{number}@benchmark.local",
+                        "password": BENCHMARK_PASSWORD,
+                    },
+                )
+
+            async def login(number: int, prefix: str = prefix, tokens: dict = tokens) -> httpx.Response:
+                response = await client.post(
+                    "/login",
+                    json={"email": f"{prefix}_{number}@benchmark.local", "password": BENCHMARK_PASSWORD},
+                )
+                if response.is_success:
+                    tokens[number] = response.json()["access_token"]
+                return response
+
+            async def me(number: int, tokens: dict = tokens) -> httpx.Response:
+                return await client.get("/me", headers={"Authorization": f"Bearer {tokens.get(number, '')}"})
+
+            async def logout(number: int, tokens: dict = tokens) -> httpx.Response:
+                return await client.post("/logout", headers={"Authorization": f"Bearer {tokens.get(number, '')}"})
+
+            for name, send_request in (
+                ("/register", register),
+                ("/login", login),
+                ("/me", me),
+                ("/logout", logout),
+            ):
+                results.append(await measure(name, concurrency, requests_count, send_request))
+
+    await engine.dispose()
+    database_dir.cleanup()
+    return results
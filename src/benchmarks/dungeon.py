@@ -0,0 +1,36 @@
+"""
+Микро-бенчмарк генерации этажей подземелья: генерация новых этажей и чтение из кэша.
+"""
+
+from itertools import count
+
+from benchmarks.serialization import measure
+from benchmarks.utils import BenchmarkResult
+from logic.utils.dungeon_utils import MAX_DIFFICULTY
+from logic.utils.dungeon_utils import generate_dungeon_floor
+from logic.utils.dungeon_utils import get_dungeon_floor
+
+DEPTHS = (1, 10, 20)
+
+
+def run_dungeon_benchmark(iterations: int) -> list[BenchmarkResult]:
+    """
+    Запуск бенчмарка генерации этажей. Количество операций в секунду — количество этажей в секунду.
+    """
+    results = []
+    for depth in DEPTHS:
+        seeds = count()
+        results.append(
+            measure(
+                f"generate depth {depth}",
+                iterations,
+                lambda depth=depth, seeds=seeds: generate_dungeon_floor(next(seeds), depth, MAX_DIFFICULTY // 2),
+            )
+        )
+
+    get_dungeon_floor.cache_clear()
+    seeds = count()
+    results.append(
+        measure("cached", iterations, lambda: get_dungeon_floor(next(seeds) % 16, DEPTHS[0], MAX_DIFFICULTY // 2))
+    )
+    return results
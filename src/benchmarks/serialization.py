@@ -0,0 +1,130 @@
+"""
+Микро-бенчмарк сериализации персонажа: прежние to_json/from_json против доступных сериализаторов.
+"""
+
+import contextlib
+import json
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from json import JSONDecodeError
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from pydantic_core import PydanticSerializationError
+
+from benchmarks.utils import BenchmarkResult
+from logic.utils.json_utils import serializers
+from models.mixins import ExtraEffectsMixin
+from models.repository.extra_effects import BuffsBaseModel
+from models.repository.extra_effects import DebuffsBaseModel
+from models.repository.extra_effects import EffectBaseModel
+from models.repository.player.base import CharacterConfigurationModel
+from models.repository.player.base import CharacterRepositoryModel
+from models.repository.player.base import PlayerConfigurationModel
+from models.repository.player.base import PlayerRepositoryModel
+from models.repository.player.class_ import ClassConfigurationModel
+from models.repository.player.class_ import ClassRepositoryModel
+from models.repository.player.race import RaceConfigurationModel
+from models.repository.player.race import RaceRepositoryModel
+from models.repository.player.skill import SkillConfigurationModel
+from models.repository.player.skill import SkillRepositoryModel
+
+
+def legacy_to_json(data: dict) -> str:
+    """
+    Прежняя реализация to_json.
+    """
+    try:
+        return json.dumps(data)
+    except (TypeError, PydanticSerializationError):
+        correct_data = jsonable_encoder(data)
+        return json.dumps(correct_data)
+
+
+def legacy_from_json(data: str) -> Any:
+    """
+    Прежняя реализация from_json.
+    """
+    if isinstance(data, str):
+        with contextlib.suppress(JSONDecodeError):
+            data = json.loads(data)
+    if not isinstance(data, Iterable) or isinstance(data, str):
+        return data
+
+    if isinstance(data, dict):
+        for key, value in data.items():
+            data[key] = legacy_from_json(value)
+    elif isinstance(data, Iterable):
+        for i, value in enumerate(data):
+            data[i] = legacy_from_json(value)
+
+    return data
+
+
+def build_character(skills_count: int = 6, effects_count: int = 3) -> CharacterRepositoryModel:
+    """
+    Персонаж с классом, расой, скиллами и эффектами, по объему похожий на игровой.
+    """
+
+    def extra_effects() -> ExtraEffectsMixin:
+        return ExtraEffectsMixin(
+            effects=[
+                EffectBaseModel(buffs=[BuffsBaseModel()], debuffs=[DebuffsBaseModel()]) for _ in range(effects_count)
+            ],
+            buffs=[BuffsBaseModel() for _ in range(effects_count)],
+            debuffs=[DebuffsBaseModel() for _ in range(effects_count)],
+        )
+
+    def skills() -> list[SkillRepositoryModel]:
+        return [
+            SkillRepositoryModel(
+                skill_configuration=SkillConfigurationModel(),
+                effects=[EffectBaseModel() for _ in range(effects_count)],
+            )
+            for _ in range(skills_count)
+        ]
+
+    return CharacterRepositoryModel(
+        class_=ClassRepositoryModel(effects=extra_effects(), class_configuration=ClassConfigurationModel()),
+        race=RaceRepositoryModel(effects=extra_effects(), race_configuration=RaceConfigurationModel(), skills=skills()),
+        skills=skills(),
+        player=PlayerRepositoryModel(player_configuration=PlayerConfigurationModel()),
+        character_configuration=CharacterConfigurationModel(),
+    )
+
+
+def measure(name: str, iterations: int, operation: Callable[[], Any]) -> BenchmarkResult:
+    """
+    Замер задержки операции.
+    """
+    result = BenchmarkResult(name=name)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation_start = time.perf_counter()
+        operation()
+        result.latencies.append(time.perf_counter() - operation_start)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def run_serialization_benchmark(iterations: int) -> list[BenchmarkResult]:
+    """
+    Запуск бенчмарка кодирования и декодирования персонажа.
+    """
+    data = build_character().model_dump()
+    legacy_encoded = legacy_to_json(data)
+
+    results = [
+        measure("legacy encode", iterations, lambda: legacy_to_json(data)),
+        measure("legacy decode", iterations, lambda: legacy_from_json(legacy_encoded)),
+    ]
+    for name, serializer in serializers.items():
+        encoded = serializer.dumps(data)
+        results.extend([
+            measure(f"{name} encode", iterations, lambda serializer=serializer: serializer.dumps(data)),
+            measure(
+                f"{name} decode", iterations, lambda serializer=serializer, encoded=encoded: serializer.loads(encoded)
+            ),
+        ])
+    return results
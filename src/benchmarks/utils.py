@@ -0,0 +1,62 @@
+"""
+Модуль общих инструментов для бенчмарков.
+"""
+
+import statistics
+
+from pydantic import BaseModel
+from pydantic import Field
+
+
+class BenchmarkResult(BaseModel):
+    """
+    Результат замера одного сценария.
+    """
+
+    name: str = Field(description="Название сценария")
+    concurrency: int = Field(description="Количество одновременных запросов", default=1)
+    latencies: list[float] = Field(description="Задержки операций в секундах", default=[])
+    elapsed: float = Field(description="Общее время замера в секундах", default=0.0)
+    errors: int = Field(description="Количество неуспешных операций", default=0)
+
+    @property
+    def count(self) -> int:
+        """
+        Количество выполненных операций.
+        """
+        return len(self.latencies)
+
+    @property
+    def rps(self) -> float:
+        """
+        Количество операций в секунду.
+        """
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, percent: int) -> float:
+        """
+        Перцентиль задержки в миллисекундах.
+        """
+        if not self.latencies:
+            return 0.0
+        if len(self.latencies) == 1:
+            return self.latencies[0] * 1000
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[percent - 1] * 1000
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    """
+    Форматирование результатов в таблицу.
+    """
+    header = (
+        f"{'scenario':<24}{'conc':>6}{'count':>8}{'errors':>8}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}"
+    )
+    lines = [header, "-" * len(header)]
+    lines.extend(
+        f"{result.name:<24}{result.concurrency:>6}{result.count:>8}{result.errors:>8}"
+        f"{result.percentile(50):>10.2f}{result.percentile(95):>10.2f}{result.percentile(99):>10.2f}"
+        f"{result.rps:>12.1f}"
+        for result in results
+    )
+    return "\n".join(lines)
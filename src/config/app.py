@@ -2,13 +2,68 @@
 Модуль app.py, содержит экземпляр класса FastAPI приложения.
 """
 
+import asyncio
+import contextlib
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from config.log_tools import logger
 from config.routers.http import main_router
 from config.routers.socket import connect_router
 from config.routers.socket import socket_app
 from config.settings import settings
+from logic.utils.auth_utils import jw_key_cache
+from logic.utils.catalog_utils import game_catalog
+from logic.utils.password_utils import password_hasher
+from logic.utils.persistence_utils import character_flusher
+from managers.game_loop import game_rooms
+from managers.repository.local_persistence import local_persistence
+from managers.repository.main_manager import MainRepositoryManager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """
+    Запуск и остановка фоновых задач приложения.
+    """
+    local_persistence.load()
+    await jw_key_cache.load()
+    await game_catalog.load()
+    background_tasks = [
+        asyncio.create_task(jw_key_cache.run()),
+        asyncio.create_task(game_catalog.run()),
+        asyncio.create_task(character_flusher.run()),
+        asyncio.create_task(game_rooms.run_heartbeat()),
+    ]
+    if settings.socket_redis_manager:
+        background_tasks.append(asyncio.create_task(game_rooms.run()))
+    if settings.local_db:
+        background_tasks.append(asyncio.create_task(MainRepositoryManager().run_expiration()))
+    if local_persistence.enabled:
+        background_tasks.append(asyncio.create_task(local_persistence.run()))
+
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        for task in background_tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await game_rooms.stop_all()
+        try:
+            await character_flusher.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush characters on shutdown: {e}")
+        try:
+            await local_persistence.close()
+        except Exception as e:
+            logger.error(f"Failed to persist local db on shutdown: {e}")
+        password_hasher.shutdown()
+        await MainRepositoryManager().close()
 
 
 def server_init() -> FastAPI:
@@ -21,6 +76,7 @@ def server_init() -> FastAPI:
         version="1.0",
         debug=settings.debug,
         openapi_url=f"{settings.api_key}/openapi.json" if settings.enable_swagger else "",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
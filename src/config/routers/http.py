@@ -2,13 +2,16 @@
 Модуль http.py, содержит определение маршрутов и обработчиков для создания игры.
 """
 
-import redis
+from collections.abc import Callable
+
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import Request
 from fastapi import status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -16,19 +19,53 @@ from config.log_tools import logger
 from config.settings import settings
 from logic.utils.auth_utils import create_token
 from logic.utils.auth_utils import jwt_authenticated
+from logic.utils.auth_utils import token_blacklist
+from logic.utils.dungeon_utils import get_dungeon_floor
+from logic.utils.password_utils import password_hasher
+from logic.utils.persistence_utils import character_flusher
+from logic.utils.rate_limit_utils import action_rate_limiter
+from managers.actions.action_routes import action_routes
+from managers.game_loop import game_rooms
+from managers.repository.local_persistence import local_persistence
+from managers.repository.redis_pool import get_redis_client
 from models.client.player.base import PlayerCreateModel
 from models.client.player.base import PlayerLoginModel
+from models.constants.game import GameMode
 from models.db.base import Player
 from models.db.dependencies import get_db
+from models.db.pool import pool_statistics
 from models.exceptions import AuthenticationError
 from models.exceptions import HTTPError
+from models.exceptions import PasswordHasherBusyError
 from models.repository.player.base import PlayerConfigurationModel
 from models.repository.player.base import PlayerRepositoryModel
 
 main_router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+insert_by_dialect = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def get_insert(db: AsyncSession) -> Callable:
+    """
+    Конструктор INSERT с поддержкой ON CONFLICT для диалекта базы данных сессии.
+    """
+    return insert_by_dialect[db.get_bind().dialect.name]
+
+
+def password_hasher_busy_error() -> HTTPError:
+    """
+    Ошибка переполненного пула хэширования паролей.
+    """
+    return HTTPError(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, try again later",
+        headers={"Retry-After": "1"},
+    )
 
 
 @main_router.post("/login")
@@ -38,7 +75,11 @@ async def login(user: PlayerLoginModel, db: AsyncSession = Depends(get_db)) -> d
     """
     get_user = await db.execute(select(Player).where(Player.email == user.email))
     existing_user = get_user.scalar()
-    if not existing_user or not pwd_context.verify(user.password, existing_user.password):
+    try:
+        is_valid = existing_user is not None and await password_hasher.verify(user.password, existing_user.password)
+    except PasswordHasherBusyError as e:
+        raise password_hasher_busy_error() from e
+    if not is_valid:
         raise HTTPError(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
 
     try:
@@ -55,27 +96,33 @@ async def register(user: PlayerCreateModel, db: AsyncSession = Depends(get_db))
     """
     Роутер для регистрации.
     """
-    existing_user_by_email = await db.execute(select(Player).where(Player.email == user.email))
-    if existing_user_by_email.scalar() is not None:
-        raise HTTPError(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-
-    existing_user_by_username = await db.execute(select(Player).where(Player.username == user.username))
-    if existing_user_by_username.scalar() is not None:
-        raise HTTPError(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
-
     try:
-        hashed_password = pwd_context.hash(user.password)
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordHasherBusyError as e:
+        raise password_hasher_busy_error() from e
 
-        new_user = Player()
-        new_user.username = user.username
-        new_user.email = user.email
-        new_user.password = hashed_password
-
-        db.add(new_user)
+    try:
+        # Занятое имя пропускается без ошибки, занятый email нарушает свой уникальный индекс
+        insert_player = (
+            get_insert(db)(Player)
+            .values(username=user.username, email=user.email, password=hashed_password)
+            .on_conflict_do_nothing(index_elements=[Player.username])
+            .returning(Player.username)
+        )
+        username = (await db.execute(insert_player)).scalar()
         await db.commit()
-        await db.refresh(new_user)
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPError(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered") from e
+    except Exception as e:
+        logger.info(f"Failed to register user: {e}")
+        raise HTTPError(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+    if username is None:
+        raise HTTPError(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
 
-        token = create_token({"sub": new_user.username})
+    try:
+        token = create_token({"sub": username})
     except Exception as e:
         logger.info(f"Failed to register user: {e}")
         raise HTTPError(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
@@ -85,18 +132,12 @@ async def register(user: PlayerCreateModel, db: AsyncSession = Depends(get_db))
 
 @main_router.post("/logout")
 @jwt_authenticated
-def logout(request: Request, token: str = Depends(oauth2_scheme)) -> dict:
+async def logout(request: Request, token: str = Depends(oauth2_scheme)) -> dict:
     """
     Роутер для выхода.
     """
     try:
-        redis_client = redis.StrictRedis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            password=settings.redis_password,
-            db=settings.redis_db,
-        )
-        redis_client.setex(f"blacklist_{token}", settings.token_expiration_time, "blacklisted")
+        await token_blacklist.revoke(token, request.state.jwt_decoded)
         return {}
     except Exception as e:
         raise HTTPError(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Logout failed") from e
@@ -128,15 +169,41 @@ async def get_me(request: Request, db: AsyncSession = Depends(get_db)) -> Player
         raise HTTPError(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to retrieve user data") from e
 
 
-@main_router.post("/story", response_model=None)
-async def story() -> None:
+@main_router.get("/metrics")
+async def metrics(request: Request) -> dict:
     """
-    Роутер для сюжетки игры.
+    Маршрут для получения метрик сервера. Доступен только с адресов из настройки metrics_allowed_hosts.
     """
+    if request.client is None or request.client.host not in settings.metrics_allowed_hosts.split(","):
+        raise HTTPError(status_code=status.HTTP_403_FORBIDDEN, detail="Metrics are not available")
+    return {
+        "password_hasher": password_hasher.stats(),
+        "database": pool_statistics.stats(),
+        "write_behind": character_flusher.stats(),
+        "game_loop": game_rooms.stats(),
+        "actions": action_routes.stats(),
+        "rate_limit": action_rate_limiter.stats(),
+        "repository": await get_redis_client().info() if settings.local_db else None,
+        "persistence": local_persistence.stats(),
+        "dungeon_cache": get_dungeon_floor.cache_info()._asdict(),
+    }
+
+
+@main_router.post("/story")
+@jwt_authenticated
+async def story(request: Request) -> dict:
+    """
+    Роутер для сюжетки игры. Создает одиночную комнату, к которой клиент подключается через SocketIO.
+    """
+    room = await game_rooms.create_room(GameMode.solo, max_players=1)
+    return {"room_id": room.room_id, "tick_rate": settings.game_tick_rate}
 
 
-@main_router.post("/multiplayer", response_model=None)
-async def multiplayer() -> None:
+@main_router.post("/multiplayer")
+@jwt_authenticated
+async def multiplayer(request: Request) -> dict:
     """
-    Роутер для игры в мультиплеере.
+    Роутер для игры в мультиплеере. Возвращает комнату со свободными местами в любом процессе или создает новую.
     """
+    room_id = await game_rooms.find_or_create_room(GameMode.realtime)
+    return {"room_id": room_id, "tick_rate": settings.game_tick_rate}
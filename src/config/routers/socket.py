@@ -5,6 +5,7 @@
 import socketio
 from fastapi import APIRouter
 
+import logic.services.socket_connect  # noqa: F401 регистрация обработчиков действий
 from managers.socket import sio
 
 connect_router = APIRouter()
@@ -4,6 +4,7 @@
 
 import secrets
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field
 from pydantic import model_validator
@@ -42,11 +43,96 @@ class Settings(BaseSettings):
         description="Включение/отключение swagger документации",
         default=False,
     )
+    metrics_allowed_hosts: str = Field(
+        description="Адреса клиентов через запятую, которым доступен маршрут метрик, пустая строка — никому",
+        default="127.0.0.1,::1",
+    )
+    workers: int = Field(
+        description="Количество процессов сервера",
+        default=1,
+    )
+    socket_redis_manager: bool = Field(
+        description="Обмениваться сообщениями SocketIO и игровыми комнатами между процессами через редис",
+        default=False,
+    )
     cors_allowed_origins: str = Field(
         description="Разрешенные cors",
         default="http://localhost:8000",
     )
 
+    serializer: Literal["json", "orjson"] = Field(
+        description="Сериализатор JSON для репозитория и SocketIO",
+        default="orjson",
+    )
+
+    repository_compact_models: str = Field(
+        description="Модели репозитория через запятую, которые хранятся в компактном бинарном формате",
+        default="",
+    )
+    repository_indexes: str = Field(
+        description='Дополнительные индексы репозитория через запятую в формате "модель.индекс=путь.к.полю"',
+        default="",
+    )
+
+    catalog_reload_interval: int = Field(
+        description="Период проверки версии каталога игры в секундах",
+        default=30,
+    )
+
+    write_behind_interval: float = Field(
+        description="Период записи измененных персонажей из репозитория в базу данных в секундах",
+        default=5,
+    )
+    write_behind_batch_size: int = Field(
+        description="Максимальное количество персонажей в одном запросе записи в базу данных",
+        default=500,
+    )
+    write_behind_max_attempts: int = Field(
+        description="Количество неудачных попыток записи персонажа, после которых он откладывается в карантин",
+        default=5,
+    )
+    write_behind_quarantine_interval: float = Field(
+        description="Время в секундах, через которое персонаж из карантина снова записывается в базу данных",
+        default=300,
+    )
+
+    game_tick_rate: int = Field(
+        description="Частота тиков игрового цикла комнаты в секунду",
+        default=20,
+    )
+    game_keyframe_interval: int = Field(
+        description="Количество тиков между рассылками полного состояния комнаты",
+        default=100,
+    )
+    game_input_queue_size: int = Field(
+        description="Максимальное количество действий в очереди комнаты, лишние действия отбрасываются",
+        default=256,
+    )
+    game_max_players: int = Field(
+        description="Максимальное количество игроков в комнате мультиплеера",
+        default=4,
+    )
+    game_room_idle_timeout: float = Field(
+        description="Время в секундах, после которого комната без игроков останавливается",
+        default=60,
+    )
+    game_worker_ttl: int = Field(
+        description="Время в секундах, после которого комнаты процесса, не обновившего свою отметку, удаляются",
+        default=15,
+    )
+    socket_rate_limit: float = Field(
+        description="Количество сообщений SocketIO в секунду от одного клиента, 0 отключает ограничение",
+        default=30,
+    )
+    socket_rate_burst: int = Field(
+        description="Количество сообщений SocketIO, которое клиент может отправить сразу сверх ограничения",
+        default=60,
+    )
+    dungeon_cache_size: int = Field(
+        description="Максимальное количество сгенерированных этажей подземелья в кэше",
+        default=256,
+    )
+
     # JWT settings
     secret_key: str = Field(
         description="Секретный ключ для шифрования JWT",
@@ -68,6 +154,34 @@ class Settings(BaseSettings):
         default=True,
         description="Проверять ли время жизни токена",
     )
+    jwt_keys_cache_ttl: int = Field(
+        description="Период перечитывания связки ключей JWT из Redis в секундах",
+        default=60,
+    )
+    jwt_keys_rotation_interval: int = Field(
+        description="Период ротации ключей JWT в секундах, 0 отключает ротацию",
+        default=60 * 60 * 24 * 7,  # 7 дней
+    )
+    jwt_blacklist_cache_ttl: int = Field(
+        description="Время в секундах, в течение которого процесс считает токен не отозванным без запроса к Redis",
+        default=5,
+    )
+    password_hash_executor: Literal["thread", "process"] = Field(
+        description="Тип пула для хэширования паролей",
+        default="thread",
+    )
+    password_hash_workers: int = Field(
+        description="Количество воркеров пула для хэширования паролей",
+        default=4,
+    )
+    password_hash_max_queue: int = Field(
+        description="Максимальное количество задач хэширования паролей в очереди, сверх которого запросы отклоняются",
+        default=64,
+    )
+    jwt_tokens_cache_size: int = Field(
+        description="Максимальное количество проверенных JWT токенов в кэше процесса",
+        default=10_000,
+    )
 
     # Database settings
     db_host: str = Field(
@@ -87,6 +201,38 @@ class Settings(BaseSettings):
         default="postgres",
     )
     sqlalchemy_url: str | None = None
+    db_echo: bool = Field(
+        description="Логирование SQL запросов",
+        default=False,
+    )
+    db_pool_size: int = Field(
+        description="Количество постоянных подключений в пуле базы данных",
+        default=10,
+    )
+    db_max_overflow: int = Field(
+        description="Количество подключений сверх размера пула базы данных",
+        default=20,
+    )
+    db_pool_timeout: int = Field(
+        description="Время ожидания свободного подключения из пула базы данных в секундах",
+        default=30,
+    )
+    db_pool_recycle: int = Field(
+        description="Время жизни подключения к базе данных в секундах, -1 отключает пересоздание",
+        default=1800,
+    )
+    db_pool_pre_ping: bool = Field(
+        description="Проверять ли подключение к базе данных перед выдачей из пула",
+        default=True,
+    )
+    db_statement_timeout: int = Field(
+        description="Максимальное время выполнения SQL запроса в миллисекундах, 0 отключает ограничение",
+        default=30_000,
+    )
+    db_statement_cache_size: int = Field(
+        description="Размер кэша подготовленных выражений asyncpg на одно подключение",
+        default=500,
+    )
 
     # Redis settings
     redis_host: str = Field(
@@ -109,10 +255,73 @@ class Settings(BaseSettings):
         description="Использовать ли локальную базу данных",
         default=True,
     )
+    local_db_backend: Literal["memory", "shared"] = Field(
+        description="Хранилище локальной базы данных: память процесса или файл в общей памяти для нескольких процессов",
+        default="memory",
+    )
+    local_db_max_bytes: int = Field(
+        description="Максимальный размер данных локальной базы данных в байтах, 0 — без ограничения",
+        default=0,
+    )
+    local_db_eviction_policy: Literal[
+        "noeviction", "allkeys-lru", "allkeys-lfu", "volatile-lru", "volatile-lfu"
+    ] = Field(
+        description="Политика вытеснения ключей локальной базы данных при превышении максимального размера",
+        default="allkeys-lru",
+    )
+    local_db_expire_interval: float = Field(
+        description="Период удаления ключей с истекшим временем жизни из локальной базы данных в секундах",
+        default=1,
+    )
+    local_db_persistence_dir: str = Field(
+        description="Каталог для снимков и журнала изменений локальной базы данных, пустая строка отключает сохранение",
+        default="",
+    )
+    local_db_fsync_interval: float = Field(
+        description="Период записи журнала изменений локальной базы данных на диск в секундах",
+        default=0.1,
+    )
+    local_db_snapshot_interval: float = Field(
+        description="Период записи снимка локальной базы данных в секундах",
+        default=300,
+    )
+    shared_db_path: str = Field(
+        description="Файл общей памяти локальной базы данных",
+        default="/dev/shm/rogalik.db",
+    )
+    shared_db_slots: int = Field(
+        description="Количество ячеек хэш-таблицы в общей памяти, должно делиться на количество сегментов",
+        default=16384,
+    )
+    shared_db_slot_size: int = Field(
+        description="Размер ячейки хэш-таблицы в общей памяти в байтах, ограничивает размер одного значения",
+        default=16384,
+    )
+    shared_db_stripes: int = Field(
+        description="Количество сегментов хэш-таблицы в общей памяти, каждый со своей блокировкой",
+        default=64,
+    )
     cluster: bool = Field(
         description="Используется ли редис кластер",
         default=False,
     )
+    redis_pool_size: int = Field(
+        description="Максимальное количество подключений в пуле редиса",
+        default=50,
+    )
+    redis_pool_timeout: int = Field(
+        description="Время ожидания свободного подключения из пула редиса в секундах",
+        default=5,
+    )
+    redis_socket_timeout: float = Field(
+        description="Таймаут операций с сокетом редиса в секундах",
+        default=5,
+    )
+    redis_health_check_interval: int = Field(
+        description="Период проверки простаивающих подключений к редису в секундах",
+        default=30,
+    )
+    redis_url: str | None = None
 
     @model_validator(mode="after")
     def set_sqlalchemy_url(self) -> "Settings":
@@ -122,5 +331,14 @@ class Settings(BaseSettings):
         self.sqlalchemy_url = f"postgresql+asyncpg://{self.db_user}:{self.db_password}@{self.db_host}/{self.db_name}"
         return self
 
+    @model_validator(mode="after")
+    def set_redis_url(self) -> "Settings":
+        """
+        Формирование redis_url для клиентов, которые подключаются по адресу.
+        """
+        password = f":{self.redis_password}@" if self.redis_password else ""
+        self.redis_url = f"redis://{password}{self.redis_host}:{self.redis_port}/{self.redis_db}"
+        return self
+
 
 settings = Settings()
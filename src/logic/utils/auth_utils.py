@@ -2,17 +2,22 @@
 Модуль работы с аутентификацией токена
 """
 
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
 from collections.abc import Callable
 from collections.abc import Coroutine
 from datetime import datetime
 from datetime import timedelta
+from functools import cached_property
 from functools import wraps
 from typing import Any
 from typing import TypeVar
 
 import jwt
 import pydantic
-import redis
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
@@ -23,7 +28,11 @@ from jwt import InvalidTokenError
 from jwt import MissingRequiredClaimError
 from starlette import status
 
+from config.log_tools import logger
 from config.settings import settings
+from logic.utils.json_utils import from_json
+from logic.utils.json_utils import to_json
+from managers.repository.redis_pool import get_redis_client
 from models import exceptions
 from models.exceptions import AuthenticationError
 from models.exceptions import HTTPShortError
@@ -34,30 +43,44 @@ TReturnType = TypeVar("TReturnType")
 
 class JWKeyCache:
     """
-    Кэш ключей для проверки аутентификации JWT токенов, использующий Redis.
+    Связка ключей для подписи и проверки JWT токенов, хранящаяся в Redis.
+
+    Один экземпляр на процесс: ключи загружаются при старте приложения и держатся в памяти,
+    фоновая задача run периодически перечитывает связку и ротирует ключи.
+    Каждый ключ имеет идентификатор (kid), который записывается в заголовок токена,
+    поэтому токены, подписанные предыдущим ключом, остаются валидными до своего истечения.
     """
 
-    def __init__(self) -> None:
-        """
-        Создает кэш ключей и загружает публичный ключ.
-        Если ключ отсутствует, он будет создан.
-        """
-        self.redis_client = redis.StrictRedis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            password=settings.redis_password,
-            db=settings.redis_db,
-        )
+    keyring_name = "jwt_keyring"
+    rotation_lock_prefix = "jwt_keyring_rotation"
+    # Время в секундах, после которого ротацию может выполнить другой процесс, если ротировавший упал
+    rotation_lock_ttl = 60
 
+    def __init__(self) -> None:
         self._algorithm = settings.algorithm
         self._fernet_key = settings.fernet_key
+        self._reload_interval = settings.jwt_keys_cache_ttl
+        self._rotation_interval = settings.jwt_keys_rotation_interval
+
+        self._public_keys: dict[str, rsa.RSAPublicKey] = {}
+        self._current_kid: str | None = None
+        self._current_created_at: float = 0.0
+        self._private_key: rsa.RSAPrivateKey | None = None
+        self._lock = asyncio.Lock()
 
-        if not self.redis_client.exists("public_key") or not self.redis_client.exists("private_key"):
-            self.generate_key_pair()
+    @cached_property
+    def connection(self) -> Any:
+        """
+        Подключение к хранилищу ключей.
+        """
+        return get_redis_client()
 
-    def generate_key_pair(self) -> None:
+    def _generate_key_pair(self) -> tuple[str, str]:
         """
         Генерация новой пары ключей (приватного и публичного).
+        Выполняется в отдельном потоке.
+
+        :return: Публичный ключ в PEM и зашифрованный приватный ключ.
         """
         private_key = rsa.generate_private_key(
             public_exponent=65537,
@@ -72,40 +95,321 @@ class JWKeyCache:
 
         cipher_suite = Fernet(self._fernet_key)
         encrypted_private_key = cipher_suite.encrypt(private_key_pem)
-        self.redis_client.set("private_key", encrypted_private_key)
 
-        public_key = private_key.public_key()
-        public_key_pem = public_key.public_bytes(
+        public_key_pem = private_key.public_key().public_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PublicFormat.SubjectPublicKeyInfo,
         )
-        self.redis_client.set("public_key", public_key_pem)
+        return public_key_pem.decode(), encrypted_private_key.decode()
 
-    async def get_public_key(self) -> str:
+    def _decrypt_private_key(self, encrypted_private_key: str) -> rsa.RSAPrivateKey:
         """
-        Получить публичный ключ для проверки токена из Redis.
+        Расшифровка приватного ключа. Выполняется в отдельном потоке.
         """
-        public_key = await self.redis_client.get("public_key")
-        if public_key is None:
-            raise ValueError("Public key not found in Redis")
-        return public_key.decode("utf-8")
-
-    async def get_private_key(self) -> rsa.RSAPrivateKey:
-        """
-        Получить приватный ключ из Redis.
-        """
-        encrypted_private_key = await self.redis_client.get("private_key")
-        if encrypted_private_key is None:
-            raise ValueError("Private key not found in Redis")
-
         cipher_suite = Fernet(self._fernet_key)
-        private_key_pem = cipher_suite.decrypt(encrypted_private_key)
+        private_key_pem = cipher_suite.decrypt(encrypted_private_key.encode())
 
         return serialization.load_pem_private_key(
             private_key_pem,
             password=None,
         )
 
+    async def _read_keyring(self) -> dict:
+        """
+        Чтение связки ключей из Redis.
+        """
+        keyring = await self.connection.get(self.keyring_name)
+        if keyring is None:
+            return {"current": None, "keys": {}}
+        return from_json(keyring)
+
+    async def _apply_keyring(self, keyring: dict) -> None:
+        """
+        Применение прочитанной связки ключей к кэшу процесса.
+        """
+        keys: dict[str, dict] = keyring["keys"]
+        current_kid = keyring["current"]
+
+        public_keys = {
+            kid: self._public_keys.get(kid) or serialization.load_pem_public_key(key["public"].encode())
+            for kid, key in keys.items()
+        }
+        if current_kid != self._current_kid:
+            self._private_key = await asyncio.to_thread(self._decrypt_private_key, keys[current_kid]["private"])
+
+        if set(self._public_keys) - set(public_keys):
+            verified_tokens_cache.clear()
+
+        self._public_keys = public_keys
+        self._current_kid = current_kid
+        self._current_created_at = keys[current_kid]["created_at"]
+
+    async def load(self) -> None:
+        """
+        Загрузка связки ключей. Если ключей нет, создается новая пара.
+        """
+        async with self._lock:
+            keyring = await self._read_keyring()
+            if keyring["current"] is None:
+                await self._rotate(keyring)
+            else:
+                await self._apply_keyring(keyring)
+
+    async def rotate(self) -> None:
+        """
+        Ротация ключей: новая пара становится текущей, предыдущие остаются для проверки токенов.
+        """
+        async with self._lock:
+            keyring = await self._read_keyring()
+            current = keyring["keys"].get(keyring["current"])
+            if current is not None and not self._is_expired(current):
+                # Ключ уже ротировал другой процесс
+                await self._apply_keyring(keyring)
+                return
+            await self._rotate(keyring)
+
+    async def _rotate(self, keyring: dict) -> None:
+        """
+        Генерация нового ключа и сохранение связки.
+        Удаляет ключи, все токены которых уже истекли.
+
+        Связку изменяет только один процесс: пустая связка создается через SET NX, а ротацию текущего ключа
+        выполняет процесс, первым записавший через SET NX метку ротации этого ключа. Остальные процессы
+        перечитывают связку, поэтому ни один записанный ключ не теряется.
+        """
+        current_kid = keyring["current"]
+        if current_kid is not None and not await self.connection.set(
+            f"{self.rotation_lock_prefix}:{current_kid}", "1", ex=self.rotation_lock_ttl, nx=True
+        ):
+            await self._apply_keyring(await self._read_keyring())
+            return
+
+        public_key_pem, encrypted_private_key = await asyncio.to_thread(self._generate_key_pair)
+        now = time.time()
+
+        keys: dict[str, dict] = keyring["keys"]
+        if current_kid in keys:
+            keys[current_kid]["retired_at"] = now
+        keys = {
+            kid: key
+            for kid, key in keys.items()
+            if key.get("retired_at") is None or key["retired_at"] + settings.expiration_time > now
+        }
+
+        kid = uuid.uuid4().hex
+        keys[kid] = {
+            "public": public_key_pem,
+            "private": encrypted_private_key,
+            "created_at": now,
+        }
+        keyring = {"current": kid, "keys": keys}
+
+        if not await self.connection.set(self.keyring_name, to_json(keyring), nx=current_kid is None):
+            # Связку одновременно создал другой процесс
+            await self._apply_keyring(await self._read_keyring())
+            return
+        await self._apply_keyring(keyring)
+        logger.info(f"JWT key rotated, new kid: {kid}")
+
+    def _is_expired(self, key: dict) -> bool:
+        """
+        Проверка, пора ли ротировать ключ.
+        """
+        if self._rotation_interval <= 0:
+            return False
+        return key["created_at"] + self._rotation_interval <= time.time()
+
+    async def run(self) -> None:
+        """
+        Фоновая задача: перечитывает связку ключей и ротирует текущий ключ по расписанию.
+        """
+        while True:
+            await asyncio.sleep(self._reload_interval)
+            try:
+                if self._is_expired({"created_at": self._current_created_at}):
+                    await self.rotate()
+                else:
+                    await self.load()
+            except Exception as e:
+                logger.error(f"Failed to refresh JWT keys: {e}")
+
+    def get_public_key(self, kid: str | None) -> rsa.RSAPublicKey | None:
+        """
+        Получить публичный ключ для проверки токена по его идентификатору.
+        """
+        return self._public_keys.get(kid)
+
+    def get_signing_key(self) -> tuple[str, rsa.RSAPrivateKey]:
+        """
+        Получить идентификатор и приватный ключ для подписи токена.
+        """
+        if self._current_kid is None or self._private_key is None:
+            raise ValueError("JWT keys are not loaded")
+        return self._current_kid, self._private_key
+
+
+class VerifiedTokenCache:
+    """
+    LRU кэш уже проверенных JWT токенов.
+
+    Ключом является хэш токена, запись живет не дольше чем поле exp токена.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._data: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+
+    @staticmethod
+    def _get_key(token: str) -> bytes:
+        """
+        Хэш токена, используемый в качестве ключа.
+        """
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        """
+        Возвращает копию полезной нагрузки токена или None, если токена нет в кэше или он истек.
+        """
+        key = self._get_key(token)
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        payload, expires_at = item
+        if expires_at <= time.time():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return dict(payload)
+
+    def set(self, token: str, payload: dict) -> None:
+        """
+        Сохраняет полезную нагрузку проверенного токена.
+        """
+        if self.max_size <= 0:
+            return
+
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, int | float):
+            expires_at = float("inf")
+
+        key = self._get_key(token)
+        self._data[key] = (dict(payload), expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Очищает кэш.
+        """
+        self._data.clear()
+
+    def __len__(self) -> int:
+        """
+        Количество токенов в кэше.
+        """
+        return len(self._data)
+
+
+class TokenBlacklist:
+    """
+    Черный список отозванных JWT токенов.
+
+    В Redis хранится только идентификатор токена (jti) с TTL, равным оставшемуся времени жизни токена.
+    Результаты проверок кэшируются в процессе: отозванные токены до их истечения,
+    неотозванные — не дольше settings.jwt_blacklist_cache_ttl.
+    """
+
+    prefix = "blacklist"
+
+    def __init__(self, cache_ttl: int, max_size: int) -> None:
+        self.cache_ttl = cache_ttl
+        self.max_size = max_size
+        self._revoked: dict[str, float] = {}
+        self._not_revoked: OrderedDict[str, float] = OrderedDict()
+
+    @cached_property
+    def connection(self) -> Any:
+        """
+        Подключение к хранилищу черного списка.
+        """
+        return get_redis_client()
+
+    @staticmethod
+    def get_token_id(token: str, payload: dict) -> str:
+        """
+        Компактный идентификатор токена: jti, а для токенов без него — хэш токена.
+        """
+        return payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _get_expiration(payload: dict) -> float:
+        """
+        Время истечения токена.
+        """
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, int | float):
+            return time.time() + settings.expiration_time
+        return expires_at
+
+    def _remember_revoked(self, token_id: str, expires_at: float) -> None:
+        """
+        Сохранение отозванного токена в кэше процесса.
+        """
+        self._not_revoked.pop(token_id, None)
+        self._revoked[token_id] = expires_at
+        if len(self._revoked) > self.max_size:
+            now = time.time()
+            self._revoked = {key: value for key, value in self._revoked.items() if value > now}
+        while len(self._revoked) > self.max_size:
+            del self._revoked[next(iter(self._revoked))]
+
+    async def revoke(self, token: str, payload: dict) -> None:
+        """
+        Отзыв токена до окончания его времени жизни.
+        """
+        expires_at = self._get_expiration(payload)
+        ttl = int(expires_at - time.time()) + 1
+        if ttl <= 0:
+            return
+
+        token_id = self.get_token_id(token, payload)
+        await self.connection.setex(f"{self.prefix}:{token_id}", ttl, 1)
+        self._remember_revoked(token_id, expires_at)
+
+    async def is_revoked(self, token: str, payload: dict) -> bool:
+        """
+        Проверка, отозван ли токен.
+        Обращается к Redis, только если результата нет в кэше процесса или он устарел.
+        """
+        token_id = self.get_token_id(token, payload)
+        if token_id in self._revoked:
+            return True
+
+        now = time.time()
+        checked_until = self._not_revoked.get(token_id)
+        if checked_until is not None and checked_until > now:
+            self._not_revoked.move_to_end(token_id)
+            return False
+
+        if await self.connection.exists(f"{self.prefix}:{token_id}"):
+            self._remember_revoked(token_id, self._get_expiration(payload))
+            return True
+
+        if self.max_size > 0:
+            self._not_revoked[token_id] = now + self.cache_ttl
+            self._not_revoked.move_to_end(token_id)
+            while len(self._not_revoked) > self.max_size:
+                self._not_revoked.popitem(last=False)
+        return False
+
+
+verified_tokens_cache = VerifiedTokenCache(settings.jwt_tokens_cache_size)
+token_blacklist = TokenBlacklist(settings.jwt_blacklist_cache_ttl, settings.jwt_tokens_cache_size)
+jw_key_cache = JWKeyCache()
+
 
 def jwt_authenticated(
     func: Callable[..., Coroutine[Any, Any, TReturnType]],
@@ -119,18 +423,16 @@ def jwt_authenticated(
     async def wrapper(*args: Any, **kwargs: Any) -> TReturnType:
         """
         Проверяет наличие и валидность JWT в headers, декодирует его и передает обернутой функции.
+        Для HTTP запросов результат сохраняется в request.state.jwt_decoded.
         """
         request: Request | None = kwargs.get("request")
-        error_cls: type[SocketIOError | HTTPShortError]
 
         if request is not None:
             token = request.headers.get("Authorization", "")
-            error_cls = HTTPShortError
+            request.state.jwt_decoded = await validate_token(token, HTTPShortError)
         else:
             token = f"Bearer {kwargs.get('jwt', '')}"
-            error_cls = SocketIOError
-
-        kwargs["jwt_decoded"] = validate_token(token, error_cls)
+            kwargs["jwt_decoded"] = await validate_token(token, SocketIOError)
 
         return await func(*args, **kwargs)
 
@@ -145,18 +447,21 @@ def create_token(payload: dict) -> str:
     expiration_date = datetime.utcnow() + timedelta(seconds=expiration_time)
 
     payload["exp"] = expiration_date
+    payload.setdefault("jti", uuid.uuid4().hex)
+    kid, private_key = jw_key_cache.get_signing_key()
 
     return jwt.encode(
         payload,
-        settings.secret_key,
+        private_key,
         algorithm=settings.algorithm,
+        headers={"kid": kid},
     )
 
 
-def validate_token(token: str, error_cls: type[Exception] = AuthenticationError) -> dict:
+async def validate_token(token: str, error_cls: type[Exception] = AuthenticationError) -> dict:
     """
     Функция для валидации JWT токена.
-    Проверяет наличие токена, его префикс и валидность подписи.
+    Проверяет наличие токена, его префикс, валидность подписи и отсутствие в черном списке.
 
     :param token: Токен с префиксом Bearer
     :param error_cls: Класс ошибки для выброса
@@ -168,10 +473,31 @@ def validate_token(token: str, error_cls: type[Exception] = AuthenticationError)
         raise error_cls(msg)
 
     token = token.removeprefix(prefix)
-    jwks = JWKeyCache()
 
+    jwt_decoded = verified_tokens_cache.get(token)
+    if jwt_decoded is None:
+        jwt_decoded = decode_token(token, error_cls)
+        verified_tokens_cache.set(token, jwt_decoded)
+
+    if await token_blacklist.is_revoked(token, jwt_decoded):
+        msg = "Token has been revoked"
+        raise error_cls(msg)
+
+    return jwt_decoded
+
+
+def decode_token(token: str, error_cls: type[Exception] = AuthenticationError) -> dict:
+    """
+    Функция для проверки подписи и декодирования JWT токена без префикса.
+
+    :param token: Токен без префикса
+    :param error_cls: Класс ошибки для выброса
+    """
     try:
-        pub_key = jwks.get_public_key()
+        pub_key = jw_key_cache.get_public_key(jwt.get_unverified_header(token).get("kid"))
+        if pub_key is None:
+            msg = "Unknown JWT key"
+            raise error_cls(msg)
 
         jwt_decoded = jwt.decode(
             token,
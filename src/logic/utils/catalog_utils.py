@@ -0,0 +1,487 @@
+"""
+Модуль содержит кэш статического каталога игры: классы, расы, скиллы, эффекты, бафы и дебафы.
+
+Каталог загружается из базы данных один раз при старте в неизменяемые записи и перечитывается
+только после явного повышения версии в репозитории.
+"""
+
+import asyncio
+import uuid
+from collections.abc import Mapping
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from functools import cached_property
+from types import MappingProxyType
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from config.log_tools import logger
+from config.settings import settings
+from managers.repository.redis_pool import get_redis_client
+from models import exceptions
+from models.db.base import Buff
+from models.db.base import Class
+from models.db.base import Debuff
+from models.db.base import Effect
+from models.db.base import Race
+from models.db.base import SessionLocal
+from models.db.base import Skill
+from models.mixins import ExtraEffectsMixin
+from models.repository.extra_effects import BuffsBaseModel
+from models.repository.extra_effects import DebuffsBaseModel
+from models.repository.extra_effects import EffectBaseModel
+from models.repository.player.class_ import ClassConfigurationModel
+from models.repository.player.class_ import ClassRepositoryModel
+from models.repository.player.race import RaceConfigurationModel
+from models.repository.player.race import RaceRepositoryModel
+from models.repository.player.skill import SkillConfigurationModel
+from models.repository.player.skill import SkillRepositoryModel
+
+
+@dataclass(frozen=True, slots=True)
+class BuffRecord:
+    """
+    Запись бафа.
+    """
+
+    id: uuid.UUID
+    name: str
+    description: str
+
+    @classmethod
+    def from_db(cls, buff: Buff) -> "BuffRecord":
+        """
+        Запись из модели базы данных.
+        """
+        return cls(id=buff.id, name=buff.name, description=buff.description)
+
+    def to_model(self) -> BuffsBaseModel:
+        """
+        Модель бафа для репозитория.
+        """
+        return BuffsBaseModel(uid=self.id, name=self.name, description=self.description)
+
+
+@dataclass(frozen=True, slots=True)
+class DebuffRecord:
+    """
+    Запись дебафа.
+    """
+
+    id: uuid.UUID
+    name: str
+    description: str
+
+    @classmethod
+    def from_db(cls, debuff: Debuff) -> "DebuffRecord":
+        """
+        Запись из модели базы данных.
+        """
+        return cls(id=debuff.id, name=debuff.name, description=debuff.description)
+
+    def to_model(self) -> DebuffsBaseModel:
+        """
+        Модель дебафа для репозитория.
+        """
+        return DebuffsBaseModel(uid=self.id, name=self.name, description=self.description)
+
+
+@dataclass(frozen=True, slots=True)
+class EffectRecord:
+    """
+    Запись эффекта.
+    """
+
+    id: uuid.UUID
+    name: str
+    description: str
+    skill_id: uuid.UUID | None
+    class_id: uuid.UUID | None
+    race_id: uuid.UUID | None
+
+    @classmethod
+    def from_db(cls, effect: Effect) -> "EffectRecord":
+        """
+        Запись из модели базы данных.
+        """
+        return cls(
+            id=effect.id,
+            name=effect.name,
+            description=effect.description,
+            skill_id=effect.skill_id,
+            class_id=effect.character_class_id,
+            race_id=effect.race_id,
+        )
+
+    def to_model(self) -> EffectBaseModel:
+        """
+        Модель эффекта для репозитория.
+        """
+        return EffectBaseModel(uid=self.id, name=self.name, description=self.description)
+
+
+@dataclass(frozen=True, slots=True)
+class SkillRecord:
+    """
+    Запись скилла.
+    """
+
+    id: uuid.UUID
+    type: str
+    name: str
+    description: str
+    level: int
+    required_level: int
+    cooldown: int
+    effects: tuple[EffectRecord, ...]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_db(cls, skill: Skill) -> "SkillRecord":
+        """
+        Запись из модели базы данных. Эффекты скилла должны быть загружены.
+        """
+        return cls(
+            id=skill.id,
+            type=skill.type,
+            name=skill.name,
+            description=skill.description,
+            level=skill.level,
+            required_level=skill.required_level,
+            cooldown=skill.cooldown,
+            effects=tuple(map(EffectRecord.from_db, skill.effects)),
+            created_at=skill.created_at,
+            updated_at=skill.updated_at,
+        )
+
+    def to_model(self) -> SkillRepositoryModel:
+        """
+        Модель скилла для репозитория.
+        """
+        return SkillRepositoryModel(
+            effects=[effect.to_model() for effect in self.effects],
+            skill_configuration=SkillConfigurationModel(
+                uid=self.id,
+                type=self.type,
+                name=self.name,
+                description=self.description,
+                level=self.level,
+                required_level=self.required_level,
+                cooldown=self.cooldown,
+            ),
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ClassRecord:
+    """
+    Запись класса.
+    """
+
+    id: uuid.UUID
+    name: str
+    description: str
+    effects: tuple[EffectRecord, ...]
+    buffs: tuple[BuffRecord, ...]
+    debuffs: tuple[DebuffRecord, ...]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_db(cls, class_: Class) -> "ClassRecord":
+        """
+        Запись из модели базы данных. Эффекты, бафы и дебафы класса должны быть загружены.
+        """
+        return cls(
+            id=class_.id,
+            name=class_.name,
+            description=class_.description,
+            effects=tuple(map(EffectRecord.from_db, class_.effects)),
+            buffs=tuple(map(BuffRecord.from_db, class_.buffs)),
+            debuffs=tuple(map(DebuffRecord.from_db, class_.debuffs)),
+            created_at=class_.created_at,
+            updated_at=class_.updated_at,
+        )
+
+    def to_model(self) -> ClassRepositoryModel:
+        """
+        Модель класса для репозитория.
+        """
+        return ClassRepositoryModel(
+            effects=ExtraEffectsMixin(
+                effects=[effect.to_model() for effect in self.effects],
+                buffs=[buff.to_model() for buff in self.buffs],
+                debuffs=[debuff.to_model() for debuff in self.debuffs],
+            ),
+            class_configuration=ClassConfigurationModel(
+                uid=self.id,
+                name=self.name,
+                description=self.description,
+            ),
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RaceRecord:
+    """
+    Запись расы.
+    """
+
+    id: uuid.UUID
+    type: str
+    description: str
+    effects: tuple[EffectRecord, ...]
+    buffs: tuple[BuffRecord, ...]
+    debuffs: tuple[DebuffRecord, ...]
+    created_at: datetime
+    updated_at: datetime
+
+    @property
+    def name(self) -> str:
+        """
+        Раса индексируется по типу.
+        """
+        return self.type
+
+    @classmethod
+    def from_db(cls, race: Race) -> "RaceRecord":
+        """
+        Запись из модели базы данных. Эффекты, бафы и дебафы расы должны быть загружены.
+        """
+        return cls(
+            id=race.id,
+            type=race.type,
+            description=race.description,
+            effects=tuple(map(EffectRecord.from_db, race.effects)),
+            buffs=tuple(map(BuffRecord.from_db, race.buffs)),
+            debuffs=tuple(map(DebuffRecord.from_db, race.debuffs)),
+            created_at=race.created_at,
+            updated_at=race.updated_at,
+        )
+
+    def to_model(self) -> RaceRepositoryModel:
+        """
+        Модель расы для репозитория.
+        """
+        return RaceRepositoryModel(
+            effects=ExtraEffectsMixin(
+                effects=[effect.to_model() for effect in self.effects],
+                buffs=[buff.to_model() for buff in self.buffs],
+                debuffs=[debuff.to_model() for debuff in self.debuffs],
+            ),
+            race_configuration=RaceConfigurationModel(
+                uid=self.id,
+                race=self.type,
+                description=self.description,
+            ),
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogIndex:
+    """
+    Записи одного вида, проиндексированные по id и имени. Индексы доступны только для чтения.
+    Тип записей указан в полях CatalogSnapshot и в методах получения записей GameCatalog.
+    """
+
+    by_id: Mapping[uuid.UUID, Any] = field(default_factory=lambda: MappingProxyType({}))
+    by_name: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def build(cls, records: list) -> "CatalogIndex":
+        """
+        Построение индексов по списку записей.
+        """
+        return cls(
+            by_id=MappingProxyType({record.id: record for record in records}),
+            by_name=MappingProxyType({record.name: record for record in records}),
+        )
+
+    def __len__(self) -> int:
+        """
+        Количество записей.
+        """
+        return len(self.by_id)
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogSnapshot:
+    """
+    Согласованный снимок каталога одной версии.
+    """
+
+    version: int = 0
+    # Индексы записей ClassRecord, RaceRecord, SkillRecord, EffectRecord, BuffRecord и DebuffRecord
+    classes: CatalogIndex = field(default_factory=CatalogIndex)
+    races: CatalogIndex = field(default_factory=CatalogIndex)
+    skills: CatalogIndex = field(default_factory=CatalogIndex)
+    effects: CatalogIndex = field(default_factory=CatalogIndex)
+    buffs: CatalogIndex = field(default_factory=CatalogIndex)
+    debuffs: CatalogIndex = field(default_factory=CatalogIndex)
+
+
+class GameCatalog:
+    """
+    Кэш статического каталога игры в памяти процесса.
+
+    Снимок каталога заменяется целиком, поэтому читатели всегда видят согласованные данные.
+    """
+
+    version_key = "catalog_version"
+
+    def __init__(self) -> None:
+        self._reload_interval = settings.catalog_reload_interval
+        self.snapshot = CatalogSnapshot()
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    @cached_property
+    def connection(self) -> Any:
+        """
+        Подключение к хранилищу версии каталога.
+        """
+        return get_redis_client()
+
+    @staticmethod
+    async def _fetch(version: int) -> CatalogSnapshot:
+        """
+        Загрузка каталога из базы данных фиксированным числом запросов.
+        """
+        async with SessionLocal() as session:
+            classes = await session.scalars(
+                select(Class).options(
+                    selectinload(Class.effects),
+                    selectinload(Class.buffs),
+                    selectinload(Class.debuffs),
+                )
+            )
+            races = await session.scalars(
+                select(Race).options(
+                    selectinload(Race.effects),
+                    selectinload(Race.buffs),
+                    selectinload(Race.debuffs),
+                )
+            )
+            skills = await session.scalars(select(Skill).options(selectinload(Skill.effects)))
+            effects = await session.scalars(select(Effect))
+            buffs = await session.scalars(select(Buff))
+            debuffs = await session.scalars(select(Debuff))
+
+            return CatalogSnapshot(
+                version=version,
+                classes=CatalogIndex.build(list(map(ClassRecord.from_db, classes))),
+                races=CatalogIndex.build(list(map(RaceRecord.from_db, races))),
+                skills=CatalogIndex.build(list(map(SkillRecord.from_db, skills))),
+                effects=CatalogIndex.build(list(map(EffectRecord.from_db, effects))),
+                buffs=CatalogIndex.build(list(map(BuffRecord.from_db, buffs))),
+                debuffs=CatalogIndex.build(list(map(DebuffRecord.from_db, debuffs))),
+            )
+
+    async def _read_version(self) -> int:
+        """
+        Текущая версия каталога в репозитории.
+        """
+        version = await self.connection.get(self.version_key)
+        return int(version) if version is not None else 0
+
+    async def load(self, force: bool = False) -> bool:
+        """
+        Загрузка каталога, если версия в репозитории отличается от загруженной.
+
+        :return: True, если каталог был перечитан.
+        """
+        async with self._lock:
+            version = await self._read_version()
+            if not force and self.loaded and version == self.snapshot.version:
+                return False
+            self.snapshot = await self._fetch(version)
+            self._loaded = True
+            logger.info(
+                f"Catalog v{version} loaded: {len(self.snapshot.classes)} classes, {len(self.snapshot.races)} races, "
+                f"{len(self.snapshot.skills)} skills"
+            )
+            return True
+
+    async def bump_version(self) -> int:
+        """
+        Повышение версии каталога. Все процессы перечитают каталог при следующей проверке.
+        """
+        return await self.connection.incr(self.version_key)
+
+    async def run(self) -> None:
+        """
+        Фоновая задача: проверяет версию каталога и перечитывает его после повышения.
+        """
+        while True:
+            await asyncio.sleep(self._reload_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Failed to reload catalog: {e}")
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Загружен ли каталог.
+        """
+        return self._loaded
+
+    def get_class(self, key: uuid.UUID | str) -> ClassRecord:
+        """
+        Класс по id или имени.
+        """
+        return self._get(self.snapshot.classes, key)
+
+    def get_race(self, key: uuid.UUID | str) -> RaceRecord:
+        """
+        Раса по id или типу.
+        """
+        return self._get(self.snapshot.races, key)
+
+    def get_skill(self, key: uuid.UUID | str) -> SkillRecord:
+        """
+        Скилл по id или имени.
+        """
+        return self._get(self.snapshot.skills, key)
+
+    def get_effect(self, key: uuid.UUID | str) -> EffectRecord:
+        """
+        Эффект по id или имени.
+        """
+        return self._get(self.snapshot.effects, key)
+
+    def get_buff(self, key: uuid.UUID | str) -> BuffRecord:
+        """
+        Баф по id или имени.
+        """
+        return self._get(self.snapshot.buffs, key)
+
+    def get_debuff(self, key: uuid.UUID | str) -> DebuffRecord:
+        """
+        Дебаф по id или имени.
+        """
+        return self._get(self.snapshot.debuffs, key)
+
+    @staticmethod
+    def _get(index: CatalogIndex, key: uuid.UUID | str) -> Any:
+        """
+        Поиск записи по id или имени.
+        """
+        record = index.by_id.get(key) if isinstance(key, uuid.UUID) else index.by_name.get(key)
+        if record is None:
+            msg = f"Catalog record {key} not found"
+            raise exceptions.PythonError(msg)
+        return record
+
+
+game_catalog = GameCatalog()
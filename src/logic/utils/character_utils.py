@@ -2,13 +2,29 @@
 Модуль содержит утилиты для работы с игроком.
 """
 
-import asyncio
 import uuid
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
+
+from logic.utils.catalog_utils import ClassRecord
+from logic.utils.catalog_utils import RaceRecord
+from logic.utils.catalog_utils import SkillRecord
+from logic.utils.catalog_utils import game_catalog
 from logic.utils.common_utils import call_or_await
 from managers.repository.main_manager import MainRepositoryManager
+from models import exceptions
 from models.constants.character import CHARACTER_MODEL_NAME
+from models.db.base import Character
+from models.db.base import Class
+from models.db.base import Race
+from models.db.base import Skill
+from models.repository.player.base import CharacterConfigurationModel
 from models.repository.player.base import CharacterRepositoryModel
+from models.repository.player.base import PlayerConfigurationModel
+from models.repository.player.base import PlayerRepositoryModel
 
 
 async def get_character(
@@ -41,9 +57,20 @@ async def get_characters(
     repository_connection: MainRepositoryManager = None,
 ) -> list[CharacterRepositoryModel]:
     """
-    Получение моделей персонажев.
+    Получение моделей персонажев за один запрос к репозиторию.
     """
-    return [await get_character(character_id, repository_connection) for character_id in character_repo_ids]
+    repository = MainRepositoryManager()
+    character_dicts = await call_or_await(
+        repository.get_many,
+        CHARACTER_MODEL_NAME,
+        character_repo_ids,
+        connection=repository_connection,
+    )
+    if None in character_dicts:
+        msg = "Invalid name or id"
+        raise exceptions.PythonError(msg)
+
+    return [CharacterRepositoryModel.model_validate(character_dict) for character_dict in character_dicts]
 
 
 async def update_character(
@@ -53,17 +80,41 @@ async def update_character(
 ) -> None:
     """
     Обновление информации о персонаже.
+    Если переданы to_update_params, в репозиторий отправляются только эти поля, иначе персонаж целиком.
+    Персонаж помечается измененным и позже записывается в базу данных фоновой задачей.
     """
     character_repo_id = get_character_repository_id(character)
     repository = MainRepositoryManager()
 
+    if not to_update_params:
+        await call_or_await(
+            repository.full_update,
+            CHARACTER_MODEL_NAME,
+            character_repo_id,
+            character,
+            connection=repository_connection,
+        )
+        await call_or_await(
+            repository.mark_dirty,
+            CHARACTER_MODEL_NAME,
+            [character_repo_id],
+            connection=repository_connection,
+        )
+        return
+
     for key, value in to_update_params.items():
         setattr(character, key, value)
     await call_or_await(
-        repository.full_update,
+        repository.update,
         CHARACTER_MODEL_NAME,
         character_repo_id,
-        character,
+        connection=repository_connection,
+        **character.model_dump(mode="json", include=set(to_update_params)),
+    )
+    await call_or_await(
+        repository.mark_dirty,
+        CHARACTER_MODEL_NAME,
+        [character_repo_id],
         connection=repository_connection,
     )
 
@@ -73,9 +124,22 @@ async def update_characters(
     repository_connection: MainRepositoryManager = None,
 ) -> None:
     """
-    Обновление информации о персонажах.
+    Обновление информации о персонажах за один запрос к репозиторию.
     """
-    await asyncio.gather(*[update_character(character, repository_connection) for character in characters])
+    repository = MainRepositoryManager()
+    characters_by_id = {get_character_repository_id(character): character for character in characters}
+    await call_or_await(
+        repository.set_many,
+        CHARACTER_MODEL_NAME,
+        characters_by_id,
+        connection=repository_connection,
+    )
+    await call_or_await(
+        repository.mark_dirty,
+        CHARACTER_MODEL_NAME,
+        list(characters_by_id),
+        connection=repository_connection,
+    )
 
 
 def get_character_repository_id(
@@ -103,6 +167,65 @@ def get_character_id_from_repository(character_repository_id: str) -> uuid:
     return uuid.UUID(character_repository_id.split(":")[1])
 
 
+def get_game_id_from_repository(character_repository_id: str) -> str:
+    """
+    Вычленяет id игры из id персонажа в репозитории.
+    """
+    return character_repository_id.split(":", 1)[0]
+
+
+async def get_game_character_ids(
+    game_id: uuid.UUID | str,
+    cursor: str | None = None,
+    count: int = 100,
+    repository_connection: MainRepositoryManager = None,
+) -> tuple[list[str], str | None]:
+    """
+    Страница id персонажей игры в репозитории по индексу.
+
+    :return: id персонажей в репозитории и курсор следующей страницы.
+    """
+    repository = MainRepositoryManager()
+    return await call_or_await(
+        repository.find_by_index,
+        CHARACTER_MODEL_NAME,
+        "game",
+        game_id,
+        cursor=cursor,
+        count=count,
+        connection=repository_connection,
+    )
+
+
+async def get_player_game_ids(
+    player_id: uuid.UUID | str,
+    cursor: str | None = None,
+    count: int = 100,
+    repository_connection: MainRepositoryManager = None,
+) -> tuple[list[str], str | None]:
+    """
+    Страница id активных игр игрока, то есть игр, персонажи которых есть в репозитории.
+    Персонажи одной игры идут в индексе подряд, поэтому курсор пропускает всех персонажей последней игры.
+
+    :return: id игр и курсор следующей страницы.
+    """
+    repository = MainRepositoryManager()
+    character_repo_ids, next_cursor = await call_or_await(
+        repository.find_by_index,
+        CHARACTER_MODEL_NAME,
+        "player",
+        player_id,
+        cursor=cursor,
+        count=count,
+        connection=repository_connection,
+    )
+    game_ids = list(dict.fromkeys(map(get_game_id_from_repository, character_repo_ids)))
+    if next_cursor is None:
+        return game_ids, None
+    # ";" следует за ":" в порядке символов, поэтому курсор больше любого id персонажа этой игры
+    return game_ids, f"{game_ids[-1]};"
+
+
 async def add_character_to_repository(
     character: CharacterRepositoryModel,
     repository_connection: MainRepositoryManager = None,
@@ -118,3 +241,122 @@ async def add_character_to_repository(
         get_character_repository_id(character=character),
         connection=repository_connection,
     )
+
+
+def _character_load_options(use_catalog: bool) -> list:
+    """
+    Опции жадной загрузки персонажа.
+    Число запросов не зависит от количества персонажей: с каталогом — 2, без каталога — 9.
+    """
+    if use_catalog:
+        return [
+            joinedload(Character.player),
+            selectinload(Character.skills).load_only(Skill.id),
+        ]
+    return [
+        joinedload(Character.player),
+        joinedload(Character.character_class).options(
+            selectinload(Class.effects),
+            selectinload(Class.buffs),
+            selectinload(Class.debuffs),
+        ),
+        joinedload(Character.race).options(
+            selectinload(Race.effects),
+            selectinload(Race.buffs),
+            selectinload(Race.debuffs),
+        ),
+        selectinload(Character.skills).selectinload(Skill.effects),
+    ]
+
+
+def character_to_model(
+    character: Character,
+    class_: ClassRecord,
+    race: RaceRecord,
+    skills: list[SkillRecord],
+) -> CharacterRepositoryModel:
+    """
+    Преобразование персонажа из базы данных в модель репозитория.
+    """
+    player = character.player
+    return CharacterRepositoryModel(
+        class_=class_.to_model(),
+        race=race.to_model(),
+        skills=[skill.to_model() for skill in skills],
+        player=PlayerRepositoryModel(
+            player_configuration=PlayerConfigurationModel(
+                uid=player.id,
+                username=player.username,
+                email=player.email,
+            ),
+            created_at=player.created_at,
+            updated_at=player.updated_at,
+        ),
+        character_configuration=CharacterConfigurationModel(
+            uid=character.id,
+            game_name=character.game_name,
+            experience=character.experience,
+            level=character.level,
+            health=character.health,
+            speed=character.speed,
+            stamina=character.stamina,
+            damage=character.damage,
+            armor=character.armor,
+            skill_points=character.skill_points,
+        ),
+        created_at=character.created_at,
+        updated_at=character.updated_at,
+    )
+
+
+async def load_characters(
+    session: AsyncSession,
+    player_id: uuid.UUID,
+    character_ids: list[uuid.UUID] | None = None,
+) -> list[CharacterRepositoryModel]:
+    """
+    Загрузка персонажей игрока из базы данных фиксированным числом запросов.
+    Если каталог игры загружен, классы, расы и скиллы берутся из него.
+
+    :param character_ids: Идентификаторы персонажей. Если не переданы, загружаются все персонажи игрока.
+    """
+    use_catalog = game_catalog.loaded
+    query = select(Character).where(Character.player_id == player_id).options(*_character_load_options(use_catalog))
+    if character_ids is not None:
+        query = query.where(Character.id.in_(character_ids))
+    characters = (await session.scalars(query)).unique().all()
+
+    if use_catalog:
+        return [
+            character_to_model(
+                character,
+                game_catalog.get_class(character.class_id),
+                game_catalog.get_race(character.race_id),
+                [game_catalog.get_skill(skill.id) for skill in character.skills],
+            )
+            for character in characters
+        ]
+    return [
+        character_to_model(
+            character,
+            ClassRecord.from_db(character.character_class),
+            RaceRecord.from_db(character.race),
+            [SkillRecord.from_db(skill) for skill in character.skills],
+        )
+        for character in characters
+    ]
+
+
+async def load_character(
+    session: AsyncSession,
+    player_id: uuid.UUID,
+    character_id: uuid.UUID,
+) -> CharacterRepositoryModel:
+    """
+    Загрузка одного персонажа игрока из базы данных.
+    """
+    characters = await load_characters(session, player_id, [character_id])
+    if not characters:
+        msg = "Character not found"
+        raise exceptions.PythonError(msg)
+    return characters[0]
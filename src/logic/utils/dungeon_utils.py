@@ -0,0 +1,184 @@
+"""
+Модуль содержит генератор этажей подземелья.
+
+Этаж строится двоичным разбиением пространства (BSP): карта делится на прямоугольники, в каждом
+прямоугольнике вырезается комната, а комнаты соединяются коридорами в порядке обхода дерева разбиения,
+поэтому все комнаты достижимы. Карта хранится в массиве NumPy по байту на клетку.
+Генератор детерминирован: одинаковые seed, глубина и сложность всегда дают один и тот же этаж,
+поэтому этажи не хранятся, а генерируются заново и кэшируются.
+"""
+
+from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+from itertools import pairwise
+
+import numpy as np
+
+from config.settings import settings
+from models import exceptions
+from models.constants.dungeon import Tile
+
+BASE_WIDTH = 48
+BASE_HEIGHT = 32
+MAX_WIDTH = 128
+MAX_HEIGHT = 96
+# Прирост размера карты с каждым уровнем глубины
+SIZE_PER_DEPTH = 4
+MAX_DIFFICULTY = 10
+MIN_ROOM_SIZE = 4
+
+
+@dataclass(frozen=True, slots=True)
+class Room:
+    """
+    Прямоугольная комната этажа.
+    """
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def center(self) -> tuple[int, int]:
+        """
+        Клетка в центре комнаты (x, y).
+        """
+        return self.x + self.width // 2, self.y + self.height // 2
+
+
+@dataclass(frozen=True, slots=True)
+class DungeonFloor:
+    """
+    Этаж подземелья. Карта доступна только для чтения, так как этаж может быть общим для нескольких игр.
+    Этаж однозначно задается seed, глубиной и сложностью, поэтому сравнение и хэш используют только их.
+    """
+
+    seed: int
+    depth: int
+    difficulty: int
+    tiles: np.ndarray = field(compare=False)
+    rooms: tuple[Room, ...] = field(compare=False)
+    entrance: tuple[int, int] = field(compare=False)
+    exit: tuple[int, int] = field(compare=False)
+
+    @property
+    def width(self) -> int:
+        """
+        Ширина карты.
+        """
+        return self.tiles.shape[1]
+
+    @property
+    def height(self) -> int:
+        """
+        Высота карты.
+        """
+        return self.tiles.shape[0]
+
+
+def split_space(rng: np.random.Generator, width: int, height: int, min_leaf: int) -> list[tuple[int, int, int, int]]:
+    """
+    Двоичное разбиение карты без внешних стен на прямоугольники (x, y, ширина, высота).
+    Прямоугольники возвращаются в порядке обхода дерева, соседние по порядку — соседние на карте.
+    """
+    leaves = []
+    stack = [(1, 1, width - 2, height - 2)]
+    while stack:
+        x, y, leaf_width, leaf_height = stack.pop()
+        split_vertical = leaf_width >= 2 * min_leaf
+        split_horizontal = leaf_height >= 2 * min_leaf
+        if not split_vertical and not split_horizontal:
+            leaves.append((x, y, leaf_width, leaf_height))
+            continue
+        if split_vertical and split_horizontal:
+            # Вытянутые прямоугольники делятся поперек, чтобы комнаты не получались узкими
+            if leaf_width > leaf_height * 1.25:
+                split_horizontal = False
+            elif leaf_height > leaf_width * 1.25:
+                split_vertical = False
+            else:
+                split_vertical = bool(rng.integers(2))
+
+        if split_vertical:
+            split = int(rng.integers(min_leaf, leaf_width - min_leaf + 1))
+            first = (x, y, split, leaf_height)
+            second = (x + split, y, leaf_width - split, leaf_height)
+        else:
+            split = int(rng.integers(min_leaf, leaf_height - min_leaf + 1))
+            first = (x, y, leaf_width, split)
+            second = (x, y + split, leaf_width, leaf_height - split)
+        stack.extend((second, first))
+    return leaves
+
+
+def place_room(rng: np.random.Generator, leaf: tuple[int, int, int, int]) -> Room:
+    """
+    Комната случайного размера внутри прямоугольника с отступом в одну клетку.
+    """
+    x, y, leaf_width, leaf_height = leaf
+    width = int(rng.integers(MIN_ROOM_SIZE, leaf_width - 1))
+    height = int(rng.integers(MIN_ROOM_SIZE, leaf_height - 1))
+    return Room(
+        x=x + int(rng.integers(1, leaf_width - width)),
+        y=y + int(rng.integers(1, leaf_height - height)),
+        width=width,
+        height=height,
+    )
+
+
+def carve_corridor(rng: np.random.Generator, tiles: np.ndarray, start: tuple[int, int], end: tuple[int, int]) -> None:
+    """
+    Коридор из двух отрезков между клетками. Клетки комнат не перезаписываются.
+    """
+    (x1, y1), (x2, y2) = start, end
+    corner = (x2, y1) if rng.integers(2) else (x1, y2)
+    for (ax, ay), (bx, by) in ((start, corner), (corner, end)):
+        segment = tiles[min(ay, by) : max(ay, by) + 1, min(ax, bx) : max(ax, bx) + 1]
+        segment[segment == Tile.wall] = Tile.corridor
+
+
+def generate_dungeon_floor(seed: int, depth: int, difficulty: int) -> DungeonFloor:
+    """
+    Генерация этажа подземелья.
+    С глубиной карта растет, со сложностью уменьшается минимальный размер области разбиения,
+    поэтому комнат становится больше, а сами они меньше.
+    """
+    if seed < 0 or depth < 1 or not 1 <= difficulty <= MAX_DIFFICULTY:
+        msg = f"Invalid dungeon parameters: seed={seed}, depth={depth}, difficulty={difficulty}"
+        raise exceptions.PythonError(msg)
+
+    rng = np.random.default_rng(np.random.SeedSequence((seed, depth, difficulty)))
+    width = min(MAX_WIDTH, BASE_WIDTH + depth * SIZE_PER_DEPTH)
+    height = min(MAX_HEIGHT, BASE_HEIGHT + depth * SIZE_PER_DEPTH)
+    min_leaf = max(MIN_ROOM_SIZE + 4, 16 - difficulty)
+
+    tiles = np.full((height, width), Tile.wall, dtype=np.uint8)
+    rooms = tuple(place_room(rng, leaf) for leaf in split_space(rng, width, height, min_leaf))
+    for room in rooms:
+        tiles[room.y : room.y + room.height, room.x : room.x + room.width] = Tile.floor
+    for previous, room in pairwise(rooms):
+        carve_corridor(rng, tiles, previous.center, room.center)
+
+    entrance, exit_ = rooms[0].center, rooms[-1].center
+    tiles[entrance[1], entrance[0]] = Tile.stairs_up
+    tiles[exit_[1], exit_[0]] = Tile.stairs_down
+    tiles.flags.writeable = False
+    return DungeonFloor(
+        seed=seed,
+        depth=depth,
+        difficulty=difficulty,
+        tiles=tiles,
+        rooms=rooms,
+        entrance=entrance,
+        exit=exit_,
+    )
+
+
+@lru_cache(maxsize=settings.dungeon_cache_size)
+def get_dungeon_floor(seed: int, depth: int, difficulty: int) -> DungeonFloor:
+    """
+    Этаж подземелья из кэша недавно сгенерированных этажей.
+    """
+    return generate_dungeon_floor(seed, depth, difficulty)
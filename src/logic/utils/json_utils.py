@@ -1,44 +1,142 @@
 """
 Модуль содержит функции для работы с JSON-данными.
+
+Сериализатор выбирается настройкой settings.serializer. UUID, даты, перечисления и pydantic модели
+кодируются за один проход, без повторной сериализации через jsonable_encoder.
 """
 
-import contextlib
+import datetime
 import json
-from collections.abc import Iterable
-from json import JSONDecodeError
+import uuid
+from decimal import Decimal
+from enum import Enum
+from typing import Any
 
-from fastapi.encoders import jsonable_encoder
-from pydantic_core._pydantic_core import PydanticSerializationError
+from pydantic import BaseModel
 
+from config.log_tools import logger
+from config.settings import settings
 from models.base import json_
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default_encoder(obj: Any) -> Any:
+    """
+    Преобразование типов, которые не поддерживаются сериализатором напрямую.
+    """
+    match obj:
+        case BaseModel():
+            return obj.model_dump(mode="json")
+        case uuid.UUID() | Decimal():
+            return str(obj)
+        case datetime.datetime() | datetime.date() | datetime.time():
+            return obj.isoformat()
+        case Enum():
+            return obj.value
+        case set() | frozenset() | tuple():
+            return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonSerializer:
+    """
+    Сериализатор на стандартном модуле json.
+    """
+
+    name = "json"
+
+    @staticmethod
+    def dumps(data: Any) -> json_:
+        """
+        Преобразует данные в формат JSON.
+        """
+        return json.dumps(data, default=default_encoder, separators=(",", ":"))
+
+    @staticmethod
+    def loads(data: json_ | bytes) -> Any:
+        """
+        Преобразует данные из формата JSON.
+        """
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    """
+    Сериализатор на orjson, нативно поддерживает UUID, даты и перечисления.
+    """
+
+    name = "orjson"
 
-def to_json(data: dict) -> json_:
+    @staticmethod
+    def dumps(data: Any) -> json_:
+        """
+        Преобразует данные в формат JSON.
+        """
+        return orjson.dumps(data, default=default_encoder, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(data: json_ | bytes) -> Any:
+        """
+        Преобразует данные из формата JSON.
+        """
+        return orjson.loads(data)
+
+
+serializers: dict[str, type[JsonSerializer | OrjsonSerializer]] = {JsonSerializer.name: JsonSerializer}
+if orjson is not None:
+    serializers[OrjsonSerializer.name] = OrjsonSerializer
+
+
+def get_serializer(name: str) -> type[JsonSerializer | OrjsonSerializer]:
+    """
+    Получение сериализатора по названию. Если он недоступен, используется стандартный json.
+    """
+    if name not in serializers:
+        logger.warning(f"Serializer {name} is not available, falling back to {JsonSerializer.name}")
+        return JsonSerializer
+    return serializers[name]
+
+
+serializer = get_serializer(settings.serializer)
+
+
+def to_json(data: Any) -> json_:
     """
     Преобразует данные в формат JSON.
     """
-    try:
-        return json.dumps(data)
-    except (TypeError, PydanticSerializationError):
-        correct_data = jsonable_encoder(data)
-        return json.dumps(correct_data)
+    return serializer.dumps(data)
 
 
-def from_json(data: json_) -> dict | str:
+def from_json(data: json_ | bytes) -> Any:
     """
-    Преобразует данные из формата JSON.
+    Преобразует данные из формата JSON за один проход.
+    Строка, не являющаяся JSON, возвращается как есть.
     """
-    if isinstance(data, json_):
-        with contextlib.suppress(JSONDecodeError):
-            data = json.loads(data)
-    if not isinstance(data, Iterable) or isinstance(data, str):
+    try:
+        return serializer.loads(data)
+    except ValueError:
         return data
 
-    if isinstance(data, dict):
-        for key, value in data.items():
-            data[key] = from_json(value)
-    elif isinstance(data, Iterable):
-        for i, value in enumerate(data):
-            data[i] = from_json(value)
 
-    return data
+class SocketJson:
+    """
+    Адаптер сериализатора для python-socketio, совместимый по интерфейсу с модулем json.
+    """
+
+    @staticmethod
+    def dumps(data: Any, *args: Any, **kwargs: Any) -> str:
+        """
+        Кодирование пакета SocketIO.
+        """
+        return serializer.dumps(data)
+
+    @staticmethod
+    def loads(data: str | bytes, *args: Any, **kwargs: Any) -> Any:
+        """
+        Декодирование пакета SocketIO.
+        """
+        return serializer.loads(data)
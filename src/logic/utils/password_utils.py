@@ -0,0 +1,123 @@
+"""
+Модуль хэширования и проверки паролей в ограниченном пуле воркеров.
+"""
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Any
+
+from passlib.context import CryptContext
+
+from config.settings import settings
+from models.exceptions import PasswordHasherBusyError
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash_password(password: str) -> str:
+    """
+    Хэширование пароля. Выполняется в воркере пула.
+    """
+    return pwd_context.hash(password)
+
+
+def _verify_password(password: str, hashed_password: str) -> bool:
+    """
+    Проверка пароля. Выполняется в воркере пула.
+    """
+    return pwd_context.verify(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Хэширование паролей вне event loop.
+
+    Задачи выполняются в пуле потоков или процессов. Если в очереди пула уже max_queue задач,
+    новые задачи отклоняются с PasswordHasherBusyError, а не накапливаются.
+    """
+
+    def __init__(self, executor_type: str, workers: int, max_queue: int) -> None:
+        self.executor_type = executor_type
+        self.workers = workers
+        self.max_queue = max_queue
+
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @cached_property
+    def executor(self) -> Executor:
+        """
+        Пул воркеров, создается при первом обращении.
+        """
+        if self.executor_type == "process":
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password_hasher")
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Количество задач, ожидающих свободного воркера.
+        """
+        return max(0, self._pending - self.workers)
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        """
+        Выполнение задачи в пуле с учетом ограничения очереди.
+        """
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusyError("Password hasher is overloaded")
+
+        self._pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self._pending -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """
+        Хэширование пароля.
+        """
+        return await self._run(_hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Проверка пароля.
+        """
+        return await self._run(_verify_password, password, hashed_password)
+
+    def stats(self) -> dict:
+        """
+        Статистика пула.
+        """
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "in_progress": min(self._pending, self.workers),
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """
+        Остановка пула.
+        """
+        if "executor" in self.__dict__:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            del self.executor
+
+
+password_hasher = PasswordHasher(
+    executor_type=settings.password_hash_executor,
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
@@ -0,0 +1,272 @@
+"""
+Модуль содержит отложенную запись состояния персонажей из репозитория в базу данных.
+
+Игровые изменения пишутся только в репозиторий и помечают персонажа как измененного.
+Фоновая задача периодически забирает измененных персонажей и записывает их в базу данных пачками.
+Забранные персонажи остаются в множестве обрабатываемых до записи, поэтому после падения процесса
+они возвращаются в множество измененных при следующем запуске.
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import column
+from sqlalchemy import update
+from sqlalchemy import values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.dml import Update
+
+from config.log_tools import logger
+from config.settings import settings
+from logic.utils.character_utils import get_character_id_from_repository
+from managers.repository.main_manager import MainRepositoryManager
+from models.constants.character import CHARACTER_MODEL_NAME
+from models.db.base import Character
+from models.db.base import SessionLocal
+from models.repository.player.base import CharacterRepositoryModel
+
+# Поля персонажа, которые переносятся в базу данных, и их типы
+CHARACTER_COLUMNS = {
+    "game_name": String,
+    "experience": Integer,
+    "level": Integer,
+    "health": Integer,
+    "speed": Integer,
+    "stamina": Integer,
+    "damage": Integer,
+    "armor": Integer,
+    "skill_points": Integer,
+}
+
+
+def get_character_row(character_repo_id: str, character_dict: dict) -> dict[str, Any]:
+    """
+    Строка для обновления персонажа в базе данных.
+    """
+    configuration = CharacterRepositoryModel.model_validate(character_dict).character_configuration
+    row = configuration.model_dump(include=set(CHARACTER_COLUMNS))
+    row["experience"] = int(row["experience"])
+    row["id"] = get_character_id_from_repository(character_repo_id)
+    return row
+
+
+def build_characters_values_update(rows: list[dict[str, Any]]) -> Update:
+    """
+    Запрос UPDATE ... FROM (VALUES ...), обновляющий персонажей одним запросом.
+    """
+    rows_values = values(
+        column("id", UUID(as_uuid=True)),
+        *(column(name, type_) for name, type_ in CHARACTER_COLUMNS.items()),
+        name="character_values",
+    ).data([(row["id"], *(row[name] for name in CHARACTER_COLUMNS)) for row in rows])
+    return (
+        update(Character)
+        .where(Character.id == rows_values.c.id)
+        .values({name: rows_values.c[name] for name in CHARACTER_COLUMNS})
+    )
+
+
+async def update_characters_values(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """
+    Обновление персонажей одним запросом UPDATE ... FROM (VALUES ...).
+    """
+    await session.execute(build_characters_values_update(rows))
+
+
+async def update_characters_executemany(session: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """
+    Обновление персонажей пакетным UPDATE по первичному ключу, для диалектов без VALUES в FROM.
+    """
+    await session.execute(update(Character), rows)
+
+
+update_by_dialect: dict[str, Callable] = {
+    "postgresql": update_characters_values,
+}
+
+
+class CharacterFlusher:
+    """
+    Отложенная запись измененных персонажей из репозитория в базу данных.
+
+    Если пачка не записалась, персонажи записываются по одному, чтобы одна ошибочная строка
+    не блокировала всю пачку. Персонажи, которые не удалось записать, снова помечаются измененными
+    после записи всех пачек, а после settings.write_behind_max_attempts неудачных попыток подряд
+    откладываются в карантин. Персонаж в карантине остается в множестве обрабатываемых и снова помечается
+    измененным через settings.write_behind_quarantine_interval.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal) -> None:
+        self._interval = settings.write_behind_interval
+        self._batch_size = settings.write_behind_batch_size
+        self._max_attempts = settings.write_behind_max_attempts
+        self._quarantine_interval = settings.write_behind_quarantine_interval
+        self._session_factory = session_factory
+        self._lock = asyncio.Lock()
+        # Количество неудачных попыток записи подряд по персонажам
+        self._attempts: dict[str, int] = {}
+        self._retry: list[str] = []
+        # Персонажи в карантине и моменты их повторной записи
+        self.quarantined: dict[str, float] = {}
+        self.flushed = 0
+        self.failed = 0
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Запись пачки персонажей в базу данных в одной транзакции.
+        """
+        async with self._session_factory() as session:
+            update_rows = update_by_dialect.get(session.get_bind().dialect.name, update_characters_executemany)
+            await update_rows(session, rows)
+            await session.commit()
+
+    async def _write_rows(self, rows: dict[str, dict[str, Any]]) -> list[str]:
+        """
+        Запись пачки персонажей. Если пачка не записалась, персонажи записываются по одному.
+
+        :return: Персонажи, которых не удалось записать.
+        """
+        try:
+            await self._write(list(rows.values()))
+        except Exception as e:
+            if len(rows) == 1:
+                logger.error(f"Failed to flush character {next(iter(rows))}: {e}")
+                return list(rows)
+            logger.warning(f"Failed to flush {len(rows)} characters, retrying one by one: {e}")
+        else:
+            return []
+
+        failed = []
+        for character_repo_id, row in rows.items():
+            try:
+                await self._write([row])
+            except Exception as e:
+                logger.error(f"Failed to flush character {character_repo_id}: {e}")
+                failed.append(character_repo_id)
+        return failed
+
+    def _fail(self, character_repo_ids: list[str]) -> None:
+        """
+        Учет неудачной записи персонажей: они будут записаны повторно или отложены в карантин.
+        """
+        self.failed += len(character_repo_ids)
+        for character_repo_id in character_repo_ids:
+            attempts = self._attempts.get(character_repo_id, 0) + 1
+            if attempts < self._max_attempts:
+                self._attempts[character_repo_id] = attempts
+                self._retry.append(character_repo_id)
+                continue
+            self._attempts.pop(character_repo_id, None)
+            self.quarantined[character_repo_id] = time.monotonic() + self._quarantine_interval
+            logger.error(
+                f"Character {character_repo_id} is quarantined for {self._quarantine_interval}s "
+                f"after {attempts} failed flushes"
+            )
+
+    def _release_quarantined(self) -> None:
+        """
+        Возврат на запись персонажей, у которых истек карантин. Следующая неудача снова откладывает их в карантин.
+        """
+        now = time.monotonic()
+        for character_repo_id in [id for id, retry_at in self.quarantined.items() if retry_at <= now]:
+            del self.quarantined[character_repo_id]
+            self._attempts[character_repo_id] = self._max_attempts - 1
+            self._retry.append(character_repo_id)
+            logger.warning(f"Retrying quarantined character {character_repo_id}")
+
+    async def flush_batch(self) -> int:
+        """
+        Запись одной пачки измененных персонажей.
+        Если репозиторий недоступен, вся пачка снова помечается измененной.
+        Записанные и удаленные из репозитория персонажи удаляются из множества обрабатываемых.
+
+        :return: Количество извлеченных из множества персонажей.
+        """
+        repository = MainRepositoryManager()
+        character_repo_ids = await repository.pop_dirty(CHARACTER_MODEL_NAME, self._batch_size)
+        if not character_repo_ids:
+            return 0
+
+        try:
+            character_dicts = await repository.get_many(CHARACTER_MODEL_NAME, character_repo_ids)
+        except Exception:
+            self.failed += len(character_repo_ids)
+            await repository.mark_dirty(CHARACTER_MODEL_NAME, character_repo_ids)
+            await repository.ack_dirty(CHARACTER_MODEL_NAME, character_repo_ids)
+            raise
+
+        rows = {}
+        failed = []
+        missing = []
+        for character_repo_id, character_dict in zip(character_repo_ids, character_dicts, strict=True):
+            # Персонаж в карантине остается в множестве обрабатываемых до его окончания
+            if character_repo_id in self.quarantined:
+                continue
+            if character_dict is None:
+                missing.append(character_repo_id)
+                continue
+            try:
+                rows[character_repo_id] = get_character_row(character_repo_id, character_dict)
+            except Exception as e:
+                logger.error(f"Invalid character {character_repo_id}: {e}")
+                failed.append(character_repo_id)
+        if rows:
+            failed.extend(await self._write_rows(rows))
+
+        flushed = rows.keys() - set(failed)
+        for character_repo_id in flushed:
+            self._attempts.pop(character_repo_id, None)
+        self.flushed += len(flushed)
+        self._fail(failed)
+        await repository.ack_dirty(CHARACTER_MODEL_NAME, [*missing, *flushed])
+        return len(character_repo_ids)
+
+    async def flush(self) -> None:
+        """
+        Запись всех измененных персонажей.
+        Неудачно записанные персонажи и персонажи с истекшим карантином помечаются измененными
+        только после всех пачек, чтобы повторная попытка была уже при следующей записи.
+        """
+        async with self._lock:
+            self._release_quarantined()
+            try:
+                while await self.flush_batch() == self._batch_size:
+                    ...
+            finally:
+                if self._retry:
+                    retry, self._retry = self._retry, []
+                    repository = MainRepositoryManager()
+                    await repository.mark_dirty(CHARACTER_MODEL_NAME, retry)
+                    await repository.ack_dirty(CHARACTER_MODEL_NAME, retry)
+
+    async def run(self) -> None:
+        """
+        Фоновая задача: возвращает персонажей, не записанных до прошлой остановки, в множество измененных
+        и записывает измененных персонажей с заданным интервалом.
+        """
+        try:
+            if restored := await MainRepositoryManager().restore_dirty(CHARACTER_MODEL_NAME):
+                logger.warning(f"Restored {restored} characters left unflushed by a previous run")
+        except Exception as e:
+            logger.error(f"Failed to restore unflushed characters: {e}")
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush characters: {e}")
+
+    def stats(self) -> dict[str, int]:
+        """
+        Статистика отложенной записи.
+        """
+        return {"flushed": self.flushed, "failed": self.failed, "quarantined": len(self.quarantined)}
+
+
+character_flusher = CharacterFlusher()
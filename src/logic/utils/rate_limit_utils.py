@@ -0,0 +1,88 @@
+"""
+Модуль содержит ограничение частоты сообщений SocketIO клиентов по алгоритму token bucket.
+"""
+
+import time
+
+from config.settings import settings
+
+
+class TokenBucket:
+    """
+    Корзина токенов: пополняется с постоянной скоростью до заданной емкости, каждое сообщение забирает токен.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def consume(self, now: float) -> bool:
+        """
+        Попытка забрать токен.
+
+        :return: False, если токенов нет и сообщение нужно отбросить.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class ActionRateLimiter:
+    """
+    Ограничение частоты действий: общая корзина на соединение и отдельные корзины на действия,
+    для которых при регистрации указан свой лимит.
+    """
+
+    def __init__(self) -> None:
+        self._rate = settings.socket_rate_limit
+        self._burst = settings.socket_rate_burst
+        self._connections: dict[str, TokenBucket] = {}
+        self._actions: dict[str, dict[str, TokenBucket]] = {}
+        self.dropped = 0
+
+    def allow_connection(self, sid: str) -> bool:
+        """
+        Проверка общего лимита соединения. Выполняется до разбора сообщения.
+        """
+        if not self._rate:
+            return True
+        bucket = self._connections.get(sid)
+        if bucket is None:
+            bucket = self._connections[sid] = TokenBucket(self._rate, self._burst)
+        if bucket.consume(time.monotonic()):
+            return True
+        self.dropped += 1
+        return False
+
+    def allow_action(self, sid: str, action: str, rate: float, burst: int) -> bool:
+        """
+        Проверка лимита конкретного действия соединения.
+        """
+        buckets = self._actions.setdefault(sid, {})
+        bucket = buckets.get(action)
+        if bucket is None:
+            bucket = buckets[action] = TokenBucket(rate, burst)
+        return bucket.consume(time.monotonic())
+
+    def remove(self, sid: str) -> None:
+        """
+        Удаление корзин отключившегося клиента.
+        """
+        self._connections.pop(sid, None)
+        self._actions.pop(sid, None)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Статистика ограничения частоты.
+        """
+        return {"connections": len(self._connections), "dropped": self.dropped}
+
+
+action_rate_limiter = ActionRateLimiter()
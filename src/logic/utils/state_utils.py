@@ -0,0 +1,45 @@
+"""
+Модуль содержит утилиты для вычисления и применения изменений состояния игры.
+
+Изменение — вложенный словарь, содержащий только изменившиеся ключи.
+Удаленные ключи отмечаются значением DELETED.
+"""
+
+from typing import Any
+
+DELETED = "$deleted"
+
+
+def diff_state(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """
+    Вычисляет изменение между двумя состояниями.
+    Вложенные словари сравниваются рекурсивно, остальные значения передаются целиком.
+    """
+    delta = {}
+    for key, value in new.items():
+        if key not in old:
+            delta[key] = value
+            continue
+        old_value = old[key]
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            if nested := diff_state(old_value, value):
+                delta[key] = nested
+        elif value != old_value:
+            delta[key] = value
+    for key in old.keys() - new.keys():
+        delta[key] = DELETED
+    return delta
+
+
+def apply_delta(state: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    """
+    Применяет изменение к состоянию на месте.
+    """
+    for key, value in delta.items():
+        if value == DELETED:
+            state.pop(key, None)
+        elif isinstance(value, dict) and isinstance(state.get(key), dict):
+            apply_delta(state[key], value)
+        else:
+            state[key] = value
+    return state
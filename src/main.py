@@ -18,7 +18,8 @@ def main() -> None:
 @click.option("--release", is_flag=True, help="Run in release mode")
 @click.option("--log-level", default="info", help="Log level")
 @click.option("--reload", is_flag=True, help="Enable auto-reload")
-def server(release: str, log_level: str, reload: bool) -> None:
+@click.option("--workers", default=None, type=int, help="Number of worker processes")
+def server(release: str, log_level: str, reload: bool, workers: int | None) -> None:
     """
     Start the server.
     """
@@ -29,6 +30,12 @@ def server(release: str, log_level: str, reload: bool) -> None:
 
     from config.settings import settings
 
+    workers = workers or settings.workers
+    shared_repository = not settings.local_db or settings.local_db_backend == "shared"
+    if workers > 1 and not (shared_repository and settings.socket_redis_manager):
+        msg = "Several workers require socket_redis_manager=True and local_db=False or local_db_backend=shared"
+        raise click.UsageError(msg)
+
     uvicorn_config = {
         "app": "config.app:server_init",
         "host": settings.host,
@@ -36,6 +43,7 @@ def server(release: str, log_level: str, reload: bool) -> None:
         "log_level": log_level,
         "reload": reload,
         "factory": True,
+        "workers": workers,
     }
 
     uvicorn.run(**uvicorn_config)
@@ -73,9 +81,90 @@ def tests(enable_warnings: bool) -> None:
     pytest.main(args)
 
 
+@click.group(help="Run the benchmarks")
+def benchmark() -> None:
+    """
+    Run the benchmarks.
+    """
+
+
+@benchmark.command(name="auth", help="Benchmark the authentication routes")
+@click.option("--concurrency", default="1,10,50", help="Comma separated concurrency levels")
+@click.option("--requests", "requests_count", default=200, help="Requests per route and concurrency level")
+@click.option("--bcrypt-rounds", default=None, type=int, help="Override the bcrypt cost")
+def benchmark_auth(concurrency: str, requests_count: int, bcrypt_rounds: int | None) -> None:
+    """
+    Benchmark /register, /login, /me and /logout.
+    """
+    click.echo("Running authentication benchmark...")
+    logger.info("Running authentication benchmark...")
+
+    import asyncio
+
+    from benchmarks.auth import run_auth_benchmark
+    from benchmarks.utils import format_results
+
+    concurrency_levels = [int(level) for level in concurrency.split(",")]
+    results = asyncio.run(run_auth_benchmark(concurrency_levels, requests_count, bcrypt_rounds))
+    click.echo(format_results(results))
+
+
+@benchmark.command(name="serialization", help="Benchmark the character serialization")
+@click.option("--iterations", default=2000, help="Operations per serializer")
+def benchmark_serialization(iterations: int) -> None:
+    """
+    Compare the serializers on a character document.
+    """
+    click.echo("Running serialization benchmark...")
+    logger.info("Running serialization benchmark...")
+
+    from benchmarks.serialization import run_serialization_benchmark
+    from benchmarks.utils import format_results
+
+    click.echo(format_results(run_serialization_benchmark(iterations)))
+
+
+@benchmark.command(name="dungeon", help="Benchmark the dungeon floor generation")
+@click.option("--iterations", default=500, help="Floors per scenario")
+def benchmark_dungeon(iterations: int) -> None:
+    """
+    Measure the generated and cached dungeon floors per second.
+    """
+    click.echo("Running dungeon benchmark...")
+    logger.info("Running dungeon benchmark...")
+
+    from benchmarks.dungeon import run_dungeon_benchmark
+    from benchmarks.utils import format_results
+
+    click.echo(format_results(run_dungeon_benchmark(iterations)))
+
+
+@click.command(name="reload-catalog", help="Reload the game catalog in all workers")
+def reload_catalog() -> None:
+    """
+    Bump the game catalog version.
+    """
+    import asyncio
+
+    from logic.utils.catalog_utils import game_catalog
+    from managers.repository.main_manager import MainRepositoryManager
+
+    async def bump() -> int:
+        try:
+            return await game_catalog.bump_version()
+        finally:
+            await MainRepositoryManager().close()
+
+    version = asyncio.run(bump())
+    click.echo(f"Catalog version bumped to {version}")
+    logger.info(f"Catalog version bumped to {version}")
+
+
 main.add_command(server)
 main.add_command(client)
 main.add_command(tests)
+main.add_command(benchmark)
+main.add_command(reload_catalog)
 
 
 if __name__ == "__main__":
@@ -2,25 +2,150 @@
 Модуль, содержащий инструменты для связывания SocketIO сообщений с обработчиками.
 """
 
+import time
 from collections.abc import Callable
+from typing import Any
 
+from pydantic import BaseModel
+from pydantic import TypeAdapter
 
-class ActionRoutes(dict):
+from models.base import ActionRequestModel
+from models.base import ActionResponseModel
+
+
+class ActionRoute:
+    """
+    Обработчик действия с валидаторами, подготовленными при регистрации, и счетчиками вызовов.
+    """
+
+    __slots__ = (
+        "burst",
+        "calls",
+        "coalesce",
+        "dropped",
+        "errors",
+        "handler",
+        "max_time",
+        "name",
+        "rate_limit",
+        "request_adapter",
+        "response_adapter",
+        "total_time",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable,
+        request_model: type[BaseModel] | None = None,
+        response_model: type[BaseModel] | None = None,
+        rate_limit: float | None = None,
+        burst: int | None = None,
+        coalesce: bool = False,
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.request_adapter = TypeAdapter(request_model) if request_model else None
+        self.response_adapter = TypeAdapter(response_model) if response_model else None
+        self.rate_limit = rate_limit
+        self.burst = burst or max(1, int(rate_limit or 1))
+        self.coalesce = coalesce
+        self.calls = 0
+        self.dropped = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    async def __call__(self, sid: str, data: Any) -> Any:
+        """
+        Валидация данных запроса, вызов обработчика и валидация его ответа.
+        """
+        started = time.perf_counter()
+        try:
+            if self.request_adapter is not None:
+                data = self.request_adapter.validate_python(data)
+            result = await self.handler(sid, data)
+            if self.response_adapter is not None:
+                result = self.response_adapter.dump_python(self.response_adapter.validate_python(result), mode="json")
+            return result
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.calls += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Статистика вызовов действия.
+        """
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "avg_ms": self.total_time / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max_time * 1000,
+        }
+
+
+class ActionRoutes(dict[str, ActionRoute]):
     """
     Класс для управления SocketIO маршрутами. Является словарем,
-    где ключом является 'action' из JSON, а значением — функция, обрабатывающая это действие.
+    где ключом является 'action' из JSON, а значением — обработчик этого действия.
     """
 
-    def register_action(self, action_name: str) -> Callable:
+    request_adapter = TypeAdapter(ActionRequestModel)
+    response_adapter = TypeAdapter(ActionResponseModel)
+
+    def register_action(
+        self,
+        action_name: str,
+        request_model: type[BaseModel] | None = None,
+        response_model: type[BaseModel] | None = None,
+        rate_limit: float | None = None,
+        burst: int | None = None,
+        coalesce: bool = False,
+    ) -> Callable:
         """
         Декоратор для регистрации действия по его названию.
+
+        :param request_model: Модель данных запроса. Если передана, обработчик получает экземпляр модели.
+        :param response_model: Модель ответа обработчика.
+        :param rate_limit: Количество действий в секунду от одного клиента, лишние действия отбрасываются.
+        :param burst: Количество действий, которое клиент может отправить сразу. По умолчанию равно rate_limit.
+        :param coalesce: В игровой комнате из нескольких действий клиента за тик применяется только последнее.
         """
 
         def decorator(func: Callable):
-            self[action_name] = func
+            self[action_name] = ActionRoute(
+                action_name, func, request_model, response_model, rate_limit, burst, coalesce
+            )
             return func
 
         return decorator
 
+    def parse_request(self, message: Any) -> ActionRequestModel:
+        """
+        Валидация входящего сообщения. Суффикс _client отбрасывается из названия действия.
+        """
+        return self.request_adapter.validate_python(message)
+
+    def build_response(self, action_name: str, data: Any) -> dict:
+        """
+        Формирование исходящего сообщения. К названию действия добавляется суффикс _server.
+        """
+        return self.response_adapter.dump_python(
+            self.response_adapter.validate_python({"action": action_name, "data": data}),
+            mode="json",
+        )
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        Статистика вызовов по действиям.
+        """
+        return {name: route.stats() for name, route in self.items()}
+
 
 action_routes = ActionRoutes()
@@ -0,0 +1,608 @@
+"""
+Модуль содержит серверный игровой цикл с фиксированным шагом.
+
+Каждая игровая комната работает в своей asyncio задаче. Действия клиентов не обрабатываются сразу,
+а попадают в ограниченную очередь комнаты и применяются в начале ближайшего тика.
+Изменения состояния рассылаются один раз за тик в комнату SocketIO: пакет кодируется один раз
+и отправляется всем игрокам и наблюдателям. Периодически рассылается полное состояние.
+Комнаты и соединения регистрируются в общем хранилище, поэтому клиенты комнаты могут быть
+подключены к разным процессам и узлам.
+"""
+
+import asyncio
+import contextlib
+import time
+import uuid
+from copy import deepcopy
+from functools import cached_property
+from typing import Any
+
+import socketio
+from redis.asyncio import Redis
+
+from config.log_tools import logger
+from config.settings import settings
+from logic.utils.json_utils import from_json
+from logic.utils.json_utils import to_json
+from logic.utils.state_utils import diff_state
+from managers.actions.action_routes import action_routes
+from managers.repository.redis_pool import get_redis_client
+from managers.socket_store import WORKER_ID
+from managers.socket_store import decode
+from managers.socket_store import socket_store
+from models import exceptions
+from models.constants.game import GameMode
+from models.constants.socket import SocketRole
+
+
+class TickStatistics:
+    """
+    Статистика тиков комнаты.
+    """
+
+    def __init__(self) -> None:
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.dropped_inputs = 0
+        self.coalesced_inputs = 0
+        self.processed_inputs = 0
+        self.deltas = 0
+        self.keyframes = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+
+    def add_tick(self, duration: float, timestep: float) -> None:
+        """
+        Учет выполненного тика.
+        """
+        self.ticks += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        if duration > timestep:
+            self.overruns += 1
+
+    def stats(self) -> dict[str, float]:
+        """
+        Статистика в виде словаря.
+        """
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "dropped_inputs": self.dropped_inputs,
+            "coalesced_inputs": self.coalesced_inputs,
+            "processed_inputs": self.processed_inputs,
+            "deltas": self.deltas,
+            "keyframes": self.keyframes,
+            "avg_tick_ms": self.total_duration / self.ticks * 1000 if self.ticks else 0.0,
+            "max_tick_ms": self.max_duration * 1000,
+        }
+
+
+class GameRoom:
+    """
+    Игровая комната с собственным игровым циклом.
+    """
+
+    def __init__(self, manager: "GameRoomManager", mode: GameMode, max_players: int) -> None:
+        self.room_id = str(uuid.uuid4())
+        self.mode = mode
+        self.max_players = max_players
+        self.manager = manager
+
+        self.timestep = 1 / settings.game_tick_rate
+        self.tick = 0
+        self.players: set[str] = set()
+        self.observers: set[str] = set()
+        self.state: dict[str, Any] = {"players": {}}
+        self.statistics = TickStatistics()
+
+        self._inputs: asyncio.Queue[tuple[str, str, dict | None]] = asyncio.Queue(
+            maxsize=settings.game_input_queue_size
+        )
+        # Последние данные объединяемых действий, ожидающих тика. В очереди для них хранится только место
+        self._coalesced: dict[tuple[str, str], dict] = {}
+        self._synced_state: dict[str, Any] = {}
+        self._keyframe_tick = 0
+        self._idle_since: float | None = time.monotonic()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """
+        Запуск игрового цикла комнаты.
+        """
+        self._task = asyncio.create_task(self.run(), name=f"game-room-{self.room_id}")
+
+    async def stop(self) -> None:
+        """
+        Остановка игрового цикла комнаты.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    def add_player(self, sid: str) -> None:
+        """
+        Добавление игрока в комнату.
+        """
+        self.players.add(sid)
+        self.state["players"][sid] = {}
+        self._idle_since = None
+
+    def add_observer(self, sid: str) -> None:
+        """
+        Добавление наблюдателя в комнату.
+        """
+        self.observers.add(sid)
+
+    def remove(self, sid: str) -> None:
+        """
+        Удаление игрока или наблюдателя из комнаты.
+        """
+        self.observers.discard(sid)
+        if sid in self.players:
+            self.players.remove(sid)
+            self.state["players"].pop(sid, None)
+        if not self.players and self._idle_since is None:
+            self._idle_since = time.monotonic()
+
+    def submit(self, sid: str, action: str, data: dict) -> bool:
+        """
+        Постановка действия игрока в очередь комнаты.
+
+        Для объединяемых действий повторное действие до тика заменяет данные уже стоящего в очереди.
+
+        :return: False, если очередь переполнена и действие отброшено.
+        """
+        route = action_routes.get(action)
+        coalesce = route is not None and route.coalesce
+        if coalesce and (sid, action) in self._coalesced:
+            self._coalesced[sid, action] = data
+            self.statistics.coalesced_inputs += 1
+            return True
+        try:
+            self._inputs.put_nowait((sid, action, None if coalesce else data))
+        except asyncio.QueueFull:
+            self.statistics.dropped_inputs += 1
+            return False
+        if coalesce:
+            self._coalesced[sid, action] = data
+        return True
+
+    async def _apply_inputs(self) -> None:
+        """
+        Применение накопленных за тик действий.
+        Обрабатываются только действия, поступившие до начала тика.
+        """
+        for _ in range(self._inputs.qsize()):
+            sid, action, data = self._inputs.get_nowait()
+            if data is None:
+                data = self._coalesced.pop((sid, action))
+            if sid not in self.players:
+                continue
+            try:
+                result = await action_routes[action](sid, data)
+            except Exception as e:
+                logger.error(f"Room {self.room_id} failed to apply {action} from {sid}: {e}")
+                continue
+            self.statistics.processed_inputs += 1
+            if isinstance(result, dict):
+                self.state["players"][sid].update(result)
+
+    async def send_keyframe(self, sid: str | None = None) -> None:
+        """
+        Отправка полного состояния комнаты.
+
+        :param sid: Клиент, которому нужно восстановить синхронизацию. Если не передан, состояние рассылается
+            всей комнате, и следующие изменения считаются от него.
+        """
+        if sid is None:
+            self._synced_state = deepcopy(self.state)
+            self._keyframe_tick = self.tick
+        message = {"room_id": self.room_id, "tick": self.tick, "state": self._synced_state}
+        await self.manager.emit("keyframe", message, to=sid or self.room_id)
+        self.statistics.keyframes += 1
+
+    async def _broadcast(self) -> None:
+        """
+        Рассылка изменений состояния с прошлого тика, или полного состояния, если подошло время ключевого кадра.
+        Игроки и наблюдатели находятся в одной комнате SocketIO, поэтому сообщение кодируется один раз.
+        """
+        if self.tick - self._keyframe_tick >= settings.game_keyframe_interval:
+            await self.send_keyframe()
+            return
+        if not (delta := diff_state(self._synced_state, self.state)):
+            return
+        self._synced_state = deepcopy(self.state)
+        message = {"room_id": self.room_id, "tick": self.tick, "delta": delta}
+        await self.manager.emit("delta", message, to=self.room_id)
+        self.statistics.deltas += 1
+
+    async def step(self) -> None:
+        """
+        Один шаг симуляции: применение действий и рассылка изменений.
+        """
+        self.tick += 1
+        await self._apply_inputs()
+        await self._broadcast()
+
+    async def run(self) -> None:
+        """
+        Игровой цикл с фиксированным шагом.
+        Если тик не уложился в шаг, пропущенные тики не навёрстываются, чтобы не накапливать отставание.
+        """
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            started = loop.time()
+            try:
+                await self.step()
+            except Exception as e:
+                logger.error(f"Room {self.room_id} tick {self.tick} failed: {e}")
+            finished = loop.time()
+            self.statistics.add_tick(finished - started, self.timestep)
+
+            if self._idle_since is not None and time.monotonic() - self._idle_since > settings.game_room_idle_timeout:
+                await self.manager.remove_room(self)
+                return
+
+            next_tick += self.timestep
+            if finished > next_tick:
+                skipped = int((finished - next_tick) // self.timestep) + 1
+                self.statistics.skipped_ticks += skipped
+                next_tick += skipped * self.timestep
+            await asyncio.sleep(next_tick - finished)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Статистика комнаты.
+        """
+        return {
+            "room_id": self.room_id,
+            "mode": self.mode,
+            "players": len(self.players),
+            "observers": len(self.observers),
+            "queue_depth": self._inputs.qsize(),
+            **self.statistics.stats(),
+        }
+
+
+class GameRoomManager:
+    """
+    Менеджер игровых комнат.
+
+    Комната принадлежит процессу, который ее создал: только он выполняет ее игровой цикл.
+    Владелец комнаты записывается в общее хранилище, а подключение клиентов, их действия и запросы
+    синхронизации, пришедшие в другие процессы, пересылаются владельцу через канал редиса.
+    Работающий процесс периодически обновляет свою отметку со временем жизни. Комната, отметки владельца
+    которой нет, считается оставленной упавшим процессом и удаляется из общего хранилища.
+    """
+
+    def __init__(self) -> None:
+        self.rooms: dict[str, GameRoom] = {}
+        self.sid_rooms: dict[str, str] = {}
+        self.forwarded_messages = 0
+        self.server: socketio.AsyncServer | None = None
+        self.namespace: str | None = None
+        # Процессы-владельцы комнат других процессов, пока комнаты есть в общем хранилище
+        self._owners: dict[str, str] = {}
+        # Время последней проверки отметок других процессов
+        self._live_workers: dict[str, float] = {}
+
+    @cached_property
+    def connection(self) -> Any:
+        """
+        Подключение к общему хранилищу комнат.
+        """
+        return get_redis_client()
+
+    @cached_property
+    def message_connection(self) -> Any:
+        """
+        Подключение к каналам пересылки сообщений между процессами.
+        Локальное хранилище не поддерживает каналы, поэтому при нем используется отдельный клиент редиса.
+        """
+        if settings.local_db:
+            return Redis.from_url(settings.redis_url)
+        return self.connection
+
+    @staticmethod
+    def _room_key(room_id: str) -> str:
+        return f"game_room:{room_id}"
+
+    @staticmethod
+    def _open_rooms_key(mode: GameMode) -> str:
+        return f"game_rooms:{mode}"
+
+    @staticmethod
+    def _channel(worker_id: str) -> str:
+        return f"game_worker:{worker_id}"
+
+    @staticmethod
+    def _worker_key(worker_id: str) -> str:
+        return f"game_worker:{worker_id}"
+
+    def bind(self, server: socketio.AsyncServer, namespace: str) -> None:
+        """
+        Привязка сервера SocketIO, через который комнаты общаются с клиентами.
+        """
+        self.server = server
+        self.namespace = namespace
+
+    async def emit(self, event: str, data: Any, to: str) -> None:
+        """
+        Отправка сообщения клиенту или комнате SocketIO.
+        """
+        await self.server.emit(event, data, to=to, namespace=self.namespace)
+
+    async def _get_room_info(self, room_id: str | None) -> dict[str, str]:
+        """
+        Данные комнаты из общего хранилища: владелец, режим и количество мест.
+        """
+        if room_id is None:
+            return {}
+        fields = await self.connection.hgetall(self._room_key(room_id))
+        room_info = {decode(key): decode(value) for key, value in fields.items()}
+        if room_info and not await self._is_worker_alive(room_info["owner"]):
+            await self._remove_dead_room(room_id, room_info)
+            room_info = {}
+        if room_info:
+            self._owners[room_id] = room_info["owner"]
+        else:
+            self._owners.pop(room_id, None)
+        return room_info
+
+    async def _get_owner(self, room_id: str | None) -> str | None:
+        """
+        Процесс-владелец комнаты, None — если комната удалена.
+        Для известного владельца проверяется только наличие комнаты в общем хранилище и его отметка.
+        """
+        if room_id is None:
+            return None
+        if room_id in self.rooms:
+            return WORKER_ID
+        if (owner := self._owners.get(room_id)) is not None:
+            if not await self.connection.exists(self._room_key(room_id)):
+                del self._owners[room_id]
+                return None
+            if await self._is_worker_alive(owner):
+                return owner
+        return (await self._get_room_info(room_id)).get("owner")
+
+    async def _is_worker_alive(self, worker_id: str) -> bool:
+        """
+        Есть ли отметка процесса. Наличие отметки другого процесса перепроверяется через треть ее времени жизни.
+        """
+        if worker_id == WORKER_ID:
+            return True
+        checked_at = self._live_workers.get(worker_id)
+        if checked_at is not None and time.monotonic() - checked_at < settings.game_worker_ttl / 3:
+            return True
+        if not await self.connection.exists(self._worker_key(worker_id)):
+            self._live_workers.pop(worker_id, None)
+            return False
+        self._live_workers[worker_id] = time.monotonic()
+        return True
+
+    async def _remove_dead_room(self, room_id: str, room_info: dict[str, str]) -> None:
+        """
+        Удаление из общего хранилища комнаты процесса, завершившегося без ее удаления.
+        """
+        logger.warning(f"Room {room_id} owner {room_info['owner']} is gone, removing the room")
+        await self.connection.delete(self._room_key(room_id))
+        await self.connection.srem(self._open_rooms_key(room_info["mode"]), room_id)
+        await socket_store.clear(room_id)
+
+    async def heartbeat(self) -> None:
+        """
+        Обновление отметки текущего процесса, по которой другие процессы узнают, что его комнаты работают.
+        """
+        await self.connection.setex(self._worker_key(WORKER_ID), settings.game_worker_ttl, 1)
+
+    async def create_room(self, mode: GameMode, max_players: int | None = None) -> GameRoom:
+        """
+        Создание комнаты в текущем процессе и запуск ее игрового цикла.
+        """
+        room = GameRoom(self, mode, max_players or settings.game_max_players)
+        await self.heartbeat()
+        self.rooms[room.room_id] = room
+        await self.connection.hset(
+            self._room_key(room.room_id),
+            mapping={"owner": WORKER_ID, "mode": mode, "max_players": room.max_players},
+        )
+        if room.max_players > 1:
+            await self.connection.sadd(self._open_rooms_key(mode), room.room_id)
+        room.start()
+        logger.info(f"Room {room.room_id} ({mode}) started on {WORKER_ID}")
+        return room
+
+    async def find_or_create_room(self, mode: GameMode) -> str:
+        """
+        Поиск комнаты режима со свободными местами в любом процессе, или создание новой в текущем.
+        """
+        for room_id in map(decode, await self.connection.smembers(self._open_rooms_key(mode))):
+            room_info = await self._get_room_info(room_id)
+            if not room_info:
+                await self.connection.srem(self._open_rooms_key(mode), room_id)
+                continue
+            if await socket_store.count_players(room_id) < int(room_info["max_players"]):
+                return room_id
+        return (await self.create_room(mode)).room_id
+
+    def get_room(self, room_id: str) -> GameRoom | None:
+        """
+        Комната текущего процесса по идентификатору.
+        """
+        return self.rooms.get(room_id)
+
+    def get_sid_room(self, sid: str) -> str | None:
+        """
+        Комната, в которой находится клиент, подключенный к текущему процессу.
+        """
+        return self.sid_rooms.get(sid)
+
+    async def join(self, room_id: str, sid: str, observer: bool = False) -> None:
+        """
+        Добавление клиента в комнату. Клиент может находиться только в одной комнате.
+        Место игрока резервируется до выхода из прежней комнаты, поэтому при отказе клиент в ней остается.
+        Клиент сразу получает полное состояние комнаты.
+        """
+        room_info = await self._get_room_info(room_id)
+        if not room_info:
+            msg = "Room not found"
+            raise exceptions.PythonError(msg)
+        if self.sid_rooms.get(sid) == room_id:
+            await self.leave(sid)
+        if not observer and not await socket_store.reserve_player(room_id, int(room_info["max_players"])):
+            msg = "Room is full"
+            raise exceptions.PythonError(msg)
+
+        await self.leave(sid)
+        await socket_store.add_connection(sid, SocketRole.OBSERVER if observer else SocketRole.PLAYER, room_id)
+        self.sid_rooms[sid] = room_id
+        await self.server.enter_room(sid, room_id, namespace=self.namespace)
+        await self._dispatch(room_info["owner"], {"type": "join", "room_id": room_id, "sid": sid, "observer": observer})
+
+    async def leave(self, sid: str) -> None:
+        """
+        Удаление клиента из его комнаты.
+        """
+        if (room_id := self.sid_rooms.pop(sid, None)) is None:
+            return
+        await socket_store.remove_connection(sid)
+        await self.server.leave_room(sid, room_id, namespace=self.namespace)
+        if owner := await self._get_owner(room_id):
+            await self._dispatch(owner, {"type": "leave", "room_id": room_id, "sid": sid})
+
+    async def submit(self, sid: str, action: str, data: dict) -> bool:
+        """
+        Передача действия клиента в очередь его комнаты.
+
+        :return: False, если действие отброшено или комната удалена.
+        """
+        room_id = self.sid_rooms.get(sid)
+        if room := self.rooms.get(room_id):
+            return room.submit(sid, action, data)
+        if (owner := await self._get_owner(room_id)) is None:
+            self.sid_rooms.pop(sid, None)
+            return False
+        message = {"type": "input", "room_id": room_id, "sid": sid, "action": action, "data": data}
+        await self._dispatch(owner, message)
+        return True
+
+    async def resync(self, sid: str) -> None:
+        """
+        Запрос полного состояния комнаты для клиента.
+        """
+        room_id = self.sid_rooms.get(sid)
+        if owner := await self._get_owner(room_id):
+            await self._dispatch(owner, {"type": "resync", "room_id": room_id, "sid": sid})
+
+    async def _dispatch(self, owner: str, message: dict) -> None:
+        """
+        Обработка сообщения комнаты в текущем процессе, или пересылка процессу-владельцу.
+        """
+        if owner == WORKER_ID:
+            await self._handle(message)
+            return
+        await self.message_connection.publish(self._channel(owner), to_json(message))
+        self.forwarded_messages += 1
+
+    async def _handle(self, message: dict) -> None:
+        """
+        Обработка сообщения для комнаты текущего процесса.
+        """
+        if (room := self.rooms.get(message["room_id"])) is None:
+            return
+        sid = message["sid"]
+        match message["type"]:
+            case "join":
+                if message["observer"]:
+                    room.add_observer(sid)
+                else:
+                    room.add_player(sid)
+                await room.send_keyframe(sid)
+            case "leave":
+                room.remove(sid)
+            case "input":
+                room.submit(sid, message["action"], message["data"])
+            case "resync":
+                await room.send_keyframe(sid)
+
+    async def run(self) -> None:
+        """
+        Фоновая задача: прием сообщений для комнат текущего процесса из других процессов.
+        """
+        pubsub = self.message_connection.pubsub()
+        await pubsub.subscribe(self._channel(WORKER_ID))
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    await self._handle(from_json(message["data"]))
+                except Exception as e:
+                    logger.error(f"Failed to handle room message: {e}")
+        finally:
+            await pubsub.aclose()
+
+    async def run_heartbeat(self) -> None:
+        """
+        Фоновая задача: обновление отметки текущего процесса через треть ее времени жизни.
+        """
+        while True:
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error(f"Failed to refresh worker {WORKER_ID} heartbeat: {e}")
+            await asyncio.sleep(settings.game_worker_ttl / 3)
+
+    async def remove_room(self, room: GameRoom) -> None:
+        """
+        Удаление комнаты после остановки ее игрового цикла.
+        """
+        self.rooms.pop(room.room_id, None)
+        self._owners.pop(room.room_id, None)
+        for sid in [sid for sid, room_id in self.sid_rooms.items() if room_id == room.room_id]:
+            del self.sid_rooms[sid]
+        await self.connection.delete(self._room_key(room.room_id))
+        await self.connection.srem(self._open_rooms_key(room.mode), room.room_id)
+        await socket_store.clear(room.room_id)
+        await self.server.close_room(room.room_id, namespace=self.namespace)
+        logger.info(f"Room {room.room_id} stopped")
+
+    async def stop_all(self) -> None:
+        """
+        Остановка всех комнат текущего процесса.
+        """
+        for room in list(self.rooms.values()):
+            await room.stop()
+            await self.remove_room(room)
+        await self.connection.delete(self._worker_key(WORKER_ID))
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Статистика игровых циклов текущего процесса.
+        """
+        rooms = [room.stats() for room in self.rooms.values()]
+        return {
+            "worker": WORKER_ID,
+            "tick_rate": settings.game_tick_rate,
+            "rooms": len(rooms),
+            "connections": len(self.sid_rooms),
+            "forwarded_messages": self.forwarded_messages,
+            "overruns": sum(room["overruns"] for room in rooms),
+            "skipped_ticks": sum(room["skipped_ticks"] for room in rooms),
+            "dropped_inputs": sum(room["dropped_inputs"] for room in rooms),
+            "deltas": sum(room["deltas"] for room in rooms),
+            "keyframes": sum(room["keyframes"] for room in rooms),
+            "max_tick_ms": max((room["max_tick_ms"] for room in rooms), default=0.0),
+            "per_room": rooms,
+        }
+
+
+game_rooms = GameRoomManager()
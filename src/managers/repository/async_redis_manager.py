@@ -8,42 +8,216 @@ from functools import cached_property
 from functools import wraps
 
 from pydantic import BaseModel
+from redis.asyncio import BlockingConnectionPool
 from redis.asyncio import RedisCluster
+from redis.asyncio.client import Pipeline
 from redis.asyncio.client import Redis
+from redis.asyncio.cluster import ClusterPipeline
+from redis.commands.core import AsyncScript
+from redis.exceptions import ResponseError
 
 from config.settings import settings
 from logic.utils.json_utils import from_json
-from logic.utils.json_utils import to_json
 from managers.repository.base_manager import BaseRepositoryManager
+from managers.repository.codecs import definition_registry
+from managers.repository.codecs import get_field_name
+from managers.repository.indexes import IndexChanges
+from managers.repository.indexes import collect_index_changes
+from managers.repository.indexes import get_index_values_key
+from managers.repository.indexes import get_model_indexes
 from models import exceptions
 
+# Обновляет поля хэша, только если он существует. ARGV: поле1, значение1, поле2, значение2...
+# Возвращает -1, если под ключом объект, сохраненный до перехода на хэши одной строкой
+UPDATE_FIELDS_SCRIPT = """
+local key_type = redis.call('TYPE', KEYS[1]).ok
+if key_type == 'none' then
+    return 0
+end
+if key_type == 'string' then
+    return -1
+end
+redis.call('HSET', KEYS[1], unpack(ARGV))
+return 1
+"""
+
+# Заменяет строку хэшем, только если под ключом все еще прочитанная строка. ARGV: строка, поле1, значение1...
+MIGRATE_STRING_SCRIPT = """
+if redis.call('TYPE', KEYS[1]).ok ~= 'string' or redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+return 1
+"""
+
+# Извлекает до ARGV[1] идентификаторов из множества измененных KEYS[1] и переносит их в множество обрабатываемых KEYS[2]
+POP_DIRTY_SCRIPT = """
+local ids = redis.call('SPOP', KEYS[1], ARGV[1])
+if #ids > 0 then
+    redis.call('SADD', KEYS[2], unpack(ids))
+end
+return ids
+"""
+
+# Возвращает идентификаторы из множества обрабатываемых KEYS[2] в множество измененных KEYS[1]
+RESTORE_DIRTY_SCRIPT = """
+local ids = redis.call('SMEMBERS', KEYS[2])
+if #ids > 0 then
+    redis.call('SADD', KEYS[1], unpack(ids))
+    redis.call('DEL', KEYS[2])
+end
+return #ids
+"""
+
+# Заменяет значения индексов объекта и переносит его id между множествами индексов, если значения не изменились
+# после чтения. KEYS: хэш значений индексов, объект, множества для удаления id, затем множества для добавления.
+# ARGV: id, режим, число прочитанных значений, прочитанные индекс1, значение1..., число множеств для удаления,
+# новые индекс1, значение1... Возвращает -1, если значения изменились, 0 — если удаляемый объект создан заново
+UPDATE_INDEXES_SCRIPT = """
+local id, mode = ARGV[1], ARGV[2]
+if mode == 'delete' and redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+local current = redis.call('HGETALL', KEYS[1])
+local old_count = tonumber(ARGV[3])
+if #current ~= old_count * 2 then
+    return -1
+end
+local expected = {}
+for i = 4, 3 + old_count * 2, 2 do
+    expected[ARGV[i]] = ARGV[i + 1]
+end
+for i = 1, #current, 2 do
+    if expected[current[i]] ~= current[i + 1] then
+        return -1
+    end
+end
+local position = 4 + old_count * 2
+local removed_count = tonumber(ARGV[position])
+for i = 3, 2 + removed_count do
+    redis.call('ZREM', KEYS[i], id)
+end
+for i = 3 + removed_count, #KEYS do
+    redis.call('ZADD', KEYS[i], 0, id)
+end
+redis.call('DEL', KEYS[1])
+if #ARGV > position then
+    redis.call('HSET', KEYS[1], unpack(ARGV, position + 1))
+end
+return 1
+"""
+
+# Количество попыток обновить индексы объектов, значения которых одновременно меняют другие процессы
+INDEX_UPDATE_ATTEMPTS = 5
+
 
 class AsyncRedisManager(BaseRepositoryManager):
     """
     Класс для управления асинхронным взаимодействием с Redis.
+    Подключения берутся из долгоживущего пула, который создается один раз на экземпляр менеджера.
+    Ответы не декодируются, так как поля компактных моделей хранятся в бинарном виде.
     """
 
+    @cached_property
+    def pool(self) -> BlockingConnectionPool:
+        """
+        Пул подключений к редису.
+        """
+        return BlockingConnectionPool(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            password=settings.redis_password or None,
+            db=settings.redis_db,
+            max_connections=settings.redis_pool_size,
+            timeout=settings.redis_pool_timeout,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_timeout,
+            health_check_interval=settings.redis_health_check_interval,
+            decode_responses=False,
+        )
+
     @cached_property
     def connection(self) -> RedisCluster | Redis:
         """
         Функция подключения к редису.
         """
-        return (
-            Redis(
-                host=settings.host,
-                port=settings.port,
-                password=settings.password,
-                decode_responses=True,
-            )
-            if not settings.cluster
-            else RedisCluster(
-                host=settings.host,
-                port=settings.port,
-                password=settings.password,
-                socket_timeout=5,
-                decode_responses=True,
+        if settings.cluster:
+            return RedisCluster(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                password=settings.redis_password or None,
+                max_connections=settings.redis_pool_size,
+                socket_timeout=settings.redis_socket_timeout,
+                socket_connect_timeout=settings.redis_socket_timeout,
+                health_check_interval=settings.redis_health_check_interval,
+                decode_responses=False,
             )
-        )
+        return Redis(connection_pool=self.pool)
+
+    @cached_property
+    def _update_fields_script(self) -> AsyncScript:
+        """
+        Скрипт обновления полей хэша.
+        """
+        return self.connection.register_script(UPDATE_FIELDS_SCRIPT)
+
+    @cached_property
+    def _migrate_string_script(self) -> AsyncScript:
+        """
+        Скрипт перевода объекта из строки в хэш.
+        """
+        return self.connection.register_script(MIGRATE_STRING_SCRIPT)
+
+    @cached_property
+    def _pop_dirty_script(self) -> AsyncScript:
+        """
+        Скрипт извлечения измененных объектов.
+        """
+        return self.connection.register_script(POP_DIRTY_SCRIPT)
+
+    @cached_property
+    def _restore_dirty_script(self) -> AsyncScript:
+        """
+        Скрипт возврата необработанных объектов в множество измененных.
+        """
+        return self.connection.register_script(RESTORE_DIRTY_SCRIPT)
+
+    @cached_property
+    def _update_indexes_script(self) -> AsyncScript:
+        """
+        Скрипт обновления индексов объекта.
+        """
+        return self.connection.register_script(UPDATE_INDEXES_SCRIPT)
+
+    @staticmethod
+    def _flatten_fields(fields: dict[str, str | bytes]) -> list[str | bytes]:
+        """
+        Преобразует поля хэша в список аргументов скрипта.
+        """
+        return [item for field_value in fields.items() for item in field_value]
+
+    async def close(self) -> None:
+        """
+        Закрывает подключения к редису.
+        """
+        if "connection" in self.__dict__:
+            await self.connection.aclose()
+            del self.connection
+            self.__dict__.pop("_update_fields_script", None)
+            self.__dict__.pop("_migrate_string_script", None)
+            self.__dict__.pop("_update_indexes_script", None)
+            self.__dict__.pop("_pop_dirty_script", None)
+            self.__dict__.pop("_restore_dirty_script", None)
+        if "pool" in self.__dict__:
+            await self.pool.disconnect()
+            del self.pool
+
+    async def ping(self) -> bool:
+        """
+        Проверка доступности редиса.
+        """
+        return await self.connection.ping()
 
     @staticmethod
     def _correct_connection(command_coro_func: Callable):
@@ -67,13 +241,12 @@ class AsyncRedisManager(BaseRepositoryManager):
                     msg = "Can't connect to redis"
                     raise exceptions.PythonError(msg)
 
-            async with connection:
-                return await command_coro_func(
-                    self,
-                    *args,
-                    connection=connection,
-                    **kwargs,
-                )
+            return await command_coro_func(
+                self,
+                *args,
+                connection=connection,
+                **kwargs,
+            )
 
         return inner
 
@@ -84,6 +257,190 @@ class AsyncRedisManager(BaseRepositoryManager):
         """
         return f"{name}:{uid}"
 
+    def _replace_in_pipeline(
+        self,
+        pipe: Pipeline | ClusterPipeline,
+        redis_key: str,
+        fields: dict[str, str | bytes],
+        definitions: dict[str, bytes],
+    ) -> None:
+        """
+        Добавляет в конвейер замену хэша и сохранение новых определений.
+        """
+        for uid, definition in definitions.items():
+            pipe.set(self._get_definition_key(uid), definition)
+        pipe.delete(redis_key)
+        if fields:
+            pipe.hset(redis_key, mapping=fields)
+
+    async def _replace(
+        self,
+        redis_key: str,
+        fields: dict[str, str | bytes],
+        definitions: dict[str, bytes],
+        connection: Redis | RedisCluster,
+    ) -> None:
+        """
+        Заменяет хэш одним конвейером, вне кластера — транзакцией.
+        """
+        async with connection.pipeline(transaction=not settings.cluster) as pipe:
+            self._replace_in_pipeline(pipe, redis_key, fields, definitions)
+            await pipe.execute()
+
+    @staticmethod
+    def _is_wrong_type(error: BaseException) -> bool:
+        """
+        Ошибка обращения к объекту, сохраненному до перехода на хэши одной строкой.
+        """
+        return isinstance(error, ResponseError) and str(error).startswith("WRONGTYPE")
+
+    async def _migrate_string(self, name: str, redis_key: str, connection: Redis | RedisCluster) -> None:
+        """
+        Переводит объект, сохраненный до перехода на хэши одной JSON строкой, в хэш.
+        Если объект за это время изменил другой процесс, строка не перезаписывает его изменения.
+        """
+        value = await connection.get(redis_key)
+        if value is None:
+            return
+        fields, definitions = self._to_fields(name, from_json(value))
+        if definitions:
+            async with connection.pipeline(transaction=False) as pipe:
+                for uid, definition in definitions.items():
+                    pipe.set(self._get_definition_key(uid), definition)
+                await pipe.execute()
+        await self._migrate_string_script(
+            keys=[redis_key],
+            args=[value, *self._flatten_fields(fields)],
+            client=connection,
+        )
+
+    async def _hgetall(self, name: str, redis_key: str, connection: Redis | RedisCluster) -> dict:
+        """
+        Читает поля объекта, переводя в хэш объект, сохраненный одной строкой.
+        """
+        try:
+            return await connection.hgetall(redis_key)
+        except ResponseError as e:
+            if not self._is_wrong_type(e):
+                raise
+        await self._migrate_string(name, redis_key, connection=connection)
+        return await connection.hgetall(redis_key)
+
+    @_correct_connection
+    async def _load_definitions(self, uids: set[str], connection: Redis | RedisCluster = None) -> None:
+        """
+        Загружает определения из Redis в реестр процесса.
+        """
+        uids = list(uids)
+        async with connection.pipeline(transaction=False) as pipe:
+            for uid in uids:
+                pipe.get(self._get_definition_key(uid))
+            definitions = await pipe.execute()
+        for uid, definition in zip(uids, definitions, strict=True):
+            if definition is None:
+                msg = f"Definition {uid} not found"
+                raise exceptions.PythonError(msg)
+            definition_registry.register(uid, definition)
+
+    @_correct_connection
+    async def _read_index_values(
+        self, keys: list[str], connection: Redis | RedisCluster = None
+    ) -> list[dict[str, str]]:
+        """
+        Читает значения индексов объектов одним конвейером.
+        """
+        async with connection.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            results = await pipe.execute()
+        return [
+            {get_field_name(index_name): get_field_name(value) for index_name, value in values.items()}
+            for values in results
+        ]
+
+    @_correct_connection
+    async def _write_index_changes(self, changes: IndexChanges, connection: Redis | RedisCluster = None) -> None:
+        """
+        Записывает изменения индексов одним конвейером, вне кластера — транзакцией.
+        """
+        async with connection.pipeline(transaction=not settings.cluster) as pipe:
+            for key, member in changes.removed:
+                pipe.zrem(key, member)
+            for key, member in changes.added:
+                pipe.zadd(key, {member: 0})
+            for key, values in changes.values.items():
+                pipe.delete(key)
+                if values:
+                    pipe.hset(key, mapping=values)
+            await pipe.execute()
+
+    @_correct_connection
+    async def _update_indexes(
+        self,
+        name: str,
+        items: dict[uuid.UUID | str, dict | BaseModel | None],
+        connection: Redis | RedisCluster = None,
+        partial: bool = False,
+    ) -> None:
+        """
+        Обновляет вторичные индексы. Изменения индексов объекта вычисляются по прочитанным значениям
+        и применяются скриптом, только если значения с тех пор не изменились, иначе объект обновляется заново.
+        Все ключи скрипта передаются в KEYS. В кластере ключи индексов лежат в разных слотах,
+        поэтому значения читаются и пишутся конвейерами.
+        """
+        if settings.cluster or not items or not get_model_indexes(name):
+            await super()._update_indexes(name, items, connection=connection, partial=partial)
+            return
+        pending = {str(id): data for id, data in items.items()}
+        for _ in range(INDEX_UPDATE_ATTEMPTS):
+            old_values = await self._read_index_values(
+                [get_index_values_key(name, id) for id in pending], connection=connection
+            )
+            updated = []
+            async with connection.pipeline(transaction=False) as pipe:
+                for (id, data), old in zip(pending.items(), old_values, strict=True):
+                    changes = collect_index_changes(name, {id: data}, [old], partial)
+                    if not changes.values:
+                        continue
+                    values_key, new = next(iter(changes.values.items()))
+                    await self._update_indexes_script(
+                        keys=[
+                            values_key,
+                            self._get_uniq_name(name, id),
+                            *(key for key, _ in changes.removed),
+                            *(key for key, _ in changes.added),
+                        ],
+                        args=[
+                            id,
+                            "delete" if data is None else "write",
+                            len(old),
+                            *self._flatten_fields(old),
+                            len(changes.removed),
+                            *self._flatten_fields(new),
+                        ],
+                        client=pipe,
+                    )
+                    updated.append(id)
+                results = await pipe.execute() if updated else []
+            pending = {id: pending[id] for id, result in zip(updated, results, strict=True) if result == -1}
+            if not pending:
+                return
+        msg = f"Indexes of {name} {list(pending)} were changed concurrently {INDEX_UPDATE_ATTEMPTS} times"
+        raise exceptions.PythonError(msg)
+
+    @_correct_connection
+    async def _get_missing_ids(
+        self, name: str, ids: list[str], connection: Redis | RedisCluster = None
+    ) -> list[str]:
+        """
+        Выбирает id объектов модели, которых нет в редисе, одним конвейером.
+        """
+        async with connection.pipeline(transaction=False) as pipe:
+            for id in ids:
+                pipe.exists(self._get_uniq_name(name, id))
+            results = await pipe.execute()
+        return [id for id, exists in zip(ids, results, strict=True) if not exists]
+
     @_correct_connection
     async def create(
         self,
@@ -100,14 +457,8 @@ class AsyncRedisManager(BaseRepositoryManager):
         if id is None:
             id = uuid.uuid4()
         uniq_name = self._get_uniq_name(name, id)
-        match data:
-            case BaseModel():
-                json_value = data.model_dump_json()
-            case dict():
-                json_value = to_json(data)
-            case _:
-                raise exceptions.PythonError
-        await connection.set(uniq_name, json_value)
+        await self._replace(uniq_name, *self._to_fields(name, data), connection=connection)
+        await self._update_indexes(name, {id: data}, connection=connection)
         return id
 
     @_correct_connection
@@ -121,11 +472,11 @@ class AsyncRedisManager(BaseRepositoryManager):
         Извлекает значение из Redis по id.
         """
         uniq_name = self._get_uniq_name(name, id)
-        json_data = await connection.get(uniq_name)
-        if json_data is None:
+        fields = await self._hgetall(name, uniq_name, connection=connection)
+        if not fields:
             msg = "Invalid name or id"
             raise exceptions.PythonError(msg)
-        return from_json(json_data)
+        return await self._from_fields(name, fields, connection=connection)
 
     @_correct_connection
     async def delete(
@@ -138,7 +489,9 @@ class AsyncRedisManager(BaseRepositoryManager):
         Удаляет ключ из Redis.
         """
         uniq_name = self._get_uniq_name(name, id)
-        return await connection.delete(uniq_name)
+        deleted = await connection.delete(uniq_name)
+        await self._update_indexes(name, {id: None}, connection=connection)
+        return deleted
 
     @_correct_connection
     async def update(
@@ -149,29 +502,176 @@ class AsyncRedisManager(BaseRepositoryManager):
         **to_update_items,
     ) -> bool:
         """
-        Обновляет значения из объекта Redis по id.
+        Атомарно обновляет отдельные поля объекта Redis по id за один запрос.
+        Отправляются только переданные поля, остальные не перечитываются и не перезаписываются.
         """
-        updatable = await self.get_by_id(name, id, connection=connection)
-        for field, value in to_update_items.items():
-            updatable[field] = value
+        if not to_update_items:
+            return await self.exists(name, id, connection=connection)
         redis_key = self._get_uniq_name(name, id)
-        json_data = to_json(updatable)
-        return await connection.set(redis_key, json_data)
+        fields, definitions = self._to_fields(name, to_update_items)
+        if definitions:
+            async with connection.pipeline(transaction=False) as pipe:
+                for uid, definition in definitions.items():
+                    pipe.set(self._get_definition_key(uid), definition)
+                await pipe.execute()
+        updated = await self._update_fields_script(
+            keys=[redis_key],
+            args=self._flatten_fields(fields),
+            client=connection,
+        )
+        if updated == -1:
+            await self._migrate_string(name, redis_key, connection=connection)
+            updated = await self._update_fields_script(
+                keys=[redis_key],
+                args=self._flatten_fields(fields),
+                client=connection,
+            )
+        if updated != 1:
+            msg = "Invalid name or id"
+            raise exceptions.PythonError(msg)
+        await self._update_indexes(name, {id: to_update_items}, connection=connection, partial=True)
+        return True
 
     @_correct_connection
     async def full_update(
         self,
         name: str,
         id: uuid.UUID,
-        new_value: dict,
+        new_value: dict | BaseModel,
         connection: Redis | RedisCluster = None,
     ) -> bool:
         """
         Обновляет объект из Redis по id.
         """
-        new_json_value = to_json(new_value)
         redis_key = self._get_uniq_name(name, id)
-        return await connection.set(redis_key, new_json_value)
+        await self._replace(redis_key, *self._to_fields(name, new_value), connection=connection)
+        await self._update_indexes(name, {id: new_value}, connection=connection)
+        return True
+
+    @_correct_connection
+    async def get_many(
+        self,
+        name: str,
+        ids: list[uuid.UUID],
+        connection: Redis | RedisCluster = None,
+    ) -> list[dict | None]:
+        """
+        Извлекает несколько значений из Redis одним конвейером.
+        В кластере команды группируются по узлам, владеющим слотами ключей.
+        Объекты, сохраненные одной строкой, переводятся в хэши.
+        """
+        if not ids:
+            return []
+        async with connection.pipeline(transaction=False) as pipe:
+            for id in ids:
+                pipe.hgetall(self._get_uniq_name(name, id))
+            results = await pipe.execute(raise_on_error=False)
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                if not self._is_wrong_type(result):
+                    raise result
+                results[index] = await self._hgetall(name, self._get_uniq_name(name, ids[index]), connection=connection)
+        return [await self._from_fields(name, fields, connection=connection) if fields else None for fields in results]
+
+    @_correct_connection
+    async def set_many(
+        self,
+        name: str,
+        values: dict[uuid.UUID, dict | BaseModel],
+        connection: Redis | RedisCluster = None,
+    ) -> bool:
+        """
+        Заменяет несколько объектов в Redis одним конвейером.
+        Вне кластера конвейер выполняется как транзакция.
+        """
+        if not values:
+            return True
+        async with connection.pipeline(transaction=not settings.cluster) as pipe:
+            for id, value in values.items():
+                self._replace_in_pipeline(pipe, self._get_uniq_name(name, id), *self._to_fields(name, value))
+            await pipe.execute()
+        await self._update_indexes(name, values, connection=connection)
+        return True
+
+    @_correct_connection
+    async def delete_many(
+        self,
+        name: str,
+        ids: list[uuid.UUID],
+        connection: Redis | RedisCluster = None,
+    ) -> int:
+        """
+        Удаляет несколько ключей из Redis одной командой.
+        """
+        if not ids:
+            return 0
+        deleted = await connection.delete(*(self._get_uniq_name(name, id) for id in ids))
+        await self._update_indexes(name, dict.fromkeys(ids), connection=connection)
+        return deleted
+
+    @_correct_connection
+    async def mark_dirty(
+        self,
+        name: str,
+        ids: list[uuid.UUID | str],
+        connection: Redis | RedisCluster = None,
+    ) -> None:
+        """
+        Добавляет идентификаторы измененных объектов в множество.
+        """
+        if ids:
+            await connection.sadd(self._get_dirty_key(name), *map(str, ids))
+
+    @_correct_connection
+    async def pop_dirty(
+        self,
+        name: str,
+        count: int,
+        connection: Redis | RedisCluster = None,
+    ) -> list[str]:
+        """
+        Атомарно извлекает до count идентификаторов измененных объектов и переносит их в множество обрабатываемых.
+        В кластере множества лежат в разных слотах, поэтому переносятся двумя командами.
+        """
+        keys = [self._get_dirty_key(name), self._get_processing_key(name)]
+        if settings.cluster:
+            ids = await connection.spop(keys[0], count) or []
+            if ids:
+                await connection.sadd(keys[1], *ids)
+        else:
+            ids = await self._pop_dirty_script(keys=keys, args=[count])
+        return [id.decode() for id in ids]
+
+    @_correct_connection
+    async def ack_dirty(
+        self,
+        name: str,
+        ids: list[str],
+        connection: Redis | RedisCluster = None,
+    ) -> None:
+        """
+        Удаляет записанные объекты из множества обрабатываемых.
+        """
+        if ids:
+            await connection.srem(self._get_processing_key(name), *ids)
+
+    @_correct_connection
+    async def restore_dirty(
+        self,
+        name: str,
+        connection: Redis | RedisCluster = None,
+    ) -> int:
+        """
+        Возвращает необработанные идентификаторы в множество измененных, вне кластера — атомарно.
+        """
+        keys = [self._get_dirty_key(name), self._get_processing_key(name)]
+        if not settings.cluster:
+            return await self._restore_dirty_script(keys=keys)
+        ids = await connection.smembers(keys[1])
+        if ids:
+            await connection.sadd(keys[0], *ids)
+            await connection.srem(keys[1], *ids)
+        return len(ids)
 
     @_correct_connection
     async def exists(
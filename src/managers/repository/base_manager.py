@@ -7,15 +7,151 @@ from abc import ABC
 from abc import abstractmethod
 from functools import cached_property
 from types import TracebackType
+from typing import Any
 
 from pydantic import BaseModel
 
+from managers.repository.codecs import DEFINITION_MODEL_NAME
+from managers.repository.codecs import get_codec
+from managers.repository.codecs import get_field_name
+from managers.repository.indexes import IndexChanges
+from managers.repository.indexes import collect_index_changes
+from managers.repository.indexes import get_index_key
+from managers.repository.indexes import get_index_values_key
+from managers.repository.indexes import get_lex_min
+from managers.repository.indexes import get_model_indexes
+
+# Поле-заглушка пустого объекта: хэш без полей в редисе не хранится
+EMPTY_OBJECT_FIELD = "__empty__"
+
 
 class BaseRepositoryManager(ABC):
     """
     Базовый класс менеджера репозитория.
+
+    Объекты хранятся как хэши: каждое поле верхнего уровня сериализуется отдельно,
+    что позволяет обновлять только измененные поля. Формат полей определяется кодеком модели.
     """
 
+    @staticmethod
+    def _to_fields(name: str, data: dict | BaseModel) -> tuple[dict[str, str | bytes], dict[str, bytes]]:
+        """
+        Преобразует объект в поля хэша кодеком модели.
+
+        :return: Поля хэша и определения, которые нужно сохранить под ключами definition:<uid>:<версия>.
+        """
+        fields, definitions = get_codec(name).encode(data)
+        return fields or {EMPTY_OBJECT_FIELD: ""}, definitions
+
+    async def _from_fields(self, name: str, fields: dict, connection: Any = None) -> dict:
+        """
+        Преобразует поля хэша в объект, при необходимости дочитывая определения из репозитория.
+        """
+        if EMPTY_OBJECT_FIELD in fields or EMPTY_OBJECT_FIELD.encode() in fields:
+            fields = {field: value for field, value in fields.items() if get_field_name(field) != EMPTY_OBJECT_FIELD}
+        codec = get_codec(name)
+        if missing := codec.missing_references(fields):
+            await self._load_definitions(missing, connection=connection)
+        return codec.decode(fields)
+
+    @staticmethod
+    def _get_definition_key(uid: str) -> str:
+        """
+        Ключ определения данных каталога.
+        """
+        return f"{DEFINITION_MODEL_NAME}:{uid}"
+
+    @staticmethod
+    def _get_dirty_key(name: str) -> str:
+        """
+        Ключ множества измененных объектов модели.
+        """
+        return f"dirty:{name}"
+
+    @staticmethod
+    def _get_processing_key(name: str) -> str:
+        """
+        Ключ множества измененных объектов модели, извлеченных для записи, но еще не записанных.
+        """
+        return f"dirty_processing:{name}"
+
+    @abstractmethod
+    async def _load_definitions(self, uids: set[str], connection: Any = None) -> None:
+        """
+        Абстрактный метод для загрузки определений из репозитория в реестр процесса.
+        """
+
+    @abstractmethod
+    async def _read_index_values(self, keys: list[str], connection: Any = None) -> list[dict[str, str]]:
+        """
+        Абстрактный метод для чтения значений индексов объектов.
+        """
+
+    @abstractmethod
+    async def _write_index_changes(self, changes: IndexChanges, connection: Any = None) -> None:
+        """
+        Абстрактный метод для записи изменений индексов.
+        """
+
+    @abstractmethod
+    async def _get_missing_ids(self, name: str, ids: list[str], connection: Any = None) -> list[str]:
+        """
+        Абстрактный метод для выбора id объектов модели, которых нет в репозитории.
+        """
+
+    async def _update_indexes(
+        self,
+        name: str,
+        items: dict[uuid.UUID | str, dict | BaseModel | None],
+        connection: Any = None,
+        partial: bool = False,
+    ) -> None:
+        """
+        Обновляет вторичные индексы после записи объектов.
+
+        :param items: Записанные объекты по id, None — объект удален.
+        :param partial: Объекты содержат только обновленные поля.
+        """
+        if not items or not get_model_indexes(name):
+            return
+        items = {str(id): data for id, data in items.items()}
+        old_values = await self._read_index_values(
+            [get_index_values_key(name, id) for id in items], connection=connection
+        )
+        changes = collect_index_changes(name, items, old_values, partial)
+        if changes.values:
+            await self._write_index_changes(changes, connection=connection)
+
+    async def find_by_index(
+        self,
+        name: str,
+        index_name: str,
+        value: uuid.UUID | str,
+        cursor: str | None = None,
+        count: int = 100,
+        connection: Any = None,
+    ) -> tuple[list[str], str | None]:
+        """
+        Выбирает id объектов модели с заданным значением индекса, упорядоченные по id.
+        Объекты, вытесненные или истекшие без обновления индексов, пропускаются и удаляются из индексов,
+        поэтому страница может быть короче count.
+
+        :param cursor: Курсор, полученный с предыдущей страницей.
+        :return: id объектов и курсор следующей страницы, None — если страница последняя.
+        """
+        connection = connection or self.connection
+        members = await connection.zrangebylex(
+            get_index_key(name, index_name, str(value)), get_lex_min(cursor), "+", start=0, num=count + 1
+        )
+        ids = [member.decode() if isinstance(member, bytes) else member for member in members]
+        next_cursor = None
+        if len(ids) > count:
+            ids, next_cursor = ids[:count], ids[count - 1]
+        if missing := set(await self._get_missing_ids(name, ids, connection=connection)):
+            await self._update_indexes(name, dict.fromkeys(missing), connection=connection)
+            ids = [id for id in ids if id not in missing]
+        return ids, next_cursor
+
     @abstractmethod
     @cached_property
     def connection(self) -> None:
@@ -61,7 +197,8 @@ class BaseRepositoryManager(ABC):
         **to_update_items,
     ) -> bool:
         """
-        Абстрактный метод для обновления значения из репозитория по заданному имени и идентификатору.
+        Абстрактный метод для атомарного обновления отдельных полей значения из репозитория
+        по заданному имени и идентификатору.
         """
 
     @abstractmethod
@@ -75,16 +212,102 @@ class BaseRepositoryManager(ABC):
         Абстрактный метод для полной замены значения из репозитория по заданному имени и идентификатору.
         """
 
+    @abstractmethod
+    async def get_many(
+        self,
+        name: str,
+        ids: list[uuid.UUID],
+    ) -> list[dict | None]:
+        """
+        Абстрактный метод для получения нескольких значений из репозитория за один запрос.
+        Для отсутствующих идентификаторов возвращается None.
+        """
+
+    @abstractmethod
+    async def set_many(
+        self,
+        name: str,
+        values: dict[uuid.UUID, dict | BaseModel],
+    ) -> bool:
+        """
+        Абстрактный метод для полной замены нескольких значений в репозитории за один запрос.
+        """
+
+    @abstractmethod
+    async def delete_many(
+        self,
+        name: str,
+        ids: list[uuid.UUID],
+    ) -> int:
+        """
+        Абстрактный метод для удаления нескольких значений из репозитория за один запрос.
+        """
+
+    @abstractmethod
+    async def mark_dirty(
+        self,
+        name: str,
+        ids: list[uuid.UUID | str],
+    ) -> None:
+        """
+        Абстрактный метод для пометки объектов как измененных, для последующей записи в базу данных.
+        """
+
+    @abstractmethod
+    async def pop_dirty(
+        self,
+        name: str,
+        count: int,
+    ) -> list[str]:
+        """
+        Абстрактный метод для извлечения идентификаторов измененных объектов.
+        Извлеченные идентификаторы переносятся в множество обрабатываемых до подтверждения записи.
+        """
+
+    @abstractmethod
+    async def ack_dirty(
+        self,
+        name: str,
+        ids: list[str],
+    ) -> None:
+        """
+        Абстрактный метод для подтверждения записи объектов: идентификаторы удаляются из множества обрабатываемых.
+        """
+
+    @abstractmethod
+    async def restore_dirty(
+        self,
+        name: str,
+    ) -> int:
+        """
+        Абстрактный метод для возврата необработанных идентификаторов в множество измененных,
+        например оставшихся после падения процесса.
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """
+        Абстрактный метод для закрытия подключений к репозиторию.
+        """
+
+    @abstractmethod
+    async def ping(self) -> bool:
+        """
+        Абстрактный метод для проверки доступности репозитория.
+        """
+
     async def __aenter__(self):
         """
         Функция асинхронного входа в контекст.
+        Возвращает общее подключение, не открывая нового.
         """
-        return await self.connection.__aenter__()
+        return self.connection
 
-    async def __aexit__(
+    # Выход из контекста намеренно ничего не делает, поэтому метод не абстрактный
+    async def __aexit__(  # noqa: B027
         self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None
-    ):
+    ) -> None:
         """
         Функция асинхронного выхода из контекста.
+        Общее подключение не закрывается, для этого используется close.
         """
-        return await self.connection.__aexit__(exc_type, exc_val, exc_tb)
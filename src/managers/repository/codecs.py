@@ -0,0 +1,277 @@
+"""
+Модуль кодеков, которыми менеджеры репозитория кодируют поля хэшей.
+
+По умолчанию каждое поле верхнего уровня хранится в JSON. Для моделей из settings.repository_compact_models
+используется компактный бинарный формат MessagePack, а неизменяемые данные каталога (описания и эффекты
+класса, расы, скиллов) хранятся один раз под ключом definition:<uid>:<версия> и подставляются в объект по ссылке.
+Версия — хэш содержимого определения, поэтому при изменении каталога определение записывается под новым ключом,
+а закэшированные процессами определения никогда не устаревают. Состояние персонажа (уровень и перезарядка скилла,
+даты) хранится в самом объекте рядом со ссылкой.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel
+
+from config.log_tools import logger
+from config.settings import settings
+from logic.utils.json_utils import from_json
+from logic.utils.json_utils import to_json
+from models import exceptions
+from models.constants.character import CHARACTER_MODEL_NAME
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DEFINITION_MODEL_NAME = "definition"
+
+
+@dataclass(frozen=True, slots=True)
+class ReferenceField:
+    """
+    Поле модели, неизменяемая часть которого хранится по ссылке.
+
+    :param config_field: Поле конфигурации, содержащее uid.
+    :param fields: Неизменяемые поля элемента, которые хранятся в определении.
+    :param config_fields: Неизменяемые поля конфигурации, которые хранятся в определении.
+    """
+
+    config_field: str
+    fields: tuple[str, ...]
+    config_fields: tuple[str, ...]
+
+    def split(self, item: dict) -> tuple[dict, dict]:
+        """
+        Разделение элемента на определение и состояние, которое хранится в объекте.
+        """
+        config = item[self.config_field]
+        definition = {field: item[field] for field in self.fields if field in item}
+        definition[self.config_field] = {field: config[field] for field in self.config_fields if field in config}
+        state = {field: value for field, value in item.items() if field not in self.fields}
+        state[self.config_field] = {field: value for field, value in config.items() if field not in self.config_fields}
+        return definition, state
+
+    def merge(self, definition: dict, state: dict) -> dict:
+        """
+        Сборка элемента из определения и состояния.
+        """
+        item = {**definition, **state}
+        item[self.config_field] = {**definition.get(self.config_field, {}), **state.get(self.config_field, {})}
+        return item
+
+
+# Поля, неизменяемая часть которых хранится по ссылке
+REFERENCE_FIELDS: dict[str, dict[str, ReferenceField]] = {
+    CHARACTER_MODEL_NAME: {
+        "class_": ReferenceField("class_configuration", ("effects",), ("uid", "name", "description")),
+        "race": ReferenceField("race_configuration", ("effects",), ("uid", "race", "description")),
+        "skills": ReferenceField(
+            "skill_configuration", ("effects",), ("uid", "type", "name", "description", "required_level")
+        ),
+    },
+}
+
+
+def get_field_name(field: str | bytes) -> str:
+    """
+    Название поля хэша.
+    """
+    return field.decode() if isinstance(field, bytes) else field
+
+
+def to_plain_dict(data: dict | BaseModel) -> dict:
+    """
+    Преобразует объект в словарь.
+    """
+    match data:
+        case BaseModel():
+            return data.model_dump(mode="json")
+        case dict():
+            return data
+        case _:
+            raise exceptions.PythonError
+
+
+class DefinitionRegistry:
+    """
+    Закодированные определения данных каталога, известные процессу.
+    Определения неизменяемы: новая версия определения записывается под новым ключом.
+    """
+
+    def __init__(self) -> None:
+        self.definitions: dict[str, bytes] = {}
+
+    def register(self, uid: str, encoded: bytes) -> bool:
+        """
+        Регистрирует определение. Возвращает True, если оно новое.
+        """
+        if uid in self.definitions:
+            return False
+        self.definitions[uid] = encoded
+        return True
+
+    def get(self, uid: str) -> Any:
+        """
+        Раскодированное определение. Каждый вызов возвращает новый объект, чтобы объекты
+        с одним определением не разделяли вложенные списки и словари.
+        """
+        return msgpack.unpackb(self.definitions[uid])
+
+    def __contains__(self, uid: str) -> bool:
+        """
+        Известно ли определение процессу.
+        """
+        return uid in self.definitions
+
+
+definition_registry = DefinitionRegistry()
+
+
+class JsonCodec:
+    """
+    Кодек по умолчанию: каждое поле верхнего уровня хранится в JSON.
+    """
+
+    def encode(self, data: dict | BaseModel) -> tuple[dict[str, str], dict[str, bytes]]:
+        """
+        Кодирует объект в поля хэша.
+
+        :return: Поля хэша и определения, которые нужно сохранить в репозитории.
+        """
+        return {field: to_json(value) for field, value in to_plain_dict(data).items()}, {}
+
+    def missing_references(self, fields: dict) -> set[str]:
+        """
+        Определения, которых не хватает для раскодирования.
+        """
+        return set()
+
+    def decode(self, fields: dict) -> dict:
+        """
+        Раскодирует поля хэша в объект.
+        """
+        return {get_field_name(field): from_json(value) for field, value in fields.items()}
+
+
+class MsgPackCodec(JsonCodec):
+    """
+    Компактный кодек: поля в MessagePack, неизменяемые данные каталога по ссылке.
+
+    Первый байт значения — версия схемы и вид поля, что позволяет менять формат без миграции данных.
+    """
+
+    inline = 1
+    # Устаревший формат: элемент целиком хранился в определении definition:<uid>
+    legacy_reference = 2
+    reference = 3
+
+    def __init__(self, reference_fields: dict[str, ReferenceField]) -> None:
+        self.reference_fields = reference_fields
+
+    def _encode_reference(self, field: str, value: Any, definitions: dict[str, bytes]) -> bytes | None:
+        """
+        Кодирует поле ссылками на определения и состоянием элементов. Возвращает None, если у значения нет uid.
+        """
+        reference_field = self.reference_fields[field]
+        items = value if isinstance(value, list) else [value]
+        if not all(isinstance(item, dict) and "uid" in item.get(reference_field.config_field, {}) for item in items):
+            return None
+
+        entries = []
+        for item in items:
+            definition, state = reference_field.split(item)
+            encoded = msgpack.packb(definition)
+            uid = f"{item[reference_field.config_field]['uid']}:{hashlib.blake2b(encoded, digest_size=8).hexdigest()}"
+            if definition_registry.register(uid, encoded):
+                definitions[uid] = encoded
+            entries.append([uid, state])
+        # Для списка хранится список пар [ссылка, состояние], для одного элемента — одна пара
+        return bytes([self.reference]) + msgpack.packb(entries if isinstance(value, list) else entries[0])
+
+    def encode(self, data: dict | BaseModel) -> tuple[dict[str, bytes], dict[str, bytes]]:
+        """
+        Кодирует объект в поля хэша.
+
+        :return: Поля хэша и новые определения, которые нужно сохранить в репозитории.
+        """
+        fields = {}
+        definitions: dict[str, bytes] = {}
+        for field, value in to_plain_dict(data).items():
+            encoded = None
+            if field in self.reference_fields:
+                encoded = self._encode_reference(field, value, definitions)
+            fields[field] = encoded or bytes([self.inline]) + msgpack.packb(value)
+        return fields, definitions
+
+    def _get_entries(self, value: bytes) -> tuple[list[list], bool]:
+        """
+        Пары [ссылка, состояние] поля и признак того, что поле — список.
+        У полей устаревшего формата состояние None: элемент целиком хранится в определении.
+        """
+        payload = msgpack.unpackb(value[1:])
+        if value[0] == self.legacy_reference:
+            return ([[uid, None] for uid in payload], True) if isinstance(payload, list) else ([[payload, None]], False)
+        if payload and isinstance(payload[0], str):
+            return [payload], False
+        return payload, True
+
+    def missing_references(self, fields: dict) -> set[str]:
+        """
+        Определения, которых нет в реестре процесса.
+        """
+        missing = set()
+        for value in fields.values():
+            if isinstance(value, bytes) and value[:1] in {bytes([self.legacy_reference]), bytes([self.reference])}:
+                entries, _ = self._get_entries(value)
+                missing.update(uid for uid, _ in entries if uid not in definition_registry)
+        return missing
+
+    def decode(self, fields: dict) -> dict:
+        """
+        Раскодирует поля хэша в объект, подставляя определения по ссылкам.
+        Поля, записанные в JSON до включения компактного формата, читаются как есть.
+        """
+        data = {}
+        for field, value in fields.items():
+            field = get_field_name(field)
+            kind = value[0] if isinstance(value, bytes) and value else None
+            if kind == self.inline:
+                data[field] = msgpack.unpackb(value[1:])
+            elif kind in {self.legacy_reference, self.reference}:
+                entries, is_list = self._get_entries(value)
+                items = [
+                    definition_registry.get(uid)
+                    if state is None
+                    else self.reference_fields[field].merge(definition_registry.get(uid), state)
+                    for uid, state in entries
+                ]
+                data[field] = items if is_list else items[0]
+            else:
+                data[field] = from_json(value)
+        return data
+
+
+def get_codecs() -> dict[str, JsonCodec]:
+    """
+    Кодеки моделей, для которых включен компактный формат.
+    """
+    names = {name.strip() for name in settings.repository_compact_models.split(",") if name.strip()}
+    if names and msgpack is None:
+        logger.warning("msgpack is not installed, compact repository encoding is disabled")
+        return {}
+    return {name: MsgPackCodec(REFERENCE_FIELDS.get(name, {})) for name in names}
+
+
+json_codec = JsonCodec()
+codecs = get_codecs()
+
+
+def get_codec(name: str) -> JsonCodec:
+    """
+    Кодек модели репозитория.
+    """
+    return codecs.get(name, json_codec)
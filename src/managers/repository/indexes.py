@@ -0,0 +1,192 @@
+"""
+Модуль вторичных индексов репозитория.
+
+Индекс хранится отдельным упорядоченным множеством на каждое значение: index:<модель>:<индекс>:<значение>,
+элементы которого — id объектов с одинаковой оценкой. Поэтому объекты со значением выбираются
+командой ZRANGEBYLEX за время, пропорциональное размеру результата, а последний id страницы служит
+курсором следующей страницы. Значения индексов объекта хранятся в хэше index_values:<модель>:<id>,
+чтобы при изменении или удалении объекта удалить его из старых множеств без чтения самого объекта.
+
+Индексы персонажей заданы в DEFAULT_INDEXES, дополнительные индексы по полям объектов задаются
+в settings.repository_indexes.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from dataclasses import field
+
+from pydantic import BaseModel
+
+from config.settings import settings
+from managers.repository.codecs import to_plain_dict
+from models import exceptions
+from models.constants.character import CHARACTER_MODEL_NAME
+
+# Разделитель частей составного id объекта, например game_id:character_id
+ID_SEPARATOR = ":"
+
+
+@dataclass(frozen=True, slots=True)
+class RepositoryIndex:
+    """
+    Вторичный индекс модели репозитория.
+
+    :param name: Название индекса.
+    :param extract: Функция, возвращающая значение индекса по id и данным объекта, None — объект не индексируется.
+    :param fields: Поля верхнего уровня, от которых зависит значение. При частичном обновлении
+        индекс пересчитывается, только если переданы все эти поля.
+    """
+
+    name: str
+    extract: Callable[[str, dict], str | None]
+    fields: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class IndexChanges:
+    """
+    Изменения индексов после записи объектов.
+    """
+
+    removed: list[tuple[str, str]] = field(default_factory=list)
+    added: list[tuple[str, str]] = field(default_factory=list)
+    values: dict[str, dict[str, str]] = field(default_factory=dict)
+
+
+def id_part_extractor(position: int) -> Callable[[str, dict], str | None]:
+    """
+    Значение индекса — часть составного id объекта.
+    """
+
+    def extract(id: str, data: dict) -> str | None:
+        parts = id.split(ID_SEPARATOR)
+        return parts[position] if position < len(parts) else None
+
+    return extract
+
+
+def field_extractor(path: str) -> Callable[[str, dict], str | None]:
+    """
+    Значение индекса — поле объекта по пути через точку.
+    """
+    keys = path.split(".")
+
+    def extract(id: str, data: dict) -> str | None:
+        value = data
+        for key in keys:
+            if isinstance(value, BaseModel):
+                value = getattr(value, key, None)
+            elif isinstance(value, dict):
+                value = value.get(key)
+            else:
+                return None
+        return None if value is None else str(value)
+
+    return extract
+
+
+DEFAULT_INDEXES: dict[str, tuple[RepositoryIndex, ...]] = {
+    CHARACTER_MODEL_NAME: (
+        RepositoryIndex("game", id_part_extractor(0)),
+        RepositoryIndex("player", field_extractor("player.player_configuration.uid"), ("player",)),
+    ),
+}
+
+
+def get_indexes() -> dict[str, tuple[RepositoryIndex, ...]]:
+    """
+    Индексы моделей: индексы по умолчанию и индексы из settings.repository_indexes
+    в формате "модель.индекс=путь.к.полю" через запятую.
+    """
+    indexes = {name: list(model_indexes) for name, model_indexes in DEFAULT_INDEXES.items()}
+    for definition in filter(None, map(str.strip, settings.repository_indexes.split(","))):
+        target, _, path = definition.partition("=")
+        name, _, index_name = target.strip().partition(".")
+        if not name or not index_name or not path.strip():
+            msg = f"Invalid repository index: {definition}"
+            raise exceptions.PythonError(msg)
+        path = path.strip()
+        indexes.setdefault(name, []).append(
+            RepositoryIndex(index_name, field_extractor(path), (path.split(".")[0],))
+        )
+    return {name: tuple(model_indexes) for name, model_indexes in indexes.items()}
+
+
+indexes = get_indexes()
+
+
+def get_model_indexes(name: str) -> tuple[RepositoryIndex, ...]:
+    """
+    Индексы модели репозитория.
+    """
+    return indexes.get(name, ())
+
+
+def get_index_key(name: str, index_name: str, value: str) -> str:
+    """
+    Ключ множества объектов модели с заданным значением индекса.
+    """
+    return f"index:{name}:{index_name}:{value}"
+
+
+def get_index_values_key(name: str, id: str) -> str:
+    """
+    Ключ хэша значений индексов объекта.
+    """
+    return f"index_values:{name}:{id}"
+
+
+def get_lex_min(cursor: str | None) -> str:
+    """
+    Нижняя граница ZRANGEBYLEX для страницы после курсора.
+    """
+    return f"({cursor}" if cursor else "-"
+
+
+def get_index_updates(name: str, id: str, data: dict | BaseModel, partial: bool = False) -> dict[str, str | None]:
+    """
+    Новые значения индексов объекта, None — объект не индексируется.
+
+    :param partial: Объект содержит только обновленные поля, индексы по непереданным полям пропускаются.
+    """
+    data = to_plain_dict(data)
+    return {
+        index.name: index.extract(id, data)
+        for index in get_model_indexes(name)
+        if not partial or all(field_name in data for field_name in index.fields)
+    }
+
+
+def collect_index_changes(
+    name: str,
+    items: dict[str, dict | BaseModel | None],
+    old_values: list[dict[str, str]],
+    partial: bool = False,
+) -> IndexChanges:
+    """
+    Изменения индексов после записи объектов.
+
+    :param items: Записанные объекты по id, None — объект удален.
+    :param old_values: Прежние значения индексов объектов в том же порядке.
+    :param partial: Объекты содержат только обновленные поля.
+    """
+    changes = IndexChanges()
+    for (id, data), old in zip(items.items(), old_values, strict=True):
+        new = {}
+        if data is not None:
+            new = dict(old) if partial else {}
+            for index_name, value in get_index_updates(name, id, data, partial).items():
+                if value is None:
+                    new.pop(index_name, None)
+                else:
+                    new[index_name] = value
+
+        for index_name, value in old.items():
+            if new.get(index_name) != value:
+                changes.removed.append((get_index_key(name, index_name, value), id))
+        for index_name, value in new.items():
+            if old.get(index_name) != value:
+                changes.added.append((get_index_key(name, index_name, value), id))
+        if new != old:
+            changes.values[get_index_values_key(name, id)] = new
+    return changes
@@ -0,0 +1,264 @@
+"""
+Модуль содержит сохранение локального хранилища на диск: снимки и журнал изменений.
+
+Каждое изменение LocalConnection сразу кодируется в буфер журнала. Фоновая задача периодически
+дописывает буфер в файл журнала и вызывает fsync один раз на всю пачку записей.
+Снимок записывается во временный файл и атомарно заменяет предыдущий через os.replace.
+Журналы нумеруются поколениями: при снимке начинается новый журнал, а снимок хранит номер
+поколения, с которого нужно продолжить чтение журналов. При запуске загружается снимок
+и поверх него применяются журналы этого и следующих поколений.
+"""
+
+import asyncio
+import contextlib
+import os
+import pickle
+import struct
+import time
+import zlib
+from functools import cached_property
+from pathlib import Path
+from typing import BinaryIO
+
+from config.log_tools import logger
+from config.settings import settings
+from managers.repository.local_redis_manager import PROCESS_KEY_PREFIXES
+from managers.repository.local_redis_manager import LocalConnection
+from managers.repository.redis_pool import get_redis_client
+
+# Заголовок записи журнала: длина и контрольная сумма
+RECORD_HEADER = struct.Struct(">II")
+SNAPSHOT_NAME = "snapshot.pickle"
+LOG_PREFIX = "appendonly."
+LOG_SUFFIX = ".log"
+
+
+def encode_record(record: tuple) -> bytes:
+    """
+    Кодирование записи журнала.
+    """
+    payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(path: Path) -> tuple[list[tuple], int]:
+    """
+    Чтение записей журнала.
+
+    :return: Записи и длина целой части файла. Запись, оборванная при падении процесса, не читается.
+    """
+    content = path.read_bytes()
+    records = []
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(content):
+        length, checksum = RECORD_HEADER.unpack_from(content, offset)
+        start = offset + RECORD_HEADER.size
+        payload = content[start : start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        records.append(pickle.loads(payload))
+        offset = start + length
+    return records, offset
+
+
+class LocalPersistence:
+    """
+    Сохранение локального хранилища на диск.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory) if directory else None
+        self._fsync_interval = settings.local_db_fsync_interval
+        self._snapshot_interval = settings.local_db_snapshot_interval
+        self._buffer = bytearray()
+        self._log: BinaryIO | None = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._last_snapshot = time.monotonic()
+        self.written_records = 0
+        self.fsyncs = 0
+        self.snapshots = 0
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Включено ли сохранение на диск.
+        """
+        return self.directory is not None
+
+    @cached_property
+    def connection(self) -> LocalConnection:
+        """
+        Сохраняемое локальное хранилище.
+        """
+        return get_redis_client()
+
+    def _get_log_path(self, generation: int) -> Path:
+        """
+        Путь к журналу поколения.
+        """
+        return self.directory / f"{LOG_PREFIX}{generation}{LOG_SUFFIX}"
+
+    def _get_log_generations(self) -> list[int]:
+        """
+        Поколения журналов, которые есть на диске, по возрастанию.
+        """
+        return sorted(
+            int(path.name.removeprefix(LOG_PREFIX).removesuffix(LOG_SUFFIX))
+            for path in self.directory.glob(f"{LOG_PREFIX}*{LOG_SUFFIX}")
+        )
+
+    def _append(self, record: tuple) -> None:
+        """
+        Добавление записи в буфер журнала.
+        """
+        self._buffer += encode_record(record)
+        self.written_records += 1
+
+    def _replay(self, generation: int) -> None:
+        """
+        Применение журнала поколения. Оборванный хвост журнала отрезается.
+        """
+        path = self._get_log_path(generation)
+        records, size = read_records(path)
+        for record in records:
+            self.connection.apply_record(record)
+        if size != path.stat().st_size:
+            logger.warning(f"Truncating torn local db log {path.name} at {size} bytes")
+            with path.open("r+b") as file:
+                file.truncate(size)
+
+    def load(self) -> None:
+        """
+        Восстановление хранилища со снимка и журналов, после чего изменения начинают записываться в журнал.
+        """
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        snapshot_path = self.directory / SNAPSHOT_NAME
+        if snapshot_path.exists():
+            snapshot = pickle.loads(snapshot_path.read_bytes())
+            self.connection.restore(snapshot["data"], snapshot["expires"])
+            self._generation = snapshot["generation"]
+
+        for generation in self._get_log_generations():
+            if generation < self._generation:
+                self._get_log_path(generation).unlink()
+                continue
+            self._replay(generation)
+            self._generation = generation
+        # Процессы, которым принадлежали комнаты и соединения, завершились вместе с прежним запуском
+        removed = self.connection.remove_prefixes(PROCESS_KEY_PREFIXES)
+
+        self._log = self._get_log_path(self._generation).open("ab")
+        self.connection.journal = self._append
+        logger.info(f"Local db restored: {len(self.connection.data)} keys, {removed} process keys removed")
+
+    def _write(self, log: BinaryIO, buffer: bytes) -> None:
+        """
+        Запись пачки записей в журнал с одним fsync.
+        """
+        log.write(buffer)
+        log.flush()
+        os.fsync(log.fileno())
+
+    async def flush(self) -> None:
+        """
+        Запись буфера журнала на диск.
+        """
+        async with self._lock:
+            if not self._buffer or self._log is None:
+                return
+            buffer, self._buffer = bytes(self._buffer), bytearray()
+            await asyncio.to_thread(self._write, self._log, buffer)
+            self.fsyncs += 1
+
+    def _write_snapshot(self, snapshot: dict, generation: int) -> None:
+        """
+        Сериализация и атомарная запись снимка, удаление журналов, которые в него вошли.
+        """
+        content = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        snapshot_path = self.directory / SNAPSHOT_NAME
+        temporary_path = snapshot_path.with_suffix(".tmp")
+        with temporary_path.open("wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, snapshot_path)
+        directory_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+        for old_generation in self._get_log_generations():
+            if old_generation < generation:
+                self._get_log_path(old_generation).unlink()
+
+    async def snapshot(self) -> None:
+        """
+        Запись снимка хранилища.
+        Копия состояния снимается и журнал переключается на новое поколение в цикле событий без ожиданий,
+        поэтому снимок согласован с журналами. Сериализация копии и запись на диск выполняются в отдельном потоке.
+        """
+        async with self._lock:
+            if self._log is None:
+                return
+            generation = self._generation + 1
+            data, expires = self.connection.copy_data()
+            snapshot = {"generation": generation, "data": data, "expires": expires}
+            log, buffer = self._log, bytes(self._buffer)
+            self._buffer = bytearray()
+            self._log = self._get_log_path(generation).open("ab")
+            self._generation = generation
+
+            # Старый журнал дописывается до конца, чтобы при ошибке записи снимка данные не потерялись
+            with log:
+                await asyncio.to_thread(self._write, log, buffer)
+            await asyncio.to_thread(self._write_snapshot, snapshot, generation)
+            self._last_snapshot = time.monotonic()
+            self.snapshots += 1
+
+    async def run(self) -> None:
+        """
+        Фоновая задача: записывает журнал с заданным интервалом и периодически делает снимок.
+        """
+        while True:
+            await asyncio.sleep(self._fsync_interval)
+            try:
+                if time.monotonic() - self._last_snapshot >= self._snapshot_interval:
+                    await self.snapshot()
+                else:
+                    await self.flush()
+            except Exception as e:
+                logger.error(f"Failed to persist local db: {e}")
+
+    async def close(self) -> None:
+        """
+        Запись снимка и закрытие журнала при остановке.
+        """
+        if self._log is None:
+            return
+        await self.snapshot()
+        self.connection.journal = None
+        with contextlib.suppress(OSError):
+            self._log.close()
+        self._log = None
+
+    def stats(self) -> dict[str, int]:
+        """
+        Статистика сохранения на диск.
+        """
+        return {
+            "generation": self._generation,
+            "pending_bytes": len(self._buffer),
+            "written_records": self.written_records,
+            "fsyncs": self.fsyncs,
+            "snapshots": self.snapshots,
+        }
+
+
+# Сохраняется только хранилище в памяти процесса, при работе с редисом за сохранность отвечает сам редис
+local_persistence = LocalPersistence(
+    settings.local_db_persistence_dir if settings.local_db and settings.local_db_backend == "memory" else ""
+)
@@ -2,65 +2,653 @@
 Модуль для эмуляции Redis в локальном окружении.
 """
 
+import asyncio
+import bisect
+import heapq
+import math
+import time
 import uuid
+from collections import OrderedDict
 from collections.abc import Callable
+from collections.abc import Iterator
 from functools import cached_property
 from functools import wraps
 from types import TracebackType
 
 from pydantic import BaseModel
 
-from logic.utils.json_utils import from_json
-from logic.utils.json_utils import to_json
+from config.settings import settings
 from managers.repository.base_manager import BaseRepositoryManager
+from managers.repository.codecs import definition_registry
+from managers.repository.indexes import IndexChanges
 from models import exceptions
 
+# Префиксы служебных ключей: связки ключей JWT и блокировки ее ротации, черного списка токенов, версии каталога,
+# комнат, отметок процессов и реестра SocketIO-соединений. Их нельзя восстановить из базы данных,
+# поэтому они не вытесняются
+SERVICE_KEY_PREFIXES = ("jwt_keyring", "blacklist:", "catalog_version", "game_room", "game_worker", "socket_")
+# Префиксы ключей, принадлежащих работающим процессам: комнат, отметок процессов и SocketIO-соединений
+PROCESS_KEY_PREFIXES = ("game_room", "game_worker", "socket_")
 
-class LocalConnection:
+
+def select_lex_range(
+    members: list[str], lower: str, upper: str, start: int | None = None, num: int | None = None
+) -> list[str]:
+    """
+    Выборка элементов упорядоченного списка по границам в формате ZRANGEBYLEX: "-", "+", "[значение", "(значение".
+    """
+    match lower[:1]:
+        case "-":
+            low = 0
+        case "[":
+            low = bisect.bisect_left(members, lower[1:])
+        case "(":
+            low = bisect.bisect_right(members, lower[1:])
+        case _:
+            msg = "min or max not valid string range item"
+            raise exceptions.PythonError(msg)
+    match upper[:1]:
+        case "+":
+            high = len(members)
+        case "[":
+            high = bisect.bisect_right(members, upper[1:])
+        case "(":
+            high = bisect.bisect_left(members, upper[1:])
+        case _:
+            msg = "min or max not valid string range item"
+            raise exceptions.PythonError(msg)
+    if start is not None:
+        low += start
+        if num is not None and num >= 0:
+            high = min(high, low + num)
+    return members[low:high]
+
+
+# Публичные методы повторяют команды редиса, которые эмулирует класс, поэтому их число не сокращается
+class LocalConnection:  # noqa: PLR0904
     """
     Класс для эмуляции Redis в локальном окружении.
+
+    Поддерживает время жизни ключей: истекшие ключи удаляются при обращении к ним и периодически
+    по куче сроков истечения. При заданном max_bytes перед записью вытесняются ключи по политике
+    в стиле Redis: noeviction, allkeys-lru, allkeys-lfu, volatile-lru, volatile-lfu.
+    Размер ключей считается приблизительно, по длине ключа и значений.
+    Если задан journal, каждое изменение передается в него записью, которую можно применить
+    повторно через apply_record.
     """
 
-    def __init__(self) -> None:
-        self.data: dict[str, str] = {}
+    def __init__(
+        self,
+        max_bytes: int = 0,
+        eviction_policy: str = "allkeys-lru",
+        pinned_prefixes: tuple[str, ...] = (),
+    ) -> None:
+        """
+        :param max_bytes: Максимальный размер данных, 0 — без ограничения.
+        :param eviction_policy: Политика вытеснения ключей при превышении max_bytes.
+        :param pinned_prefixes: Префиксы ключей, которые никогда не вытесняются.
+        """
+        # Порядок ключей — от давно использованных к недавно использованным
+        self.data: OrderedDict[str, str | bytes | dict[str, str | bytes] | set[str] | list[str]] = OrderedDict()
+        self.expires: dict[str, float] = {}
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+        self.pinned_prefixes = pinned_prefixes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired_keys = 0
+        self.evicted_keys = 0
+
+        self._sizes: dict[str, int] = {}
+        self._expire_heap: list[tuple[float, str]] = []
+        # Счетчики обращений для LFU и ключи, сгруппированные по счетчику
+        self._frequencies: dict[str, int] = {}
+        self._frequency_keys: dict[int, dict[str, None]] = {}
+        self.journal: Callable[[tuple], None] | None = None
+
+    def _journal(self, *record) -> None:
+        """
+        Передача изменения в журнал.
+        """
+        if self.journal is not None:
+            self.journal(record)
+
+    @staticmethod
+    def _get_size(value: str | bytes | int) -> int:
+        """
+        Приблизительный размер значения.
+        """
+        return len(value) if isinstance(value, str | bytes) else len(str(value))
+
+    def _get_key_size(self, key: str) -> int:
+        """
+        Приблизительный размер ключа вместе со значением.
+        """
+        value = self.data[key]
+        match value:
+            case dict():
+                size = sum(self._get_size(field) + self._get_size(field_value) for field, field_value in value.items())
+            case set() | list():
+                size = sum(map(self._get_size, value))
+            case _:
+                size = self._get_size(value)
+        return len(key) + size
+
+    def _resize(self, key: str, delta: int | None = None) -> None:
+        """
+        Учет изменения размера ключа. Если изменение не передано, размер пересчитывается целиком.
+        """
+        if delta is None:
+            delta = self._get_key_size(key) - self._sizes.get(key, 0)
+        self._sizes[key] = self._sizes.get(key, 0) + delta
+        self.used_bytes += delta
+
+    def _touch(self, key: str) -> None:
+        """
+        Учет обращения к ключу для политики вытеснения.
+        """
+        if self.eviction_policy.endswith("lfu"):
+            frequency = self._frequencies.get(key, 0)
+            if frequency:
+                keys = self._frequency_keys[frequency]
+                del keys[key]
+                if not keys:
+                    del self._frequency_keys[frequency]
+            self._frequencies[key] = frequency + 1
+            self._frequency_keys.setdefault(frequency + 1, {})[key] = None
+        else:
+            self.data.move_to_end(key)
+
+    def _remove(self, key: str) -> bool:
+        """
+        Удаление ключа вместе со сроком жизни и служебными данными.
+        """
+        if key not in self.data:
+            return False
+        del self.data[key]
+        self.expires.pop(key, None)
+        self.used_bytes -= self._sizes.pop(key, 0)
+        if (frequency := self._frequencies.pop(key, None)) is not None:
+            keys = self._frequency_keys[frequency]
+            del keys[key]
+            if not keys:
+                del self._frequency_keys[frequency]
+        return True
+
+    def _check_expired(self, key: str) -> None:
+        """
+        Удаляет ключ, если его время жизни истекло.
+        """
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._remove(key)
+            self.expired_keys += 1
+
+    def _lookup(self, key: str) -> str | bytes | dict[str, str | bytes] | set[str] | None:
+        """
+        Получение значения ключа для чтения с учетом попаданий и промахов.
+        """
+        self._check_expired(key)
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(key)
+        return value
+
+    def _get_for_write(self, key: str, default: dict | set) -> dict | set:
+        """
+        Получение хэша или множества для изменения, при отсутствии ключ создается.
+        """
+        self._check_expired(key)
+        value = self.data.get(key)
+        if value is None:
+            value = self.data[key] = default
+            self._resize(key)
+        self._touch(key)
+        return value
+
+    def _store(self, key: str, value: str | bytes | dict[str, str | bytes] | set[str]) -> None:
+        """
+        Запись значения ключа целиком.
+        """
+        self.data[key] = value
+        self._resize(key)
+        self._touch(key)
+
+    def _set_expire_at(self, key: str, expires_at: float | None) -> None:
+        """
+        Установка момента истечения времени жизни ключа. None снимает время жизни.
+        """
+        if expires_at is None:
+            self.expires.pop(key, None)
+            return
+        self.expires[key] = expires_at
+        heapq.heappush(self._expire_heap, (expires_at, key))
+
+    def _get_eviction_candidates(self) -> Iterator[str]:
+        """
+        Ключи в порядке вытеснения согласно политике.
+        """
+        if self.eviction_policy.endswith("lfu"):
+            keys = (key for frequency in sorted(self._frequency_keys) for key in self._frequency_keys[frequency])
+        else:
+            keys = iter(self.data)
+        if self.eviction_policy.startswith("volatile"):
+            keys = (key for key in keys if key in self.expires)
+        return (key for key in keys if not key.startswith(self.pinned_prefixes))
+
+    def _ensure_memory(self) -> None:
+        """
+        Освобождение памяти перед записью. Как и в Redis, проверка выполняется до выполнения команды.
+        """
+        if not self.max_bytes or self.used_bytes <= self.max_bytes:
+            return
+        if self.eviction_policy == "noeviction":
+            msg = "OOM command not allowed when used memory > 'max_bytes'"
+            raise exceptions.PythonError(msg)
+
+        victims = []
+        freed = 0
+        for key in self._get_eviction_candidates():
+            if self.used_bytes - freed <= self.max_bytes:
+                break
+            victims.append(key)
+            freed += self._sizes.get(key, 0)
+        for key in victims:
+            self._remove(key)
+        self.evicted_keys += len(victims)
+        if victims:
+            self._journal("delete", victims)
+
+    def sweep_expired(self) -> int:
+        """
+        Удаление ключей с истекшим временем жизни.
+        Записи кучи, у которых время жизни было изменено или снято, пропускаются.
+
+        :return: Количество удаленных ключей.
+        """
+        now = time.time()
+        removed = 0
+        while self._expire_heap and self._expire_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expire_heap)
+            if self.expires.get(key) == expires_at:
+                self._remove(key)
+                removed += 1
+        self.expired_keys += removed
+        return removed
 
     async def get(self, key: str) -> str | None:
         """
         Функция получения из редиса.
         """
-        return self.data.get(key)
+        return self._lookup(key)
 
-    async def set(self, key: str, value: str) -> bool:
+    async def set(self, key: str, value: str, ex: int | None = None, nx: bool = False) -> bool | None:
         """
         Функция добавления в редис.
+
+        :param nx: Записать значение, только если ключа нет. Если ключ есть, возвращается None.
+        """
+        self._check_expired(key)
+        if nx and key in self.data:
+            return None
+        self._ensure_memory()
+        self._store(key, value)
+        self._set_expire_at(key, None if ex is None else time.time() + ex)
+        self._journal("set", key, value, self.expires.get(key))
+        return True
+
+    async def hset(
+        self, name: str, key: str | None = None, value: str | None = None, mapping: dict | None = None
+    ) -> int:
         """
-        self.data[key] = value
+        Функция установки полей хэша.
+        """
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+
+        self._ensure_memory()
+        hash_ = self._get_for_write(name, {})
+        added = 0
+        delta = 0
+        for field, field_value in fields.items():
+            if field in hash_:
+                delta -= self._get_size(hash_[field])
+            else:
+                added += 1
+                delta += self._get_size(field)
+            delta += self._get_size(field_value)
+            hash_[field] = field_value
+        self._resize(name, delta)
+        self._journal("hset", name, fields)
+        return added
+
+    async def hget(self, name: str, key: str) -> str | None:
+        """
+        Функция получения поля хэша.
+        """
+        return (self._lookup(name) or {}).get(key)
+
+    async def hgetall(self, name: str) -> dict[str, str]:
+        """
+        Функция получения всех полей хэша.
+        """
+        return dict(self._lookup(name) or {})
+
+    async def setex(self, key: str, time_: int, value: str) -> bool:
+        """
+        Функция добавления в редис с временем жизни в секундах.
+        """
+        return await self.set(key, value, ex=time_)
+
+    async def expire(self, key: str, time_: int) -> bool:
+        """
+        Функция установки времени жизни ключа в секундах.
+        """
+        self._check_expired(key)
+        if key not in self.data:
+            return False
+        self._set_expire_at(key, time.time() + time_)
+        self._journal("expire", key, self.expires[key])
         return True
 
-    async def delete(self, key: str) -> bool:
+    async def persist(self, key: str) -> bool:
         """
-        Функция удаления из редиса.
+        Функция снятия времени жизни ключа.
         """
-        try:
-            del self.data[key]
-        except KeyError:
+        self._check_expired(key)
+        if self.expires.pop(key, None) is None:
             return False
-        else:
-            return True
+        self._journal("expire", key, None)
+        return True
+
+    async def ttl(self, key: str) -> int:
+        """
+        Функция получения оставшегося времени жизни ключа в секундах.
+        -2, если ключа нет, -1, если время жизни не задано.
+        """
+        self._check_expired(key)
+        if key not in self.data:
+            return -2
+        if key not in self.expires:
+            return -1
+        return math.ceil(self.expires[key] - time.time())
+
+    async def delete(self, *keys: str) -> int:
+        """
+        Функция удаления из редиса.
+        """
+        deleted = 0
+        for key in keys:
+            self._check_expired(key)
+            deleted += self._remove(key)
+        if deleted:
+            self._journal("delete", keys)
+        return deleted
+
+    async def mhgetall(self, names: list[str]) -> list[dict[str, str]]:
+        """
+        Функция получения всех полей нескольких хэшей.
+        """
+        return [dict(self._lookup(name) or {}) for name in names]
+
+    async def mhreplace(self, hashes: dict[str, dict[str, str]]) -> bool:
+        """
+        Функция полной замены нескольких хэшей.
+        """
+        self._ensure_memory()
+        for name, fields in hashes.items():
+            self._remove(name)
+            if fields:
+                self._store(name, dict(fields))
+        self._journal("replace", hashes)
+        return True
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        """
+        Функция увеличения счетчика, по умолчанию на единицу.
+        """
+        self._ensure_memory()
+        self._check_expired(key)
+        value = int(self.data.get(key, 0)) + amount
+        self._store(key, str(value))
+        self._journal("set", key, str(value), self.expires.get(key))
+        return value
+
+    async def sadd(self, name: str, *values: str) -> int:
+        """
+        Функция добавления элементов в множество.
+        """
+        self._ensure_memory()
+        set_ = self._get_for_write(name, set())
+        new_values = set(values) - set_
+        set_.update(new_values)
+        self._resize(name, sum(map(self._get_size, new_values)))
+        if new_values:
+            self._journal("sadd", name, new_values)
+        return len(new_values)
+
+    async def spop(self, name: str, count: int | None = None) -> str | list[str] | None:
+        """
+        Функция извлечения элементов из множества.
+        """
+        set_ = self._lookup(name) or set()
+        popped = [set_.pop() for _ in range(min(len(set_), 1 if count is None else count))]
+        if not set_:
+            self._remove(name)
+        elif popped:
+            self._resize(name, -sum(map(self._get_size, popped)))
+        if popped:
+            # Извлеченные элементы выбираются случайно, поэтому в журнал пишется их удаление
+            self._journal("srem", name, popped)
+        if count is None:
+            return popped[0] if popped else None
+        return popped
+
+    async def srem(self, name: str, *values: str) -> int:
+        """
+        Функция удаления элементов из множества.
+        """
+        set_ = self._lookup(name) or set()
+        removed = set_ & set(values)
+        set_.difference_update(removed)
+        if not set_:
+            self._remove(name)
+        elif removed:
+            self._resize(name, -sum(map(self._get_size, removed)))
+        if removed:
+            self._journal("srem", name, removed)
+        return len(removed)
+
+    async def smembers(self, name: str) -> "set[str]":
+        """
+        Функция получения элементов множества.
+        """
+        return set(self._lookup(name) or ())
+
+    async def scard(self, name: str) -> int:
+        """
+        Функция получения размера множества.
+        """
+        return len(self._lookup(name) or ())
+
+    async def zadd(self, name: str, mapping: dict[str, float]) -> int:
+        """
+        Функция добавления элементов в упорядоченное множество.
+        Поддерживаются только множества с одинаковыми оценками, упорядоченные по значению элементов,
+        как индексы для ZRANGEBYLEX.
+        """
+        self._ensure_memory()
+        members = self._get_for_write(name, [])
+        added = []
+        for member in mapping:
+            index = bisect.bisect_left(members, member)
+            if index == len(members) or members[index] != member:
+                members.insert(index, member)
+                added.append(member)
+        self._resize(name, sum(map(self._get_size, added)))
+        if added:
+            self._journal("zadd", name, added)
+        return len(added)
+
+    async def zrem(self, name: str, *values: str) -> int:
+        """
+        Функция удаления элементов из упорядоченного множества.
+        """
+        members = self._lookup(name) or []
+        removed = []
+        for value in values:
+            index = bisect.bisect_left(members, value)
+            if index < len(members) and members[index] == value:
+                del members[index]
+                removed.append(value)
+        if not members:
+            self._remove(name)
+        elif removed:
+            self._resize(name, -sum(map(self._get_size, removed)))
+        if removed:
+            self._journal("zrem", name, removed)
+        return len(removed)
+
+    async def zrangebylex(
+        self, name: str, min: str, max: str, start: int | None = None, num: int | None = None
+    ) -> list[str]:
+        """
+        Функция получения элементов упорядоченного множества в лексикографическом диапазоне.
+        """
+        return select_lex_range(self._lookup(name) or [], min, max, start, num)
+
+    async def zcard(self, name: str) -> int:
+        """
+        Функция получения размера упорядоченного множества.
+        """
+        return len(self._lookup(name) or ())
 
     async def exists(self, key: str) -> bool:
         """
         Проверка существования.
         """
+        self._check_expired(key)
         return key in self.data
 
     async def flushdb(self) -> bool:
         """
         Очистка значений.
         """
-        self.data = {}
+        self._clear()
+        self._journal("flush")
         return True
 
+    def _clear(self) -> None:
+        """
+        Удаление всех ключей и служебных данных.
+        """
+        self.data = OrderedDict()
+        self.expires = {}
+        self.used_bytes = 0
+        self._sizes = {}
+        self._expire_heap = []
+        self._frequencies = {}
+        self._frequency_keys = {}
+
+    def copy_data(self) -> tuple[dict, dict[str, float]]:
+        """
+        Копия данных и сроков жизни для снимка. Строки неизменяемы и не копируются,
+        а хэши, множества и упорядоченные множества изменяются на месте, поэтому копируются на один уровень.
+        """
+        data = {
+            key: value.copy() if isinstance(value, dict | set | list) else value for key, value in self.data.items()
+        }
+        return data, dict(self.expires)
+
+    def restore(self, data: dict, expires: dict[str, float]) -> None:
+        """
+        Восстановление данных из снимка.
+        """
+        self._clear()
+        for key, value in data.items():
+            self._store(key, value)
+        for key, expires_at in expires.items():
+            self._set_expire_at(key, expires_at)
+
+    def remove_prefixes(self, prefixes: tuple[str, ...]) -> int:
+        """
+        Удаление ключей с заданными префиксами.
+        """
+        keys = [key for key in self.data if key.startswith(prefixes)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def apply_record(self, record: tuple) -> None:
+        """
+        Применение записи журнала.
+        """
+        match record:
+            case ("set", key, value, expires_at):
+                self._store(key, value)
+                self._set_expire_at(key, expires_at)
+            case ("hset", name, fields):
+                self._get_for_write(name, {}).update(fields)
+                self._resize(name)
+            case ("sadd", name, values):
+                self._get_for_write(name, set()).update(values)
+                self._resize(name)
+            case ("srem", name, values):
+                if (set_ := self.data.get(name)) is not None:
+                    set_.difference_update(values)
+                    if set_:
+                        self._resize(name)
+                    else:
+                        self._remove(name)
+            case ("zadd", name, members):
+                sorted_set = self._get_for_write(name, [])
+                sorted_set[:] = sorted(set(sorted_set).union(members))
+                self._resize(name)
+            case ("zrem", name, members):
+                if (sorted_set := self.data.get(name)) is not None:
+                    sorted_set[:] = sorted(set(sorted_set).difference(members))
+                    if sorted_set:
+                        self._resize(name)
+                    else:
+                        self._remove(name)
+            case ("delete", keys):
+                for key in keys:
+                    self._remove(key)
+            case ("replace", hashes):
+                for name, fields in hashes.items():
+                    self._remove(name)
+                    if fields:
+                        self._store(name, dict(fields))
+            case ("expire", key, expires_at):
+                if key in self.data:
+                    self._set_expire_at(key, expires_at)
+            case ("flush",):
+                self._clear()
+            case _:
+                msg = f"Unknown journal record: {record[0]}"
+                raise exceptions.PythonError(msg)
+
+    async def info(self) -> dict[str, int | str]:
+        """
+        Статистика хранилища в духе команды INFO.
+        """
+        return {
+            "keys": len(self.data),
+            "expires": len(self.expires),
+            "used_bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+            "eviction_policy": self.eviction_policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired_keys": self.expired_keys,
+            "evicted_keys": self.evicted_keys,
+        }
+
     async def __aenter__(self) -> "LocalConnection":
         """
         Асинхронный вход в контекст.
@@ -80,12 +668,46 @@ class AsyncLocalRedisManager(BaseRepositoryManager):
     Класс для управления виртуальным взаимодействием с базой данных.
     """
 
+    connection_types: tuple[type, ...] = (LocalConnection,)
+
     @cached_property
     def connection(self) -> LocalConnection:
         """
         Функция подключения.
         """
-        return LocalConnection()
+        return LocalConnection(
+            max_bytes=settings.local_db_max_bytes,
+            eviction_policy=settings.local_db_eviction_policy,
+            # Определения нужны для чтения данных, множества измененных объектов — для записи в базу данных,
+            # а индексы без значений объектов нельзя было бы очистить
+            pinned_prefixes=(
+                self._get_definition_key(""),
+                self._get_dirty_key(""),
+                self._get_processing_key(""),
+                "index:",
+                "index_values:",
+                *SERVICE_KEY_PREFIXES,
+            ),
+        )
+
+    async def run_expiration(self) -> None:
+        """
+        Фоновая задача: периодически удаляет ключи с истекшим временем жизни.
+        """
+        while True:
+            await asyncio.sleep(settings.local_db_expire_interval)
+            self.connection.sweep_expired()
+
+    async def close(self) -> None:
+        """
+        Закрывает подключение. Локальному хранилищу закрывать нечего.
+        """
+
+    async def ping(self) -> bool:
+        """
+        Проверка доступности хранилища.
+        """
+        return True
 
     @staticmethod
     def _correct_connection(command_coro_func: Callable):
@@ -103,19 +725,18 @@ class AsyncLocalRedisManager(BaseRepositoryManager):
             match connection:
                 case None:
                     connection = self.connection
-                case LocalConnection():
+                case _ if isinstance(connection, self.connection_types):
                     ...
                 case _:
                     msg = "Can't connect to redis"
                     raise exceptions.PythonError(msg)
 
-            async with connection:
-                return await command_coro_func(
-                    self,
-                    *args,
-                    connection=connection,
-                    **kwargs,
-                )
+            return await command_coro_func(
+                self,
+                *args,
+                connection=connection,
+                **kwargs,
+            )
 
         return inner
 
@@ -126,6 +747,63 @@ class AsyncLocalRedisManager(BaseRepositoryManager):
         """
         return f"{name}:{id}"
 
+    async def _save_definitions(self, definitions: dict[str, bytes], connection: LocalConnection) -> None:
+        """
+        Сохраняет новые определения.
+        """
+        for uid, definition in definitions.items():
+            await connection.set(self._get_definition_key(uid), definition)
+
+    async def _replace(
+        self,
+        redis_key: str,
+        fields: dict[str, str | bytes],
+        definitions: dict[str, bytes],
+        connection: LocalConnection,
+    ) -> None:
+        """
+        Заменяет хэш и сохраняет новые определения.
+        """
+        await self._save_definitions(definitions, connection=connection)
+        await connection.mhreplace({redis_key: fields})
+
+    @_correct_connection
+    async def _load_definitions(self, uids: set[str], connection: LocalConnection = None) -> None:
+        """
+        Загружает определения в реестр процесса.
+        """
+        for uid in uids:
+            definition = await connection.get(self._get_definition_key(uid))
+            if definition is None:
+                msg = f"Definition {uid} not found"
+                raise exceptions.PythonError(msg)
+            definition_registry.register(uid, definition)
+
+    @_correct_connection
+    async def _read_index_values(self, keys: list[str], connection: LocalConnection = None) -> list[dict[str, str]]:
+        """
+        Читает значения индексов объектов.
+        """
+        return await connection.mhgetall(keys)
+
+    @_correct_connection
+    async def _write_index_changes(self, changes: IndexChanges, connection: LocalConnection = None) -> None:
+        """
+        Записывает изменения индексов.
+        """
+        for key, member in changes.removed:
+            await connection.zrem(key, member)
+        for key, member in changes.added:
+            await connection.zadd(key, {member: 0})
+        await connection.mhreplace(changes.values)
+
+    @_correct_connection
+    async def _get_missing_ids(self, name: str, ids: list[str], connection: LocalConnection = None) -> list[str]:
+        """
+        Выбирает id объектов модели, которых нет в хранилище.
+        """
+        return [id for id in ids if not await connection.exists(self._get_uniq_name(name, id))]
+
     @_correct_connection
     async def create(
         self,
@@ -142,14 +820,8 @@ class AsyncLocalRedisManager(BaseRepositoryManager):
         if id is None:
             id = uuid.uuid4()
         uniq_name = self._get_uniq_name(name, id)
-        match data:
-            case BaseModel():
-                json_value = data.model_dump_json()
-            case dict():
-                json_value = to_json(data)
-            case _:
-                raise exceptions.PythonError
-        await connection.set(uniq_name, json_value)
+        await self._replace(uniq_name, *self._to_fields(name, data), connection=connection)
+        await self._update_indexes(name, {id: data}, connection=connection)
         return id
 
     @_correct_connection
@@ -163,11 +835,11 @@ class AsyncLocalRedisManager(BaseRepositoryManager):
         Извлекает значение из Redis по id.
         """
         uniq_name = self._get_uniq_name(name, id)
-        json_data = await connection.get(uniq_name)
-        if json_data is None:
+        fields = await connection.hgetall(uniq_name)
+        if not fields:
             msg = "Invalid name or id"
             raise exceptions.PythonError(msg)
-        return from_json(json_data)
+        return await self._from_fields(name, fields, connection=connection)
 
     @_correct_connection
     async def delete(
@@ -180,7 +852,9 @@ class AsyncLocalRedisManager(BaseRepositoryManager):
         Удаляет ключ из Redis.
         """
         uniq_name = self._get_uniq_name(name, id)
-        return await connection.delete(uniq_name)
+        deleted = await connection.delete(uniq_name)
+        await self._update_indexes(name, {id: None}, connection=connection)
+        return deleted
 
     @_correct_connection
     async def update(
@@ -191,29 +865,135 @@ class AsyncLocalRedisManager(BaseRepositoryManager):
         **to_update_items,
     ) -> bool:
         """
-        Обновляет значения из объекта Redis по id.
+        Атомарно обновляет отдельные поля объекта по id.
         """
-        updatable = await self.get_by_id(name, id, connection=connection)
-        for field, value in to_update_items.items():
-            updatable[field] = value
         redis_key = self._get_uniq_name(name, id)
-        json_data = to_json(updatable)
-        return await connection.set(redis_key, json_data)
+        if not await connection.exists(redis_key):
+            msg = "Invalid name or id"
+            raise exceptions.PythonError(msg)
+        if to_update_items:
+            fields, definitions = self._to_fields(name, to_update_items)
+            await self._save_definitions(definitions, connection=connection)
+            await connection.hset(redis_key, mapping=fields)
+            await self._update_indexes(name, {id: to_update_items}, connection=connection, partial=True)
+        return True
 
     @_correct_connection
     async def full_update(
         self,
         name: str,
         id: uuid.UUID,
-        new_value: dict,
+        new_value: dict | BaseModel,
         connection: LocalConnection = None,
     ) -> bool:
         """
         Обновляет объект из Redis по id.
         """
-        new_json_value = to_json(new_value)
         redis_key = self._get_uniq_name(name, id)
-        return await connection.set(redis_key, new_json_value)
+        await self._replace(redis_key, *self._to_fields(name, new_value), connection=connection)
+        await self._update_indexes(name, {id: new_value}, connection=connection)
+        return True
+
+    @_correct_connection
+    async def get_many(
+        self,
+        name: str,
+        ids: list[uuid.UUID],
+        connection: LocalConnection = None,
+    ) -> list[dict | None]:
+        """
+        Извлекает несколько значений по списку id.
+        """
+        results = await connection.mhgetall([self._get_uniq_name(name, id) for id in ids])
+        return [await self._from_fields(name, fields, connection=connection) if fields else None for fields in results]
+
+    @_correct_connection
+    async def set_many(
+        self,
+        name: str,
+        values: dict[uuid.UUID, dict | BaseModel],
+        connection: LocalConnection = None,
+    ) -> bool:
+        """
+        Заменяет несколько объектов.
+        """
+        hashes = {}
+        for id, value in values.items():
+            hashes[self._get_uniq_name(name, id)], definitions = self._to_fields(name, value)
+            await self._save_definitions(definitions, connection=connection)
+        await connection.mhreplace(hashes)
+        await self._update_indexes(name, values, connection=connection)
+        return True
+
+    @_correct_connection
+    async def delete_many(
+        self,
+        name: str,
+        ids: list[uuid.UUID],
+        connection: LocalConnection = None,
+    ) -> int:
+        """
+        Удаляет несколько ключей.
+        """
+        deleted = await connection.delete(*(self._get_uniq_name(name, id) for id in ids))
+        await self._update_indexes(name, dict.fromkeys(ids), connection=connection)
+        return deleted
+
+    @_correct_connection
+    async def mark_dirty(
+        self,
+        name: str,
+        ids: list[uuid.UUID | str],
+        connection: LocalConnection = None,
+    ) -> None:
+        """
+        Помечает объекты как измененные.
+        """
+        if ids:
+            await connection.sadd(self._get_dirty_key(name), *map(str, ids))
+
+    @_correct_connection
+    async def pop_dirty(
+        self,
+        name: str,
+        count: int,
+        connection: LocalConnection = None,
+    ) -> list[str]:
+        """
+        Извлекает идентификаторы измененных объектов и переносит их в множество обрабатываемых.
+        """
+        ids = await connection.spop(self._get_dirty_key(name), count)
+        if ids:
+            await connection.sadd(self._get_processing_key(name), *ids)
+        return ids
+
+    @_correct_connection
+    async def ack_dirty(
+        self,
+        name: str,
+        ids: list[str],
+        connection: LocalConnection = None,
+    ) -> None:
+        """
+        Удаляет записанные объекты из множества обрабатываемых.
+        """
+        if ids:
+            await connection.srem(self._get_processing_key(name), *ids)
+
+    @_correct_connection
+    async def restore_dirty(
+        self,
+        name: str,
+        connection: LocalConnection = None,
+    ) -> int:
+        """
+        Возвращает необработанные идентификаторы в множество измененных.
+        """
+        ids = await connection.smembers(self._get_processing_key(name))
+        if ids:
+            await connection.sadd(self._get_dirty_key(name), *ids)
+            await connection.delete(self._get_processing_key(name))
+        return len(ids)
 
     @_correct_connection
     async def exists(
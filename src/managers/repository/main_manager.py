@@ -6,8 +6,11 @@ from config.settings import settings
 from logic.utils.common_utils import Singleton
 from managers.repository.async_redis_manager import AsyncRedisManager
 from managers.repository.local_redis_manager import AsyncLocalRedisManager
+from managers.repository.shared_memory_manager import AsyncSharedMemoryManager
 
-if settings.local_db:
+if settings.local_db and settings.local_db_backend == "shared":
+    BaseClass = AsyncSharedMemoryManager
+elif settings.local_db:
     BaseClass = AsyncLocalRedisManager
 else:
     BaseClass = AsyncRedisManager
@@ -0,0 +1,21 @@
+"""
+Модуль общего подключения к Redis для служебных данных.
+"""
+
+from typing import TYPE_CHECKING
+
+from redis.asyncio import RedisCluster
+from redis.asyncio.client import Redis
+
+if TYPE_CHECKING:
+    from managers.repository.local_redis_manager import LocalConnection
+
+
+def get_redis_client() -> "Redis | RedisCluster | LocalConnection":
+    """
+    Общий для процесса клиент редиса.
+    Использует пул подключений основного репозитория, при settings.local_db — локальное хранилище.
+    """
+    from managers.repository.main_manager import MainRepositoryManager
+
+    return MainRepositoryManager().connection
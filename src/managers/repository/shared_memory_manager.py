@@ -0,0 +1,959 @@
+"""
+Модуль локального хранилища в общей памяти, доступного нескольким процессам сервера на одном узле.
+
+Данные хранятся в файле, отображенном в память (по умолчанию в /dev/shm), как хэш-таблица
+с ячейками фиксированного размера. Таблица разделена на сегменты: ключ всегда размещается в сегменте,
+выбранном по его хэшу, а свободная ячейка ищется линейным пробированием внутри сегмента.
+Каждый сегмент защищен своей блокировкой fcntl.lockf, поэтому процессы, работающие с разными сегментами,
+не мешают друг другу. Блокировка берется без ожидания в системном вызове: пока сегмент занят другим процессом,
+цикл событий продолжает работу. Блокировки fcntl принадлежат процессу, поэтому код под блокировкой
+не содержит ожиданий и другие корутины процесса не могут в него войти.
+
+Удаленный ключ оставляет в ячейке метку, чтобы не прерывать цепочки пробирования, а запись занимает первую
+такую ячейку на пути ключа. Когда при поиске ключа пройдено слишком много меток, сегмент перестраивается на месте.
+
+Хэш, множество или упорядоченное множество, не помещающиеся в ячейку, разбиваются на части по диапазонам
+элементов. Части хранятся в ячейках сегмента ключа, поэтому защищены той же блокировкой, а ячейка ключа
+хранит заголовок с границами частей. Изменение перезаписывает только части с измененными элементами.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import errno
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import pickle
+import struct
+import time
+from collections.abc import AsyncGenerator
+from collections.abc import Callable
+from collections.abc import Generator
+from collections.abc import Iterator
+from functools import cached_property
+from types import TracebackType
+from typing import Any
+from typing import Self
+
+from config.settings import settings
+from managers.repository.local_redis_manager import AsyncLocalRedisManager
+from managers.repository.local_redis_manager import select_lex_range
+from models import exceptions
+
+MAGIC = b"RGLKSHM1"
+# Заголовок файла: сигнатура, количество ячеек, размер ячейки, количество сегментов
+FILE_HEADER = struct.Struct("<8sIII")
+# Заголовок ячейки: состояние, хэш ключа, момент истечения времени жизни (0 — без времени жизни),
+# длина ключа, длина значения
+SLOT_HEADER = struct.Struct("<BQdHI")
+
+EMPTY = 0
+USED = 1
+DELETED = 2
+# Ячейка ключа коллекции, разбитой на части, и ячейка части
+COLLECTION = 3
+CHUNK = 4
+
+# Место, оставляемое в ячейке части под суффикс ее ключа с номером части
+CHUNK_KEY_RESERVE = 12
+
+# Смещение блокировки инициализации файла, блокировки сегментов идут следом
+INIT_LOCK = 0
+# Число попыток взять занятую блокировку сегмента с передачей управления циклу событий,
+# после которых между попытками делается пауза
+LOCK_SPIN_ATTEMPTS = 100
+LOCK_RETRY_DELAY = 0.001
+# Доля ячеек сегмента, занятых метками удаленных ключей на пути поиска, после которой сегмент перестраивается
+REHASH_TOMBSTONE_RATIO = 0.25
+
+
+def get_key_hash(key: bytes) -> int:
+    """
+    Хэш ключа, одинаковый во всех процессах.
+    """
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def select_members(value: dict | set | list, members: list[str]) -> dict | set | list:
+    """
+    Коллекция того же типа из заданных элементов.
+    """
+    if isinstance(value, dict):
+        return {member: value[member] for member in members}
+    return type(value)(members)
+
+
+def merge_chunks(chunks: list[dict | set | list]) -> dict | set | list:
+    """
+    Сборка коллекции из частей, упорядоченных по элементам.
+    """
+    value = type(chunks[0])()
+    for chunk in chunks:
+        if isinstance(value, list):
+            value.extend(chunk)
+        else:
+            value.update(chunk)
+    return value
+
+
+class CollectionHeader:
+    """
+    Заголовок коллекции, разбитой на части.
+
+    Часть i содержит элементы от fences[i] до fences[i + 1], первая часть — также все элементы меньше fences[0].
+    """
+
+    __slots__ = ("chunk_ids", "fences", "next_id", "size")
+
+    def __init__(self) -> None:
+        self.chunk_ids: list[int] = []
+        self.fences: list[str] = []
+        self.next_id = 0
+        self.size = 0
+
+    def get_chunk_index(self, member: str) -> int:
+        """
+        Номер части, в которой находится или будет находиться элемент.
+        """
+        return max(bisect.bisect_right(self.fences, member) - 1, 0)
+
+
+# Публичные методы повторяют команды LocalConnection, поэтому их число не сокращается
+class SharedMemoryConnection:  # noqa: PLR0904
+    """
+    Хранилище в общей памяти с командами LocalConnection.
+
+    Значение ячейки сериализуется целиком, поэтому коллекции, не помещающиеся в ячейку, разбиваются на части.
+    Время жизни проверяется при обращении к ключу и периодически через sweep_expired.
+    """
+
+    def __init__(self, path: str, slots: int, slot_size: int, stripes: int) -> None:
+        if slot_size <= SLOT_HEADER.size or slots % stripes:
+            msg = "Shared memory slots must be divisible by stripes and larger than the slot header"
+            raise exceptions.PythonError(msg)
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.stripes = stripes
+        self.slots_per_stripe = slots // stripes
+        self.hits = 0
+        self.misses = 0
+        self.expired_keys = 0
+        self.rehashes = 0
+        self._rehash_threshold = max(1, int(self.slots_per_stripe * REHASH_TOMBSTONE_RATIO))
+        self._probed_tombstones = 0
+
+        self._size = FILE_HEADER.size + slots * slot_size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._lock(INIT_LOCK):
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, self._size)
+                os.pwrite(self._fd, FILE_HEADER.pack(MAGIC, slots, slot_size, stripes), 0)
+            header = FILE_HEADER.unpack(os.pread(self._fd, FILE_HEADER.size, 0))
+            if header != (MAGIC, slots, slot_size, stripes):
+                os.close(self._fd)
+                msg = f"Shared memory file {path} has a different layout"
+                raise exceptions.PythonError(msg)
+        self._map = mmap.mmap(self._fd, self._size)
+
+    @contextlib.contextmanager
+    def _lock(self, offset: int) -> Generator[None, None, None]:
+        """
+        Блокировка байта файла для всех процессов с ожиданием. Используется только при открытии файла.
+        """
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, offset)
+
+    def _try_lock(self, stripe: int) -> bool:
+        """
+        Попытка заблокировать сегмент без ожидания.
+        """
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, 1 + stripe)
+        except OSError as e:
+            if e.errno not in {errno.EACCES, errno.EAGAIN}:
+                raise
+            return False
+        return True
+
+    def _unlock(self, stripe: int) -> None:
+        """
+        Снятие блокировки сегмента.
+        """
+        fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 1 + stripe)
+
+    @contextlib.asynccontextmanager
+    async def _stripe_lock(self, stripe: int) -> AsyncGenerator[None, None]:
+        """
+        Блокировка сегмента для всех процессов. Пока сегмент занят, управление отдается циклу событий.
+        """
+        attempts = 0
+        while not self._try_lock(stripe):
+            attempts += 1
+            await asyncio.sleep(0 if attempts < LOCK_SPIN_ATTEMPTS else LOCK_RETRY_DELAY)
+        try:
+            yield
+        finally:
+            self._unlock(stripe)
+
+    def _get_slot_offset(self, stripe: int, index: int) -> int:
+        """
+        Смещение ячейки сегмента в файле.
+        """
+        return FILE_HEADER.size + (stripe * self.slots_per_stripe + index) * self.slot_size
+
+    def _find(self, key: bytes, key_hash: int, stripe: int) -> tuple[int | None, int | None]:
+        """
+        Поиск ячейки ключа в сегменте. Вызывается под блокировкой сегмента.
+
+        Число пройденных меток удаленных ключей запоминается для решения о перестроении сегмента.
+
+        :return: Смещение ячейки с ключом и смещение первой ячейки, куда ключ можно записать.
+        """
+        start = key_hash // self.stripes
+        free_offset = None
+        tombstones = 0
+        found = None
+        for probe in range(self.slots_per_stripe):
+            offset = self._get_slot_offset(stripe, (start + probe) % self.slots_per_stripe)
+            state, slot_hash, _, key_length, _ = SLOT_HEADER.unpack_from(self._map, offset)
+            if state == EMPTY:
+                if free_offset is None:
+                    free_offset = offset
+                break
+            if state == DELETED:
+                tombstones += 1
+                if free_offset is None:
+                    free_offset = offset
+                continue
+            data_offset = offset + SLOT_HEADER.size
+            if slot_hash == key_hash and self._map[data_offset : data_offset + key_length] == key:
+                found = offset
+                break
+        self._probed_tombstones = max(self._probed_tombstones, tombstones)
+        return found, free_offset
+
+    def _rehash_stripe(self, stripe: int) -> None:
+        """
+        Перестроение сегмента на месте под его блокировкой: занятые ячейки заново размещаются по хэшам ключей,
+        метки удаленных ключей освобождаются. Новый образ сегмента собирается отдельно и копируется одной записью.
+        """
+        start = self._get_slot_offset(stripe, 0)
+        image = bytearray(self.slots_per_stripe * self.slot_size)
+        for offset, state in self._iter_stripe_slots(stripe):
+            if state in {EMPTY, DELETED}:
+                continue
+            key_hash = SLOT_HEADER.unpack_from(self._map, offset)[1]
+            index = key_hash // self.stripes % self.slots_per_stripe
+            while image[index * self.slot_size] != EMPTY:
+                index = (index + 1) % self.slots_per_stripe
+            image[index * self.slot_size : (index + 1) * self.slot_size] = self._map[offset : offset + self.slot_size]
+        self._map[start : start + len(image)] = image
+        self.rehashes += 1
+
+    def _get_slot(self, key: bytes, stripe: int, key_hash: int | None = None) -> "SlotAccessor":
+        """
+        Ячейка ключа в сегменте. Вызывается под блокировкой сегмента.
+        """
+        if key_hash is None:
+            key_hash = get_key_hash(key)
+        offset, free_offset = self._find(key, key_hash, stripe)
+        return SlotAccessor(self, key, key_hash, stripe, offset, free_offset)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, key: str) -> AsyncGenerator["SlotAccessor", None]:
+        """
+        Доступ к ячейке ключа под блокировкой его сегмента.
+        Если при поиске ключа или его частей пройдено много меток удаленных ключей,
+        после доступа сегмент перестраивается.
+        """
+        key_bytes = key.encode()
+        key_hash = get_key_hash(key_bytes)
+        stripe = key_hash % self.stripes
+        async with self._stripe_lock(stripe):
+            self._probed_tombstones = 0
+            slot = self._get_slot(key_bytes, stripe, key_hash)
+            slot.expire()
+            try:
+                yield slot
+            finally:
+                if self._probed_tombstones >= self._rehash_threshold:
+                    self._rehash_stripe(stripe)
+
+    async def _read(self, key: str, read: Callable[["SlotAccessor"], Any] | None = None) -> Any:
+        """
+        Чтение значения ключа с учетом попаданий и промахов.
+
+        :param read: Функция чтения из ячейки ключа, по умолчанию значение читается целиком.
+        """
+        async with self._slot(key) as slot:
+            value = slot.load() if read is None else read(slot)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def _get_length(self, key: str) -> int:
+        """
+        Размер коллекции.
+        """
+        value = await self._read(key, lambda slot: slot.value)
+        if isinstance(value, CollectionHeader):
+            return value.size
+        return len(value or ())
+
+    async def _modify(
+        self,
+        key: str,
+        default: Any,
+        modify: Callable[[Any, list[str] | None], Any],
+        members: list[str] | None = None,
+        limit: int | None = None,
+    ) -> Any:
+        """
+        Изменение значения ключа под блокировкой. Пустой хэш или множество удаляется.
+
+        :param modify: Функция, изменяющая коллекцию на месте и возвращающая результат команды.
+            Получает коллекцию и изменяемые в ней элементы.
+        :param members: Изменяемые элементы. У коллекции, разбитой на части, изменяются только части
+            с этими элементами, None — все части по порядку.
+        :param limit: Длина результата, после которой остальные части не изменяются.
+        """
+        if members is not None and not members:
+            return modify(default, members)
+        async with self._slot(key) as slot:
+            if slot.state == COLLECTION:
+                return slot.modify_chunks(modify, members, limit)
+            value = slot.value
+            if value is None:
+                value = default
+            result = modify(value, members)
+            if value:
+                slot.write(value, slot.expires_at)
+            else:
+                slot.delete()
+        return result
+
+    async def get(self, key: str) -> str | None:
+        """
+        Функция получения из хранилища.
+        """
+        return await self._read(key)
+
+    async def set(self, key: str, value: str, ex: int | None = None, nx: bool = False) -> bool | None:
+        """
+        Функция добавления в хранилище.
+
+        :param nx: Записать значение, только если ключа нет. Если ключ есть, возвращается None.
+        """
+        async with self._slot(key) as slot:
+            if nx and slot.value is not None:
+                return None
+            slot.write(value, time.time() + ex if ex is not None else 0)
+        return True
+
+    async def setex(self, key: str, time_: int, value: str) -> bool:
+        """
+        Функция добавления в хранилище с временем жизни в секундах.
+        """
+        return await self.set(key, value, ex=time_)
+
+    async def hset(
+        self, name: str, key: str | None = None, value: str | None = None, mapping: dict | None = None
+    ) -> int:
+        """
+        Функция установки полей хэша.
+        """
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+
+        def modify(hash_: dict, members: list[str]) -> int:
+            added = len(set(members) - hash_.keys())
+            hash_.update((member, fields[member]) for member in members)
+            return added
+
+        return await self._modify(name, {}, modify, list(fields))
+
+    async def hget(self, name: str, key: str) -> str | None:
+        """
+        Функция получения поля хэша.
+        """
+        return (await self._read(name, lambda slot: slot.load([key])) or {}).get(key)
+
+    async def hgetall(self, name: str) -> dict[str, str]:
+        """
+        Функция получения всех полей хэша.
+        """
+        return await self._read(name) or {}
+
+    async def mhgetall(self, names: list[str]) -> list[dict[str, str]]:
+        """
+        Функция получения всех полей нескольких хэшей.
+        """
+        return [await self._read(name) or {} for name in names]
+
+    async def mhreplace(self, hashes: dict[str, dict[str, str]]) -> bool:
+        """
+        Функция полной замены нескольких хэшей.
+        """
+        for name, fields in hashes.items():
+            async with self._slot(name) as slot:
+                if fields:
+                    slot.write(dict(fields), 0)
+                else:
+                    slot.delete()
+        return True
+
+    async def expire(self, key: str, time_: int) -> bool:
+        """
+        Функция установки времени жизни ключа в секундах.
+        """
+        async with self._slot(key) as slot:
+            if slot.offset is None:
+                return False
+            slot.set_expires_at(time.time() + time_)
+        return True
+
+    async def persist(self, key: str) -> bool:
+        """
+        Функция снятия времени жизни ключа.
+        """
+        async with self._slot(key) as slot:
+            if slot.offset is None or not slot.expires_at:
+                return False
+            slot.set_expires_at(0)
+        return True
+
+    async def ttl(self, key: str) -> int:
+        """
+        Функция получения оставшегося времени жизни ключа в секундах.
+        -2, если ключа нет, -1, если время жизни не задано.
+        """
+        async with self._slot(key) as slot:
+            if slot.offset is None:
+                return -2
+            if not slot.expires_at:
+                return -1
+            return math.ceil(slot.expires_at - time.time())
+
+    async def delete(self, *keys: str) -> int:
+        """
+        Функция удаления из хранилища.
+        """
+        deleted = 0
+        for key in keys:
+            async with self._slot(key) as slot:
+                deleted += slot.delete()
+        return deleted
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        """
+        Функция увеличения счетчика, по умолчанию на единицу.
+        """
+        async with self._slot(key) as slot:
+            value = int(slot.value or 0) + amount
+            slot.write(str(value), slot.expires_at)
+        return value
+
+    async def sadd(self, name: str, *values: str) -> int:
+        """
+        Функция добавления элементов в множество.
+        """
+
+        def modify(set_: set, members: list[str]) -> int:
+            added = len(set(members) - set_)
+            set_.update(members)
+            return added
+
+        return await self._modify(name, set(), modify, list(values))
+
+    async def spop(self, name: str, count: int | None = None) -> str | list[str] | None:
+        """
+        Функция извлечения элементов из множества.
+        """
+        remaining = 1 if count is None else count
+
+        def modify(set_: set, members: None) -> list[str]:
+            nonlocal remaining
+            popped = [set_.pop() for _ in range(min(len(set_), remaining))]
+            remaining -= len(popped)
+            return popped
+
+        popped = await self._modify(name, set(), modify, limit=remaining)
+        if count is None:
+            return popped[0] if popped else None
+        return popped
+
+    async def srem(self, name: str, *values: str) -> int:
+        """
+        Функция удаления элементов из множества.
+        """
+
+        def modify(set_: set, members: list[str]) -> int:
+            removed = len(set_ & set(members))
+            set_.difference_update(members)
+            return removed
+
+        return await self._modify(name, set(), modify, list(values))
+
+    async def smembers(self, name: str) -> "set[str]":
+        """
+        Функция получения элементов множества.
+        """
+        return await self._read(name) or set()
+
+    async def scard(self, name: str) -> int:
+        """
+        Функция получения размера множества.
+        """
+        return await self._get_length(name)
+
+    async def zadd(self, name: str, mapping: dict[str, float]) -> int:
+        """
+        Функция добавления элементов в упорядоченное множество с одинаковыми оценками.
+        """
+
+        def modify(sorted_set: list[str], members: list[str]) -> int:
+            added = 0
+            for member in members:
+                index = bisect.bisect_left(sorted_set, member)
+                if index == len(sorted_set) or sorted_set[index] != member:
+                    sorted_set.insert(index, member)
+                    added += 1
+            return added
+
+        return await self._modify(name, [], modify, list(mapping))
+
+    async def zrem(self, name: str, *values: str) -> int:
+        """
+        Функция удаления элементов из упорядоченного множества.
+        """
+
+        def modify(sorted_set: list[str], members: list[str]) -> int:
+            removed = 0
+            for member in members:
+                index = bisect.bisect_left(sorted_set, member)
+                if index < len(sorted_set) and sorted_set[index] == member:
+                    del sorted_set[index]
+                    removed += 1
+            return removed
+
+        return await self._modify(name, [], modify, list(values))
+
+    async def zrangebylex(
+        self, name: str, min: str, max: str, start: int | None = None, num: int | None = None
+    ) -> list[str]:
+        """
+        Функция получения элементов упорядоченного множества в лексикографическом диапазоне.
+        Части коллекции читаются начиная с части нижней границы, пока не набрана страница.
+        """
+
+        def read(slot: SlotAccessor) -> list[str]:
+            header = slot.value
+            if not isinstance(header, CollectionHeader):
+                return select_lex_range(header or [], min, max, start, num)
+            members = []
+            for chunk_id in header.chunk_ids[header.get_chunk_index("" if min == "-" else min[1:]) :]:
+                members.extend(slot.get_chunk(chunk_id).value)
+                selected = select_lex_range(members, min, max, start, num)
+                if start is not None and num is not None and 0 <= num <= len(selected):
+                    return selected
+            return select_lex_range(members, min, max, start, num)
+
+        return await self._read(name, read)
+
+    async def zcard(self, name: str) -> int:
+        """
+        Функция получения размера упорядоченного множества.
+        """
+        return await self._get_length(name)
+
+    async def exists(self, key: str) -> bool:
+        """
+        Проверка существования.
+        """
+        async with self._slot(key) as slot:
+            return slot.offset is not None
+
+    def _iter_stripe_slots(self, stripe: int) -> Iterator[tuple[int, int]]:
+        """
+        Смещения и состояния ячеек сегмента.
+        """
+        for index in range(self.slots_per_stripe):
+            offset = self._get_slot_offset(stripe, index)
+            yield offset, self._map[offset]
+
+    async def flushdb(self) -> bool:
+        """
+        Очистка значений.
+        """
+        for stripe in range(self.stripes):
+            async with self._stripe_lock(stripe):
+                for offset, _ in self._iter_stripe_slots(stripe):
+                    self._map[offset] = EMPTY
+        return True
+
+    def sweep_expired(self) -> int:
+        """
+        Удаление ключей с истекшим временем жизни во всех сегментах.
+        Сегменты, занятые другими процессами, пропускаются до следующего прохода, сегменты с большой долей
+        меток удаленных ключей перестраиваются.
+
+        :return: Количество удаленных ключей.
+        """
+        removed = 0
+        for stripe in range(self.stripes):
+            if not self._try_lock(stripe):
+                continue
+            try:
+                for offset, state in self._iter_stripe_slots(stripe):
+                    if state in {USED, COLLECTION}:
+                        _, key_hash, _, key_length, _ = SLOT_HEADER.unpack_from(self._map, offset)
+                        key = bytes(self._map[offset + SLOT_HEADER.size : offset + SLOT_HEADER.size + key_length])
+                        removed += SlotAccessor(self, key, key_hash, stripe, offset, None).expire()
+                # Ключ и его части удаляются вместе, поэтому метки считаются после удаления
+                tombstones = sum(state == DELETED for _, state in self._iter_stripe_slots(stripe))
+                if tombstones >= self._rehash_threshold:
+                    self._rehash_stripe(stripe)
+            finally:
+                self._unlock(stripe)
+        return removed
+
+    async def info(self) -> dict[str, int | str]:
+        """
+        Статистика хранилища в духе команды INFO. Счетчики попаданий и промахов — только текущего процесса.
+        """
+        keys = 0
+        expires = 0
+        used_bytes = 0
+        for stripe in range(self.stripes):
+            for offset, state in self._iter_stripe_slots(stripe):
+                if state in {EMPTY, DELETED}:
+                    continue
+                _, _, expires_at, key_length, value_length = SLOT_HEADER.unpack_from(self._map, offset)
+                used_bytes += key_length + value_length
+                if state != CHUNK:
+                    keys += 1
+                    expires += bool(expires_at)
+        return {
+            "keys": keys,
+            "expires": expires,
+            "used_bytes": used_bytes,
+            "max_bytes": self.slots * (self.slot_size - SLOT_HEADER.size),
+            "slots": self.slots,
+            "slot_size": self.slot_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired_keys": self.expired_keys,
+            "rehashes": self.rehashes,
+        }
+
+    def close(self) -> None:
+        """
+        Закрытие отображения файла. Данные остаются в файле для других процессов.
+        """
+        with contextlib.suppress(BufferError, ValueError):
+            self._map.close()
+        with contextlib.suppress(OSError):
+            os.close(self._fd)
+
+    async def __aenter__(self) -> Self:
+        """
+        Асинхронный вход в контекст.
+        """
+        return self
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc_val: BaseException | None, exc_tb: TracebackType | None
+    ) -> None:
+        """
+        Асинхронный выход из контекста.
+        """
+
+
+class SlotAccessor:
+    """
+    Ячейка ключа, найденная под блокировкой сегмента.
+    """
+
+    __slots__ = ("connection", "free_offset", "key", "key_hash", "offset", "stripe")
+
+    def __init__(
+        self,
+        connection: SharedMemoryConnection,
+        key: bytes,
+        key_hash: int,
+        stripe: int,
+        offset: int | None,
+        free_offset: int | None,
+    ) -> None:
+        self.connection = connection
+        self.key = key
+        self.key_hash = key_hash
+        self.stripe = stripe
+        self.offset = offset
+        self.free_offset = free_offset
+
+    @property
+    def state(self) -> int:
+        """
+        Состояние ячейки ключа, EMPTY — если ключа нет.
+        """
+        if self.offset is None:
+            return EMPTY
+        return self.connection._map[self.offset]
+
+    @property
+    def expires_at(self) -> float:
+        """
+        Момент истечения времени жизни ключа, 0 — без времени жизни.
+        """
+        if self.offset is None:
+            return 0
+        return SLOT_HEADER.unpack_from(self.connection._map, self.offset)[2]
+
+    @property
+    def value(self) -> Any:
+        """
+        Значение ячейки ключа, для коллекции, разбитой на части, — ее заголовок. None — если ключа нет.
+        """
+        if self.offset is None:
+            return None
+        _, _, _, key_length, value_length = SLOT_HEADER.unpack_from(self.connection._map, self.offset)
+        start = self.offset + SLOT_HEADER.size + key_length
+        return pickle.loads(self.connection._map[start : start + value_length])
+
+    def get_chunk(self, chunk_id: int) -> "SlotAccessor":
+        """
+        Ячейка части коллекции в сегменте ключа.
+        """
+        return self.connection._get_slot(self.key + b"\0" + str(chunk_id).encode(), self.stripe)
+
+    def load(self, members: list[str] | None = None) -> Any:
+        """
+        Значение ключа. Коллекция, разбитая на части, собирается из частей.
+
+        :param members: Элементы, части которых нужно прочитать, None — все части.
+        """
+        header = self.value
+        if not isinstance(header, CollectionHeader):
+            return header
+        indexes = range(len(header.chunk_ids)) if members is None else sorted(set(map(header.get_chunk_index, members)))
+        return merge_chunks([self.get_chunk(header.chunk_ids[index]).value for index in indexes])
+
+    def _write_payload(self, payload: bytes, expires_at: float, state: int = USED) -> None:
+        """
+        Запись сериализованного значения в ячейку ключа или в свободную ячейку сегмента.
+        """
+        if SLOT_HEADER.size + len(self.key) + len(payload) > self.connection.slot_size:
+            msg = f"Value of {self.key.decode()} does not fit into a shared memory slot"
+            raise exceptions.PythonError(msg)
+        offset = self.offset if self.offset is not None else self.free_offset
+        if offset is None:
+            msg = "Shared memory store segment is full"
+            raise exceptions.PythonError(msg)
+
+        memory = self.connection._map
+        data_offset = offset + SLOT_HEADER.size
+        memory[data_offset : data_offset + len(self.key)] = self.key
+        memory[data_offset + len(self.key) : data_offset + len(self.key) + len(payload)] = payload
+        # Заголовок пишется последним: ячейка становится занятой только с готовыми данными
+        SLOT_HEADER.pack_into(memory, offset, state, self.key_hash, expires_at, len(self.key), len(payload))
+        self.offset = offset
+
+    def write(self, value: Any, expires_at: float) -> None:
+        """
+        Запись значения в ячейку ключа или в свободную ячейку сегмента.
+        Коллекция, не помещающаяся в ячейку, разбивается на части.
+        """
+        self._delete_chunks()
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if SLOT_HEADER.size + len(self.key) + len(payload) <= self.connection.slot_size or not isinstance(
+            value, dict | set | list
+        ):
+            self._write_payload(payload, expires_at)
+            return
+        header = CollectionHeader()
+        header.size = len(value)
+        self._insert_chunks(header, 0, self._split(value))
+        if self.offset is None:
+            # Свободная ячейка ключа могла быть занята частями
+            self.free_offset = self.connection._find(self.key, self.key_hash, self.stripe)[1]
+        self._write_header(header, expires_at)
+
+    def _split(self, chunk: dict | set | list) -> list[tuple[dict | set | list, bytes]]:
+        """
+        Разбиение коллекции пополам, пока части не станут помещаться в ячейку.
+
+        :return: Части по порядку элементов и их сериализованные значения.
+        """
+        payload = pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL)
+        size = SLOT_HEADER.size + len(self.key) + CHUNK_KEY_RESERVE + len(payload)
+        if size <= self.connection.slot_size or len(chunk) <= 1:
+            return [(chunk, payload)]
+        members = chunk if isinstance(chunk, list) else sorted(chunk)
+        middle = len(members) // 2
+        return self._split(select_members(chunk, members[:middle])) + self._split(
+            select_members(chunk, members[middle:])
+        )
+
+    def _insert_chunks(
+        self, header: CollectionHeader, index: int, chunks: list[tuple[dict | set | list, bytes]]
+    ) -> None:
+        """
+        Запись новых частей коллекции перед частью с номером index.
+        Если часть не записалась, уже записанные новые части удаляются.
+        """
+        chunk_ids = []
+        try:
+            for _, payload in chunks:
+                self.get_chunk(header.next_id)._write_payload(payload, 0, CHUNK)
+                chunk_ids.append(header.next_id)
+                header.next_id += 1
+        except Exception:
+            for chunk_id in chunk_ids:
+                self.get_chunk(chunk_id).delete()
+            raise
+        header.chunk_ids[index:index] = chunk_ids
+        header.fences[index:index] = [min(chunk) for chunk, _ in chunks]
+
+    def _write_header(self, header: CollectionHeader, expires_at: float) -> None:
+        """
+        Запись заголовка коллекции. Коллекция из одной части снова хранится в ячейке ключа.
+        """
+        if not header.chunk_ids:
+            self.connection._map[self.offset] = DELETED
+            self.offset = None
+            return
+        if len(header.chunk_ids) == 1:
+            chunk_slot = self.get_chunk(header.chunk_ids[0])
+            payload = pickle.dumps(chunk_slot.value, protocol=pickle.HIGHEST_PROTOCOL)
+            self._write_payload(payload, expires_at)
+            chunk_slot.delete()
+            return
+        self._write_payload(pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL), expires_at, COLLECTION)
+
+    def modify_chunks(
+        self, modify: Callable[[Any, list[str] | None], Any], members: list[str] | None, limit: int | None
+    ) -> Any:
+        """
+        Изменение частей коллекции с заданными элементами, каждая часть перезаписывается отдельно.
+        Заголовок записывается после частей, даже если одна из них не записалась.
+        """
+        header = self.value
+        expires_at = self.expires_at
+        groups: dict[int, list[str] | None] = {}
+        if members is None:
+            groups = dict.fromkeys(range(len(header.chunk_ids)))
+        for member in members or ():
+            groups.setdefault(header.get_chunk_index(member), []).append(member)
+
+        result = None
+        try:
+            # Части с большими номерами изменяются первыми, чтобы разбиение части не сдвигало номера остальных
+            for index in sorted(groups, reverse=True):
+                if limit is not None and result is not None and len(result) >= limit:
+                    break
+                chunk_slot = self.get_chunk(header.chunk_ids[index])
+                chunk = chunk_slot.value
+                size = len(chunk)
+                part = modify(chunk, groups[index])
+                self._replace_chunk(header, index, chunk_slot, chunk)
+                header.size += len(chunk) - size
+                result = part if result is None else result + part
+        finally:
+            self._write_header(header, expires_at)
+        return result
+
+    def _replace_chunk(
+        self, header: CollectionHeader, index: int, chunk_slot: "SlotAccessor", chunk: dict | set | list
+    ) -> None:
+        """
+        Запись измененной части коллекции: пустая часть удаляется, не помещающаяся в ячейку — разбивается.
+        """
+        if not chunk:
+            chunk_slot.delete()
+            del header.chunk_ids[index], header.fences[index]
+            return
+        chunks = self._split(chunk)
+        if len(chunks) == 1:
+            chunk_slot._write_payload(chunks[0][1], 0, CHUNK)
+            return
+        self._insert_chunks(header, index + 1, chunks)
+        chunk_slot.delete()
+        # Первая из новых частей наследует границу разбитой части
+        header.fences[index + 1] = header.fences[index]
+        del header.chunk_ids[index], header.fences[index]
+
+    def _delete_chunks(self) -> None:
+        """
+        Удаление частей коллекции, разбитой на части.
+        """
+        if self.state == COLLECTION:
+            for chunk_id in self.value.chunk_ids:
+                self.get_chunk(chunk_id).delete()
+
+    def set_expires_at(self, expires_at: float) -> None:
+        """
+        Изменение момента истечения времени жизни ключа.
+        """
+        state, key_hash, _, key_length, value_length = SLOT_HEADER.unpack_from(self.connection._map, self.offset)
+        SLOT_HEADER.pack_into(self.connection._map, self.offset, state, key_hash, expires_at, key_length, value_length)
+
+    def expire(self) -> bool:
+        """
+        Удаление ключа, если его время жизни истекло.
+        """
+        expires_at = self.expires_at
+        if expires_at and expires_at <= time.time():
+            self.delete()
+            self.connection.expired_keys += 1
+            return True
+        return False
+
+    def delete(self) -> bool:
+        """
+        Удаление ключа вместе с частями коллекции.
+        Ячейка помечается удаленной, чтобы не прерывать цепочки пробирования.
+        """
+        if self.offset is None:
+            return False
+        self._delete_chunks()
+        self.connection._map[self.offset] = DELETED
+        self.offset = None
+        return True
+
+
+class AsyncSharedMemoryManager(AsyncLocalRedisManager):
+    """
+    Класс для управления хранилищем в общей памяти, общим для процессов сервера на одном узле.
+    """
+
+    connection_types = (SharedMemoryConnection,)
+
+    @cached_property
+    def connection(self) -> SharedMemoryConnection:
+        """
+        Функция подключения.
+        """
+        return SharedMemoryConnection(
+            path=settings.shared_db_path,
+            slots=settings.shared_db_slots,
+            slot_size=settings.shared_db_slot_size,
+            stripes=settings.shared_db_stripes,
+        )
+
+    async def close(self) -> None:
+        """
+        Закрывает отображение файла общей памяти.
+        """
+        if "connection" in self.__dict__:
+            self.connection.close()
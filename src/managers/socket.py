@@ -2,70 +2,40 @@
 Модуль socket.py, содержит базовый класс менеджера SocketIO.
 """
 
-from typing import Union
-
 import socketio
+from pydantic import ValidationError
 
 from config.log_tools import logger
+from config.settings import settings
+from logic.utils.json_utils import SocketJson
+from logic.utils.rate_limit_utils import action_rate_limiter
+from managers.actions.action_routes import ActionRoute
 from managers.actions.action_routes import action_routes
+from managers.game_loop import game_rooms
 from managers.repository.main_manager import MainRepositoryManager
+from managers.socket_store import socket_store
+from models import exceptions
+from models.base import ActionRequestModel
 from models.constants.socket import SocketRole
 
-sio = socketio.AsyncServer(async_mode="asgi")
-
 
-class SocketNamespaceStore:
+def get_client_manager() -> socketio.AsyncManager | None:
     """
-    Хранилище SocketIO-соединений.
-
-    Хранит соединения SocketIO и наблюдателей.
+    Менеджер клиентов SocketIO. Для работы в нескольких процессах сообщения передаются через редис.
     """
+    if not settings.socket_redis_manager:
+        return None
+    return socketio.AsyncRedisManager(settings.redis_url, channel="rogalik_socketio")
 
-    def __init__(self) -> None:
-        self.connections: dict[str, SocketMainNamespace] = {}
-        self.observers: dict[str, set[SocketMainNamespace]] = {}
-
-    def get_connection(self, sid: str) -> Union["SocketMainNamespace", None]:
-        """
-        Функция получения подключения.
-        """
-        return self.connections.get(sid)
-
-    def get_observers(self, sid: str) -> set["SocketMainNamespace"]:
-        """
-        Функция получения наблюдателей.
-        """
-        return self.observers.get(sid, set())
-
-    def add_connection(self, sid: str, namespace: "SocketMainNamespace") -> None:
-        """
-        Функция создания SocketIO подключения.
-        """
-        match namespace.role:
-            case SocketRole.PLAYER:
-                self.connections[sid] = namespace
-            case SocketRole.OBSERVER:
-                self.observers.setdefault(
-                    sid,
-                    set(),
-                ).add(namespace)
 
-    def remove_connection(self, sid: str, namespace: "SocketMainNamespace") -> None:
-        """
-        Функция удаления SocketIO подключения.
-        """
-        match namespace.role:
-            case SocketRole.PLAYER:
-                del self.connections[sid]
-            case SocketRole.OBSERVER:
-                self.observers[sid].remove(namespace)
-
-    def clear(self, sid: str) -> None:
-        """
-        Функция очистки SocketIO подключения.
-        """
-        del self.connections[sid]
-        del self.observers[sid]
+# Без общей сессии между процессами long polling не работает, поэтому в режиме нескольких процессов
+# клиенты подключаются только через websocket
+sio = socketio.AsyncServer(
+    async_mode="asgi",
+    json=SocketJson,
+    client_manager=get_client_manager(),
+    transports=["websocket"] if settings.socket_redis_manager else ["polling", "websocket"],
+)
 
 
 class SocketMainNamespace(socketio.AsyncNamespace):
@@ -78,7 +48,8 @@ class SocketMainNamespace(socketio.AsyncNamespace):
     """
 
     routes = action_routes
-    store = SocketNamespaceStore()
+    store = socket_store
+    limiter = action_rate_limiter
 
     def __init__(self, namespace: str | None = None) -> None:
         super().__init__(namespace)
@@ -95,20 +66,91 @@ class SocketMainNamespace(socketio.AsyncNamespace):
         """
         Обработка отключения клиента через on_disconnect.
         """
+        await game_rooms.leave(sid)
+        self.limiter.remove(sid)
         logger.info(f"Client {sid} disconnected")
 
+    async def on_join_room(self, sid: str, data: dict) -> None:
+        """
+        Подключение клиента к игровой комнате в роли игрока или наблюдателя.
+        """
+        room_id = data.get("room_id")
+        try:
+            await game_rooms.join(room_id, sid, observer=data.get("role") == SocketRole.OBSERVER)
+        except exceptions.PythonError as e:
+            await self.emit("error", {"message": str(e)}, to=sid)
+            return
+        await self.emit("joined", {"room_id": room_id}, to=sid)
+
+    async def on_leave_room(self, sid: str, data: dict) -> None:
+        """
+        Выход клиента из игровой комнаты.
+        """
+        await game_rooms.leave(sid)
+
+    async def on_resync(self, sid: str, data: dict) -> None:
+        """
+        Запрос полного состояния комнаты клиентом, потерявшим синхронизацию.
+        """
+        await game_rooms.resync(sid)
+
+    async def _get_action(self, sid: str, data: dict) -> tuple[ActionRequestModel, ActionRoute] | None:
+        """
+        Разбор сообщения действия и проверка ограничений частоты.
+        Сообщение проверяется по модели ActionRequestModel, обработчик ищется в action_routes.
+        Сообщения сверх ограничения частоты отбрасываются без ответа и учитываются в статистике.
+
+        :return: Запрос и обработчик действия, None — если сообщение отброшено или отклонено.
+        """
+        if not self.limiter.allow_connection(sid):
+            return None
+        try:
+            request = self.routes.parse_request(data)
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False, include_input=False)
+            await self.emit("error", {"message": "Invalid action", "errors": errors}, to=sid)
+            return None
+
+        route = self.routes.get(request.action)
+        if route is None:
+            await self.emit("error", {"message": f"Unknown action: {request.action}"}, to=sid)
+            return None
+        if route.rate_limit and not self.limiter.allow_action(sid, route.name, route.rate_limit, route.burst):
+            route.dropped += 1
+            return None
+        return request, route
+
+    async def _handle_action(self, sid: str, request: ActionRequestModel, route: ActionRoute) -> None:
+        """
+        Выполнение действия. Данные действия проверяются по модели, указанной при регистрации обработчика.
+        Действия игрока в комнате ставятся в очередь и применяются игровым циклом на ближайшем тике.
+        """
+        if game_rooms.get_sid_room(sid) is not None:
+            if not await game_rooms.submit(sid, request.action, request.data):
+                await self.emit("error", {"message": "Too many actions, try again later"}, to=sid)
+            return
+
+        try:
+            result = await route(sid, request.data)
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False, include_input=False)
+            await self.emit("error", {"message": "Invalid action data", "errors": errors}, to=sid)
+            return
+        except Exception as e:
+            logger.error(f"Failed to handle {request.action} from {sid}: {e}")
+            await self.emit("error", {"message": f"Failed to handle action: {request.action}"}, to=sid)
+            return
+        # # Пример использования Redis для сохранения данных
+        # await self.redis_repository.set_value(f"client:{sid}:action", request.action)
+        await self.emit("response", self.routes.build_response(request.action, result), to=sid)
+
     async def on_action(self, sid: str, data: dict) -> None:
         """
-        Обработка действий клиента через action_routes и сохранение данных в Redis.
+        Обработка действий клиента через action_routes.
         """
-        action_name = data.get("action")
-        if action_name in action_routes:
-            response = await action_routes[action_name](sid, data)
-            # # Пример использования Redis для сохранения данных
-            # await self.redis_repository.set_value(f"client:{sid}:action", action_name)
-            await self.emit("response", response, to=sid)
-        else:
-            await self.emit("error", {"message": f"Unknown action: {action_name}"}, to=sid)
+        if (action := await self._get_action(sid, data)) is not None:
+            await self._handle_action(sid, *action)
 
 
 sio.register_namespace(SocketMainNamespace("/socket"))
+game_rooms.bind(sio, "/socket")
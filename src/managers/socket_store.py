@@ -0,0 +1,137 @@
+"""
+Модуль содержит общий реестр SocketIO-соединений.
+
+Реестр хранится в репозитории, поэтому соединения и наблюдатели видны всем процессам и узлам сервера.
+"""
+
+import os
+import socket
+from functools import cached_property
+from typing import Any
+
+from managers.repository.redis_pool import get_redis_client
+from models.constants.socket import SocketRole
+
+# Идентификатор процесса сервера, уникальный в пределах кластера
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def decode(value: str | bytes | None) -> str | None:
+    """
+    Декодирование ответа репозитория.
+    """
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class SocketNamespaceStore:
+    """
+    Хранилище SocketIO-соединений.
+
+    Хранит для каждого соединения процесс, роль и комнату, а для каждой комнаты — игроков, наблюдателей
+    и количество занятых мест игроков.
+    """
+
+    @cached_property
+    def connection(self) -> Any:
+        """
+        Подключение к общему хранилищу.
+        """
+        return get_redis_client()
+
+    @staticmethod
+    def _connection_key(sid: str) -> str:
+        return f"socket_connection:{sid}"
+
+    @staticmethod
+    def _members_key(room_id: str, role: SocketRole) -> str:
+        return f"socket_{role}s:{room_id}"
+
+    @staticmethod
+    def _seats_key(room_id: str) -> str:
+        return f"socket_seats:{room_id}"
+
+    async def get_connection(self, sid: str) -> dict[str, str]:
+        """
+        Функция получения подключения: процесс, роль и комната.
+        """
+        fields = await self.connection.hgetall(self._connection_key(sid))
+        return {decode(key): decode(value) for key, value in fields.items()}
+
+    async def get_players(self, room_id: str) -> set[str]:
+        """
+        Функция получения игроков комнаты.
+        """
+        return set(map(decode, await self.connection.smembers(self._members_key(room_id, SocketRole.PLAYER))))
+
+    async def get_observers(self, room_id: str) -> set[str]:
+        """
+        Функция получения наблюдателей комнаты.
+        """
+        return set(map(decode, await self.connection.smembers(self._members_key(room_id, SocketRole.OBSERVER))))
+
+    async def count_players(self, room_id: str) -> int:
+        """
+        Функция получения количества игроков комнаты.
+        """
+        return await self.connection.scard(self._members_key(room_id, SocketRole.PLAYER))
+
+    async def add_connection(self, sid: str, role: SocketRole, room_id: str) -> None:
+        """
+        Функция регистрации SocketIO подключения в комнате.
+        """
+        await self.connection.hset(
+            self._connection_key(sid),
+            mapping={"worker": WORKER_ID, "role": role, "room_id": room_id},
+        )
+        await self.connection.sadd(self._members_key(room_id, role), sid)
+
+    async def reserve_player(self, room_id: str, max_players: int) -> bool:
+        """
+        Функция резервирования места игрока в комнате.
+
+        Место занимается атомарным увеличением счетчика, поэтому одновременные подключения
+        не превышают ограничение. Место освобождается при удалении подключения игрока.
+
+        :return: False, если в комнате нет свободных мест.
+        """
+        if await self.connection.incr(self._seats_key(room_id)) <= max_players:
+            return True
+        await self.release_player(room_id)
+        return False
+
+    async def release_player(self, room_id: str) -> None:
+        """
+        Функция освобождения места игрока в комнате.
+        """
+        await self.connection.incr(self._seats_key(room_id), -1)
+
+    async def remove_connection(self, sid: str) -> dict[str, str]:
+        """
+        Функция удаления SocketIO подключения.
+
+        :return: Данные удаленного подключения, или пустой словарь.
+        """
+        connection = await self.get_connection(sid)
+        if connection:
+            role = SocketRole(connection["role"])
+            if await self.connection.srem(self._members_key(connection["room_id"], role), sid) and (
+                role == SocketRole.PLAYER
+            ):
+                await self.release_player(connection["room_id"])
+            await self.connection.delete(self._connection_key(sid))
+        return connection
+
+    async def clear(self, room_id: str) -> None:
+        """
+        Функция очистки SocketIO подключений комнаты.
+        """
+        sids = await self.get_players(room_id) | await self.get_observers(room_id)
+        await self.connection.delete(
+            self._members_key(room_id, SocketRole.PLAYER),
+            self._members_key(room_id, SocketRole.OBSERVER),
+            self._seats_key(room_id),
+            *map(self._connection_key, sids),
+        )
+
+
+socket_store = SocketNamespaceStore()
@@ -5,7 +5,6 @@
 
 from pydantic import BaseModel
 from pydantic import Field
-from pydantic import ValidationError
 from pydantic import field_validator
 
 json_ = str
@@ -34,7 +33,7 @@ class ActionRequestModel(BaseActionModel):
         Валидатор для проверки окончания action на _client.
         """
         if not v.endswith("_client"):
-            raise ValidationError("action must be endswith _client")
+            raise ValueError("action must be endswith _client")
         return v.removesuffix("_client")
 
 
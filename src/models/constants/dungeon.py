@@ -0,0 +1,17 @@
+"""
+Константы для подземелий.
+"""
+
+from enum import IntEnum
+
+
+class Tile(IntEnum):
+    """
+    Клетки карты этажа подземелья.
+    """
+
+    wall = 0
+    floor = 1
+    corridor = 2
+    stairs_up = 3
+    stairs_down = 4
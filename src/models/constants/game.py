@@ -0,0 +1,15 @@
+"""
+Константы для игр.
+"""
+
+from enum import StrEnum
+
+
+class GameMode(StrEnum):
+    """
+    Режимы игры.
+    """
+
+    solo = "solo"
+    tutorial = "tutorial"
+    realtime = "realtime"
@@ -9,6 +9,7 @@ from sqlalchemy import ForeignKey
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Table
+from sqlalchemy import make_url
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
@@ -19,8 +20,34 @@ from sqlalchemy.orm import sessionmaker
 
 from config.settings import settings
 from models.db.mixins import TimestampMixin
+from models.db.pool import pool_statistics
 
-engine = create_async_engine(settings.sqlalchemy_url, echo=True)
+
+def get_connect_args(url: str) -> dict:
+    """
+    Параметры подключения драйвера. Кэш подготовленных запросов и таймаут запросов задаются только для asyncpg,
+    другие драйверы такие параметры не принимают.
+    """
+    parsed_url = make_url(url)
+    if parsed_url.get_backend_name() != "postgresql" or parsed_url.get_driver_name() != "asyncpg":
+        return {}
+    return {
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+        "server_settings": {"statement_timeout": str(settings.db_statement_timeout)},
+    }
+
+
+engine = create_async_engine(
+    settings.sqlalchemy_url,
+    echo=settings.db_echo,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args=get_connect_args(settings.sqlalchemy_url),
+)
+pool_statistics.track(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
 
 
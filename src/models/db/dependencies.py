@@ -2,12 +2,19 @@
 Dependencies.
 """
 
+import time
+
 from models.db.base import SessionLocal
+from models.db.pool import pool_statistics
 
 
 async def get_db() -> None:
     """
     Получение базы данных.
+    Подключение берется из пула сразу, время ожидания учитывается в статистике пула.
     """
     async with SessionLocal() as session:
+        start = time.perf_counter()
+        await session.connection()
+        pool_statistics.add_acquire_time(time.perf_counter() - start)
         yield session
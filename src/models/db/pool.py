@@ -0,0 +1,81 @@
+"""
+Статистика пула подключений к базе данных.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class PoolStatistics:
+    """
+    Счетчики пула подключений к базе данных.
+    """
+
+    def __init__(self) -> None:
+        self.engine: AsyncEngine | None = None
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.acquire_count = 0
+        self.acquire_time_total = 0.0
+        self.acquire_time_max = 0.0
+
+    def track(self, engine: AsyncEngine) -> None:
+        """
+        Подписка на события пула движка.
+        """
+        self.engine = engine
+        pool = engine.sync_engine.pool
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, *_) -> None:
+        """
+        Открыто новое подключение.
+        """
+        self.connects += 1
+
+    def _on_checkout(self, *_) -> None:
+        """
+        Подключение выдано из пула.
+        """
+        self.checkouts += 1
+
+    def _on_invalidate(self, *_) -> None:
+        """
+        Подключение признано невалидным.
+        """
+        self.invalidations += 1
+
+    def add_acquire_time(self, seconds: float) -> None:
+        """
+        Учет времени ожидания подключения из пула.
+        """
+        self.acquire_count += 1
+        self.acquire_time_total += seconds
+        self.acquire_time_max = max(self.acquire_time_max, seconds)
+
+    def stats(self) -> dict:
+        """
+        Текущее состояние пула и накопленные счетчики.
+        """
+        stats = {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidations": self.invalidations,
+            "acquire_time_avg_ms": self.acquire_time_total / self.acquire_count * 1000 if self.acquire_count else 0.0,
+            "acquire_time_max_ms": self.acquire_time_max * 1000,
+        }
+        if self.engine is not None:
+            pool = self.engine.sync_engine.pool
+            stats.update({
+                "size": getattr(pool, "size", lambda: None)(),
+                "checked_in": getattr(pool, "checkedin", lambda: None)(),
+                "checked_out": getattr(pool, "checkedout", lambda: None)(),
+                "overflow": getattr(pool, "overflow", lambda: None)(),
+            })
+        return stats
+
+
+pool_statistics = PoolStatistics()
@@ -50,3 +50,9 @@ class AuthenticationError(PythonError):
     """
     Класс пользовательского исключения для ошибок аутентификации.
     """
+
+
+class PasswordHasherBusyError(PythonError):
+    """
+    Класс пользовательского исключения для переполненного пула хэширования паролей.
+    """
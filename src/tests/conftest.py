@@ -0,0 +1,58 @@
+"""
+Общие фикстуры тестов.
+"""
+
+from collections.abc import AsyncIterator
+
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.db.base import Base
+
+
+class QueryCounter:
+    """
+    Счетчик SQL запросов, выполненных движком.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args, **kwargs) -> None:
+        self.count += 1
+
+
+@pytest_asyncio.fixture
+async def db_engine() -> AsyncIterator[AsyncEngine]:
+    """
+    Движок SQLite в памяти со схемой приложения.
+    """
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db_session(db_engine: AsyncEngine) -> AsyncIterator[AsyncSession]:
+    """
+    Сессия базы данных.
+    """
+    async with sessionmaker(bind=db_engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def query_counter(db_engine: AsyncEngine) -> AsyncIterator[QueryCounter]:
+    """
+    Счетчик запросов к тестовой базе данных.
+    """
+    counter = QueryCounter()
+    event.listen(db_engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(db_engine.sync_engine, "before_cursor_execute", counter)
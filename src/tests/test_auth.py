@@ -0,0 +1,263 @@
+"""
+Тесты аутентификации.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+from sqlalchemy.future import select
+from starlette.requests import Request
+
+from config.routers import http
+from config.settings import settings
+from logic.utils.auth_utils import JWKeyCache
+from logic.utils.auth_utils import TokenBlacklist
+from logic.utils.auth_utils import VerifiedTokenCache
+from logic.utils.json_utils import from_json
+from logic.utils.password_utils import PasswordHasher
+from managers.repository.local_redis_manager import LocalConnection
+from models.client.player.base import PlayerCreateModel
+from models.db.base import Player
+from models.exceptions import HTTPError
+from models.exceptions import PasswordHasherBusyError
+
+
+def test_verified_token_cache_returns_copy_until_expiration(monkeypatch):
+    """
+    Проверенный токен читается из кэша до истечения, после чего удаляется.
+    """
+    cache = VerifiedTokenCache(max_size=10)
+    now = time.time()
+    cache.set("token", {"sub": "player", "exp": now + 10})
+
+    payload = cache.get("token")
+    assert payload == {"sub": "player", "exp": now + 10}
+    payload["sub"] = "other"
+    assert cache.get("token")["sub"] == "player"
+    assert cache.get("unknown") is None
+
+    monkeypatch.setattr(time, "time", lambda: now + 10)
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+
+def test_verified_token_cache_evicts_least_recently_used():
+    """
+    При превышении размера вытесняется давно прочитанный токен.
+    """
+    cache = VerifiedTokenCache(max_size=2)
+    cache.set("a", {"sub": "a"})
+    cache.set("b", {"sub": "b"})
+    assert cache.get("a") is not None
+
+    cache.set("c", {"sub": "c"})
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def get_key_caches(count: int) -> list[JWKeyCache]:
+    """
+    Связки ключей нескольких процессов с общим хранилищем.
+    """
+    connection = LocalConnection()
+    fernet_key = Fernet.generate_key()
+    caches = []
+    for _ in range(count):
+        cache = JWKeyCache()
+        cache._fernet_key = fernet_key
+        cache.connection = connection
+        caches.append(cache)
+    return caches
+
+
+@pytest.mark.asyncio
+async def test_jw_key_cache_creates_single_key_on_concurrent_start():
+    """
+    Процессы, одновременно запущенные на пустом хранилище, используют один ключ.
+    """
+    caches = get_key_caches(3)
+
+    await asyncio.gather(*(cache.load() for cache in caches))
+
+    kids = {cache.get_signing_key()[0] for cache in caches}
+    assert len(kids) == 1
+    keyring = from_json(await caches[0].connection.get(JWKeyCache.keyring_name))
+    assert list(keyring["keys"]) == list(kids)
+
+
+@pytest.mark.asyncio
+async def test_jw_key_cache_rotates_once_and_keeps_previous_key(monkeypatch):
+    """
+    Одновременная ротация создает один новый ключ, а токены предыдущего ключа остаются проверяемыми.
+    """
+    caches = get_key_caches(3)
+    await caches[0].load()
+    await asyncio.gather(*(cache.load() for cache in caches[1:]))
+    old_kid = caches[0].get_signing_key()[0]
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + settings.jwt_keys_rotation_interval + 1)
+
+    await asyncio.gather(*(cache.rotate() for cache in caches))
+    await asyncio.gather(*(cache.load() for cache in caches))
+
+    kids = {cache.get_signing_key()[0] for cache in caches}
+    assert len(kids) == 1
+    assert old_kid not in kids
+    assert all(cache.get_public_key(old_kid) is not None for cache in caches)
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_verifies_hash():
+    """
+    Хэш пароля проверяется тем же пулом.
+    """
+    hasher = PasswordHasher("thread", workers=1, max_queue=1)
+    try:
+        hashed_password = await hasher.hash("secret")
+
+        assert await hasher.verify("secret", hashed_password)
+        assert not await hasher.verify("wrong", hashed_password)
+        assert hasher.stats()["completed"] == 3
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_tasks_over_queue_limit():
+    """
+    Задачи сверх ограничения очереди отклоняются, а не накапливаются.
+    """
+    hasher = PasswordHasher("thread", workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        tasks = [asyncio.create_task(hasher._run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(PasswordHasherBusyError):
+            await hasher._run(release.wait)
+        assert hasher.stats()["queue_depth"] == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+        stats = hasher.stats()
+        assert (stats["rejected"], stats["completed"], stats["queue_depth"]) == (1, 2, 0)
+    finally:
+        release.set()
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_token_blacklist_shares_revocations_after_cache_ttl(monkeypatch):
+    """
+    Отзыв виден другим процессам после истечения кэша непроверенных токенов и хранится до истечения токена.
+    """
+    connection = LocalConnection()
+    first, second = TokenBlacklist(cache_ttl=5, max_size=10), TokenBlacklist(cache_ttl=5, max_size=10)
+    first.connection = second.connection = connection
+    now = time.time()
+    payload = {"jti": "token-id", "exp": now + 100}
+
+    assert not await second.is_revoked("token", payload)
+    await first.revoke("token", payload)
+
+    assert await first.is_revoked("token", payload)
+    assert not await second.is_revoked("token", payload)
+    assert 100 <= await connection.ttl("blacklist:token-id") <= 101
+
+    monkeypatch.setattr(time, "time", lambda: now + 6)
+    assert await second.is_revoked("token", payload)
+
+
+@pytest.mark.asyncio
+async def test_token_blacklist_skips_expired_tokens():
+    """
+    Истекший токен не записывается в черный список.
+    """
+    blacklist = TokenBlacklist(cache_ttl=5, max_size=10)
+    blacklist.connection = LocalConnection()
+
+    await blacklist.revoke("token", {"jti": "token-id", "exp": time.time() - 10})
+
+    assert not await blacklist.connection.exists("blacklist:token-id")
+
+
+async def hash_password(password: str) -> str:
+    """
+    Хэширование пароля без пула процессов.
+    """
+    return f"hashed:{password}"
+
+
+@pytest.fixture
+def registration(monkeypatch):
+    """
+    Регистрация без хэширования в пуле и подписи токена.
+    """
+    monkeypatch.setattr(http.password_hasher, "hash", hash_password)
+    monkeypatch.setattr(http, "create_token", lambda payload: f"token:{payload['sub']}")
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("registration")
+async def test_register_creates_player(db_session, query_counter):
+    """
+    Регистрация создает игрока одним запросом и возвращает токен.
+    """
+    user = PlayerCreateModel(username="player", email="player@mail.com", password="1")
+    response = await http.register(user, db_session)
+
+    assert response == {"access_token": "token:player", "type": "bearer"}
+    assert query_counter.count == 1
+    players = (await db_session.execute(select(Player.username, Player.email, Player.password))).all()
+    assert [tuple(player) for player in players] == [("player", "player@mail.com", "hashed:1")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("registration")
+async def test_register_rejects_duplicate_email(db_session):
+    """
+    Повторный email отклоняется, а сессия остается пригодной для запросов.
+    """
+    await http.register(PlayerCreateModel(username="player", email="player@mail.com", password="1"), db_session)
+
+    with pytest.raises(HTTPError) as error:
+        await http.register(PlayerCreateModel(username="other", email="player@mail.com", password="1"), db_session)
+
+    assert error.value.detail == "Email already registered"
+    assert (await db_session.execute(select(Player.username))).scalars().all() == ["player"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("registration")
+async def test_register_rejects_duplicate_username(db_session):
+    """
+    Занятое имя отклоняется без второго запроса к базе.
+    """
+    await http.register(PlayerCreateModel(username="player", email="player@mail.com", password="1"), db_session)
+
+    with pytest.raises(HTTPError) as error:
+        await http.register(PlayerCreateModel(username="player", email="other@mail.com", password="1"), db_session)
+
+    assert error.value.detail == "Username already taken"
+    assert (await db_session.execute(select(Player.email))).scalars().all() == ["player@mail.com"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_available_only_to_allowed_hosts(monkeypatch):
+    """
+    Метрики отдаются только адресам из настройки, остальным клиентам доступ запрещен.
+    """
+    monkeypatch.setattr(settings, "metrics_allowed_hosts", "127.0.0.1")
+
+    with pytest.raises(HTTPError) as error:
+        await http.metrics(Request({"type": "http", "client": ("10.0.0.1", 5000)}))
+    assert error.value.status_code == 403
+
+    metrics = await http.metrics(Request({"type": "http", "client": ("127.0.0.1", 5000)}))
+    assert "password_hasher" in metrics
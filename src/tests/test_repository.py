@@ -0,0 +1,724 @@
+"""
+Тесты локального хранилища.
+"""
+
+import asyncio
+import multiprocessing
+import pickle
+import time
+import uuid
+from collections.abc import Callable
+
+import pytest
+from cryptography.fernet import Fernet
+from fakeredis import FakeAsyncRedis
+from redis.asyncio import BlockingConnectionPool
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config.settings import settings
+from logic.utils.auth_utils import JWKeyCache
+from logic.utils.auth_utils import TokenBlacklist
+from logic.utils.catalog_utils import game_catalog
+from logic.utils.character_utils import get_game_character_ids
+from logic.utils.character_utils import get_player_game_ids
+from managers.game_loop import GameRoomManager
+from managers.repository import codecs
+from managers.repository.async_redis_manager import MIGRATE_STRING_SCRIPT
+from managers.repository.async_redis_manager import AsyncRedisManager
+from managers.repository.codecs import REFERENCE_FIELDS
+from managers.repository.codecs import MsgPackCodec
+from managers.repository.local_persistence import LocalPersistence
+from managers.repository.local_redis_manager import SERVICE_KEY_PREFIXES
+from managers.repository.local_redis_manager import AsyncLocalRedisManager
+from managers.repository.local_redis_manager import LocalConnection
+from managers.repository.main_manager import MainRepositoryManager
+from managers.repository.shared_memory_manager import EMPTY
+from managers.repository.shared_memory_manager import SharedMemoryConnection
+from managers.repository.shared_memory_manager import SlotAccessor
+from managers.socket_store import SocketNamespaceStore
+from models import exceptions
+from models.constants.character import CHARACTER_MODEL_NAME
+from models.constants.game import GameMode
+from models.constants.socket import SocketRole
+from models.db.pool import PoolStatistics
+from models.mixins import ExtraEffectsMixin
+from models.repository.extra_effects import EffectBaseModel
+from models.repository.player.base import CharacterConfigurationModel
+from models.repository.player.base import CharacterRepositoryModel
+from models.repository.player.base import PlayerConfigurationModel
+from models.repository.player.base import PlayerRepositoryModel
+from models.repository.player.class_ import ClassConfigurationModel
+from models.repository.player.class_ import ClassRepositoryModel
+from models.repository.player.race import RaceConfigurationModel
+from models.repository.player.race import RaceRepositoryModel
+from models.repository.player.skill import SkillConfigurationModel
+from models.repository.player.skill import SkillRepositoryModel
+
+
+def get_real_size(connection: LocalConnection) -> int:
+    """
+    Размер данных, посчитанный заново по всем ключам.
+    """
+    return sum(connection._get_key_size(key) for key in connection.data)
+
+
+@pytest.mark.asyncio
+async def test_local_connection_expires_keys(monkeypatch):
+    """
+    Ключ с истекшим временем жизни не читается, а периодическая очистка удаляет его без обращения.
+    """
+    connection = LocalConnection()
+    await connection.setex("token", 10, 1)
+    await connection.set("session", "value", ex=20)
+    await connection.set("keyring", "value")
+    now = time.time()
+
+    assert await connection.ttl("token") == 10
+    assert await connection.ttl("keyring") == -1
+
+    monkeypatch.setattr(time, "time", lambda: now + 15)
+    assert await connection.get("token") is None
+    assert connection.sweep_expired() == 0
+
+    monkeypatch.setattr(time, "time", lambda: now + 25)
+    assert connection.sweep_expired() == 1
+    assert list(connection.data) == ["keyring"]
+    assert (await connection.info())["expired_keys"] == 2
+
+
+@pytest.mark.asyncio
+async def test_local_connection_accounts_memory():
+    """
+    Учитываемый размер данных совпадает с пересчитанным после изменений хэшей и множеств.
+    """
+    connection = LocalConnection()
+    await connection.hset("hash", mapping={"a": "1", "b": "22"})
+    await connection.hset("hash", "a", "333")
+    await connection.sadd("set", "x", "yy", "zzz")
+    await connection.srem("set", "x")
+    await connection.spop("set")
+    await connection.mhreplace({"other": {"field": "value"}})
+    await connection.incr("counter")
+
+    assert connection.used_bytes == get_real_size(connection)
+
+    await connection.delete("hash", "set", "other", "counter")
+    assert connection.used_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_local_connection_evicts_least_recently_used():
+    """
+    При превышении размера вытесняются давно использованные ключи, кроме закрепленных.
+    """
+    connection = LocalConnection(max_bytes=46, eviction_policy="allkeys-lru", pinned_prefixes=("dirty:",))
+    await connection.sadd("dirty:character", "1234567890")
+    await connection.set("a", "1234567890")
+    await connection.set("b", "1234567890")
+    await connection.get("a")
+    await connection.set("c", "1234567890")
+
+    assert set(connection.data) == {"dirty:character", "a", "c"}
+    assert (await connection.info())["evicted_keys"] == 1
+
+
+@pytest.mark.asyncio
+async def test_local_repository_does_not_evict_service_keys(monkeypatch):
+    """
+    Служебные ключи авторизации, каталога, комнат и соединений не вытесняются объектами репозитория.
+    """
+    monkeypatch.setattr(settings, "local_db_max_bytes", 20000)
+    monkeypatch.setattr(settings, "local_db_eviction_policy", "allkeys-lru")
+    repository = AsyncLocalRedisManager()
+    connection = repository.connection
+    key_cache, blacklist, store = JWKeyCache(), TokenBlacklist(cache_ttl=5, max_size=10), SocketNamespaceStore()
+    key_cache.connection = blacklist.connection = store.connection = connection
+    key_cache._fernet_key = Fernet.generate_key()
+
+    await key_cache.load()
+    await blacklist.revoke("token", {"jti": "token-id", "exp": time.time() + 100})
+    await connection.incr(game_catalog.version_key)
+    await connection.hset(GameRoomManager._room_key("room"), mapping={"owner": "worker"})
+    await connection.sadd(GameRoomManager._open_rooms_key(GameMode.realtime), "room")
+    await store.reserve_player("room", 2)
+    await store.add_connection("sid", SocketRole.PLAYER, "room")
+    service_keys = set(connection.data)
+
+    for index in range(500):
+        await repository.create("filler", {"value": "x" * 100}, f"filler{index}")
+
+    assert (await connection.info())["evicted_keys"] > 0
+    assert service_keys <= set(connection.data)
+    assert all(key.startswith(SERVICE_KEY_PREFIXES) for key in service_keys)
+
+
+@pytest.mark.asyncio
+async def test_local_connection_evicts_least_frequently_used():
+    """
+    При политике LFU вытесняются ключи с наименьшим количеством обращений.
+    """
+    connection = LocalConnection(max_bytes=20, eviction_policy="allkeys-lfu")
+    await connection.set("a", "1234567890")
+    await connection.set("b", "1234567890")
+    for _ in range(3):
+        await connection.get("a")
+    await connection.set("c", "1234567890")
+
+    assert set(connection.data) == {"a", "c"}
+    assert (await connection.info())["hits"] == 3
+
+
+@pytest.mark.asyncio
+async def test_local_connection_noeviction_rejects_writes():
+    """
+    Без вытеснения запись при превышении размера отклоняется.
+    """
+    connection = LocalConnection(max_bytes=5, eviction_policy="noeviction")
+    await connection.set("a", "1234567890")
+
+    with pytest.raises(exceptions.PythonError):
+        await connection.set("b", "1")
+
+
+def open_persistence(directory) -> LocalPersistence:
+    """
+    Восстановление нового хранилища из каталога.
+    """
+    persistence = LocalPersistence(str(directory))
+    persistence.connection = LocalConnection()
+    persistence.load()
+    return persistence
+
+
+@pytest.mark.asyncio
+async def test_local_persistence_restores_from_log_and_snapshot(tmp_path):
+    """
+    Хранилище восстанавливается из снимка и журналов, оборванная запись в конце журнала отбрасывается.
+    """
+    persistence = open_persistence(tmp_path)
+    connection = persistence.connection
+    await connection.hset("character:1", mapping={"level": "1", "name": "hero"})
+    await connection.sadd("dirty:character", "1", "2", "3")
+    await connection.spop("dirty:character")
+    await connection.setex("token", 100, 1)
+    await persistence.flush()
+
+    restored = open_persistence(tmp_path).connection
+    assert restored.data == connection.data
+    assert restored.expires == connection.expires
+
+    await persistence.snapshot()
+    await connection.hset("character:1", "level", "2")
+    await connection.delete("token")
+    await persistence.close()
+    with open(tmp_path / "appendonly.2.log", "ab") as file:
+        file.write(b"\x00\x00\x01")
+
+    restored = open_persistence(tmp_path).connection
+    assert restored.data == connection.data
+    assert restored.used_bytes == connection.used_bytes
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["appendonly.2.log", "snapshot.pickle"]
+    assert (tmp_path / "appendonly.2.log").stat().st_size == 0
+
+
+@pytest.mark.asyncio
+async def test_local_persistence_serializes_snapshot_copy(tmp_path, monkeypatch):
+    """
+    Снимок сериализуется в отдельном потоке из копии, снятой в цикле событий,
+    поэтому изменения во время записи снимка попадают только в журнал.
+    """
+    persistence = open_persistence(tmp_path)
+    connection = persistence.connection
+    await connection.hset("character:1", "level", "1")
+    await connection.sadd("dirty:character", "1")
+    write_snapshot = persistence._write_snapshot
+
+    def write_changed_snapshot(snapshot: dict, generation: int) -> None:
+        asyncio.run(connection.hset("character:1", "level", "2"))
+        asyncio.run(connection.sadd("dirty:character", "2"))
+        write_snapshot(snapshot, generation)
+
+    monkeypatch.setattr(persistence, "_write_snapshot", write_changed_snapshot)
+    await persistence.snapshot()
+
+    snapshot = pickle.loads((tmp_path / "snapshot.pickle").read_bytes())
+    assert snapshot["data"] == {"character:1": {"level": "1"}, "dirty:character": {"1"}}
+    monkeypatch.undo()
+    await persistence.close()
+    assert open_persistence(tmp_path).connection.data == connection.data
+
+
+@pytest.mark.asyncio
+async def test_local_persistence_drops_process_keys(tmp_path):
+    """
+    Комнаты, отметки процессов и соединения прежнего запуска не восстанавливаются.
+    """
+    persistence = open_persistence(tmp_path)
+    connection = persistence.connection
+    await connection.hset("game_room:1", mapping={"owner": "worker", "mode": "realtime"})
+    await connection.sadd("game_rooms:realtime", "1")
+    await connection.setex("game_worker:worker", 100, 1)
+    await connection.sadd("socket_players:1", "sid")
+    await connection.set("catalog_version", "1")
+    await persistence.close()
+
+    assert list(open_persistence(tmp_path).connection.data) == ["catalog_version"]
+
+
+def open_shared_memory(path, slots: int = 64, stripes: int = 4) -> SharedMemoryConnection:
+    """
+    Подключение к таблице в общей памяти с ячейками небольшого размера.
+    """
+    return SharedMemoryConnection(str(path), slots=slots, slot_size=256, stripes=stripes)
+
+
+def increment_shared_counter(path: str, times: int) -> None:
+    """
+    Увеличение счетчика из отдельного процесса.
+    """
+
+    async def increment() -> None:
+        connection = open_shared_memory(path)
+        for _ in range(times):
+            await connection.incr("counter")
+        connection.close()
+
+    asyncio.run(increment())
+
+
+@pytest.mark.asyncio
+async def test_shared_memory_connection_is_shared_between_connections(tmp_path):
+    """
+    Изменения одного подключения видны другому подключению к тому же файлу.
+    """
+    first = open_shared_memory(tmp_path / "shared.db")
+    second = open_shared_memory(tmp_path / "shared.db")
+
+    await first.hset("character:1", mapping={"level": "1"})
+    await first.sadd("dirty:character", "1", "2")
+    await second.hset("character:1", "name", "hero")
+    await second.setex("token", 100, 1)
+
+    assert await first.hgetall("character:1") == {"level": "1", "name": "hero"}
+    assert await second.spop("dirty:character", 5) in (["1", "2"], ["2", "1"])
+    assert not await first.exists("dirty:character")
+    assert await first.ttl("token") == 100
+    assert await first.delete("token", "missing") == 1
+    assert (await first.info())["keys"] == 1
+
+    with pytest.raises(exceptions.PythonError):
+        await first.set("large", "x" * 1000)
+
+
+@pytest.mark.asyncio
+async def test_shared_memory_connection_reports_full_segment(tmp_path):
+    """
+    Запись в заполненный сегмент отклоняется, удаленные ячейки используются повторно.
+    """
+    connection = open_shared_memory(tmp_path / "shared.db", slots=4, stripes=1)
+    for index in range(4):
+        await connection.set(f"key{index}", "value")
+
+    with pytest.raises(exceptions.PythonError):
+        await connection.set("key4", "value")
+    await connection.delete("key0")
+    await connection.set("key4", "value")
+    assert await connection.get("key4") == "value"
+    assert await connection.get("key3") == "value"
+
+
+@pytest.mark.asyncio
+async def test_shared_memory_connection_reclaims_deleted_slots(tmp_path):
+    """
+    При постоянной записи и удалении новых ключей метки удаленных ключей освобождаются и таблица не заполняется.
+    """
+    connection = open_shared_memory(tmp_path / "shared.db", slots=16, stripes=1)
+    for index in range(4):
+        await connection.set(f"live{index}", "value")
+
+    for index in range(1000):
+        await connection.set(f"churn{index}", "value", ex=60)
+        await connection.delete(f"churn{index}")
+
+    # Свободные ячейки не кончаются, поэтому поиск отсутствующего ключа не проходит весь сегмент
+    assert EMPTY in [state for _, state in connection._iter_stripe_slots(0)]
+    assert [await connection.get(f"live{index}") for index in range(4)] == ["value"] * 4
+    info = await connection.info()
+    assert (info["keys"], info["rehashes"] > 0) == (4, True)
+
+
+@pytest.mark.asyncio
+async def test_shared_memory_connection_splits_large_collections(tmp_path, monkeypatch):
+    """
+    Коллекции, не помещающиеся в ячейку, хранятся частями, а изменение перезаписывает только свою часть.
+    """
+    first = SharedMemoryConnection(str(tmp_path / "shared.db"), slots=256, slot_size=512, stripes=2)
+    second = SharedMemoryConnection(str(tmp_path / "shared.db"), slots=256, slot_size=512, stripes=2)
+    members = [f"member-{index:03}" for index in range(300)]
+
+    for member in members:
+        await first.sadd("set", member)
+    await first.hset("hash", mapping=dict.fromkeys(members, "value"))
+    await first.zadd("zset", dict.fromkeys(reversed(members), 0))
+
+    assert await second.scard("set") == 300
+    assert await second.smembers("set") == set(members)
+    assert await second.hgetall("hash") == dict.fromkeys(members, "value")
+    assert await second.hget("hash", "member-150") == "value"
+    assert await second.zcard("zset") == 300
+    assert await second.zrangebylex("zset", "(member-100", "+", start=0, num=3) == members[101:104]
+    assert await second.zrangebylex("zset", "-", "[member-002") == members[:3]
+
+    writes = []
+    write_payload = SlotAccessor._write_payload
+    monkeypatch.setattr(
+        SlotAccessor, "_write_payload", lambda slot, *args: writes.append(slot.key) or write_payload(slot, *args)
+    )
+    await second.sadd("set", "member-150a")
+    assert len(writes) == 2
+    monkeypatch.undo()
+
+    assert await first.srem("set", *members[:250]) == 250
+    assert await first.zrem("zset", *members[50:]) == 250
+    assert len(set(await first.spop("set", 10))) == 10
+    assert await first.scard("set") == 41
+    assert await first.zrangebylex("zset", "-", "+") == members[:50]
+
+    await first.expire("hash", 1)
+    monkeypatch.setattr(time, "time", lambda: 2e9)
+    assert first.sweep_expired() == 1
+    await first.delete("set", "zset")
+    assert (await first.info())["used_bytes"] == 0
+
+
+def test_shared_memory_connection_locks_between_processes(tmp_path):
+    """
+    Одновременные изменения из нескольких процессов не теряются.
+    """
+    path = str(tmp_path / "shared.db")
+    open_shared_memory(path).close()
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=increment_shared_counter, args=(path, 200)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert asyncio.run(open_shared_memory(path).get("counter")) == "800"
+
+
+def character_data(player_id: str) -> dict:
+    """
+    Данные персонажа, достаточные для индексов.
+    """
+    return {"player": {"player_configuration": {"uid": player_id}}, "character_configuration": {"level": 1}}
+
+
+@pytest.mark.asyncio
+async def test_repository_indexes_follow_changes():
+    """
+    Индексы обновляются при создании, изменении и удалении объектов и читаются страницами по курсору.
+    """
+    repository = AsyncLocalRedisManager()
+    await repository.set_many(
+        CHARACTER_MODEL_NAME,
+        {f"game{game}:character{character}": character_data("player1") for game in range(3) for character in range(2)},
+    )
+    await repository.create(CHARACTER_MODEL_NAME, character_data("player2"), "game1:character9")
+
+    ids, cursor = await repository.find_by_index(CHARACTER_MODEL_NAME, "game", "game1", count=2)
+    assert ids == ["game1:character0", "game1:character1"]
+    ids, cursor = await repository.find_by_index(CHARACTER_MODEL_NAME, "game", "game1", cursor=cursor, count=2)
+    assert (ids, cursor) == (["game1:character9"], None)
+
+    await repository.update(CHARACTER_MODEL_NAME, "game1:character9", player=character_data("player1")["player"])
+    await repository.update(CHARACTER_MODEL_NAME, "game0:character0", character_configuration={"level": 2})
+    await repository.delete_many(CHARACTER_MODEL_NAME, ["game2:character0", "game2:character1"])
+
+    ids, _ = await repository.find_by_index(CHARACTER_MODEL_NAME, "player", "player1", count=10)
+    assert ids == ["game0:character0", "game0:character1", "game1:character0", "game1:character1", "game1:character9"]
+    assert await repository.find_by_index(CHARACTER_MODEL_NAME, "player", "player2") == ([], None)
+    assert await repository.find_by_index(CHARACTER_MODEL_NAME, "game", "game2") == ([], None)
+
+
+@pytest.mark.asyncio
+async def test_repository_indexes_skip_evicted_objects():
+    """
+    Объект, вытесненный без обновления индексов, пропускается при выборке и удаляется из индексов.
+    """
+    repository = AsyncLocalRedisManager()
+    await repository.set_many(
+        CHARACTER_MODEL_NAME, {f"game4:character{character}": character_data("player4") for character in range(3)}
+    )
+    await repository.connection.delete(f"{CHARACTER_MODEL_NAME}:game4:character1")
+
+    assert await repository.find_by_index(CHARACTER_MODEL_NAME, "game", "game4", count=2) == (
+        ["game4:character0"],
+        "game4:character1",
+    )
+    ids, _ = await repository.find_by_index(CHARACTER_MODEL_NAME, "player", "player4")
+    assert ids == ["game4:character0", "game4:character2"]
+    assert not await repository.connection.exists(f"index_values:{CHARACTER_MODEL_NAME}:game4:character1")
+
+
+@pytest.mark.asyncio
+async def test_player_game_ids_are_paginated_by_game():
+    """
+    Курсор игр игрока пропускает оставшихся персонажей последней игры страницы.
+    """
+    repository = MainRepositoryManager()
+    await repository.set_many(
+        CHARACTER_MODEL_NAME,
+        {f"game{game}:character{character}": character_data("player3") for game in range(3) for character in range(2)},
+    )
+
+    game_ids, cursor = await get_player_game_ids("player3", count=3)
+    assert game_ids == ["game0", "game1"]
+    game_ids, cursor = await get_player_game_ids("player3", cursor=cursor, count=3)
+    assert (game_ids, cursor) == (["game2"], None)
+    assert (await get_game_character_ids("game2"))[0] == ["game2:character0", "game2:character1"]
+
+
+def character_with_skill(skill_uid: uuid.UUID, level: int, cooldown: int) -> CharacterRepositoryModel:
+    """
+    Персонаж со скиллом каталога и собственным состоянием скилла.
+    """
+    return CharacterRepositoryModel(
+        class_=ClassRepositoryModel(effects=ExtraEffectsMixin(), class_configuration=ClassConfigurationModel()),
+        race=RaceRepositoryModel(effects=ExtraEffectsMixin(), race_configuration=RaceConfigurationModel()),
+        skills=[
+            SkillRepositoryModel(
+                skill_configuration=SkillConfigurationModel(
+                    uid=skill_uid, name="Fireball", level=level, cooldown=cooldown
+                ),
+                effects=[EffectBaseModel(uid=uuid.UUID(int=1), name="Burn")],
+            )
+        ],
+        player=PlayerRepositoryModel(player_configuration=PlayerConfigurationModel()),
+        character_configuration=CharacterConfigurationModel(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_compact_codec_keeps_character_state_of_shared_skills(monkeypatch):
+    """
+    Персонажи с одним скиллом каталога хранят свои уровни, а другой процесс читает их без реестра определений.
+    """
+    monkeypatch.setitem(codecs.codecs, CHARACTER_MODEL_NAME, MsgPackCodec(REFERENCE_FIELDS[CHARACTER_MODEL_NAME]))
+    repository = AsyncLocalRedisManager()
+    skill_uid = uuid.uuid4()
+    first, second = character_with_skill(skill_uid, 5, 3), character_with_skill(skill_uid, 1, 0)
+
+    await repository.create(CHARACTER_MODEL_NAME, first, "first")
+    await repository.create(CHARACTER_MODEL_NAME, second, "second")
+    # Другой процесс начинает с пустым реестром определений
+    monkeypatch.setattr(codecs.definition_registry, "definitions", {})
+
+    assert await repository.get_by_id(CHARACTER_MODEL_NAME, "first") == first.model_dump(mode="json")
+    assert await repository.get_by_id(CHARACTER_MODEL_NAME, "second") == second.model_dump(mode="json")
+    # Определение скилла общее и не содержит состояния персонажа
+    definition_keys = [key for key in repository.connection.data if key.startswith("definition:")]
+    assert len([key for key in definition_keys if str(skill_uid) in key]) == 1
+
+
+@pytest.mark.asyncio
+async def test_repository_keeps_empty_objects():
+    """
+    Объект без полей сохраняется и читается, а затем обновляется как обычный.
+    """
+    repository = AsyncLocalRedisManager()
+
+    id = await repository.create("empty", {})
+
+    assert await repository.get_by_id("empty", id) == {}
+    assert await repository.get_many("empty", [id]) == [{}]
+    assert await repository.update("empty", id, level=2)
+    assert await repository.get_by_id("empty", id) == {"level": 2}
+
+
+class LegacyRedis(Redis):
+    """
+    Редис с объектами, сохраненными до перехода на хэши одной JSON строкой.
+    Скрипты выполняются на стороне клиента.
+    """
+
+    def __init__(self, data: dict) -> None:
+        self.data = data
+
+    def _check_hash(self, name: str) -> dict:
+        """
+        Хэш по ключу, для строки — ошибка WRONGTYPE, как в редисе.
+        """
+        if isinstance(value := self.data.get(name, {}), str):
+            msg = "WRONGTYPE Operation against a key holding the wrong kind of value"
+            raise ResponseError(msg)
+        return value
+
+    async def get(self, name: str) -> str | None:
+        """
+        Строка по ключу.
+        """
+        return self.data.get(name)
+
+    async def hgetall(self, name: str) -> dict:
+        """
+        Поля хэша.
+        """
+        return dict(self._check_hash(name))
+
+    def register_script(self, script: str) -> Callable:
+        """
+        Скрипт, выполняемый на стороне клиента.
+        """
+
+        async def migrate(keys: list[str], args: list, client: Redis) -> int:
+            if self.data.get(keys[0]) != args[0]:
+                return 0
+            self.data[keys[0]] = dict(zip(args[1::2], args[2::2], strict=True))
+            return 1
+
+        async def update_fields(keys: list[str], args: list, client: Redis) -> int:
+            if keys[0] not in self.data:
+                return 0
+            if isinstance(self.data[keys[0]], str):
+                return -1
+            self.data[keys[0]].update(zip(args[::2], args[1::2], strict=True))
+            return 1
+
+        return migrate if script == MIGRATE_STRING_SCRIPT else update_fields
+
+
+@pytest.mark.asyncio
+async def test_redis_repository_migrates_string_objects():
+    """
+    Объекты, сохраненные одной строкой, при обращении переводятся в хэши.
+    """
+    connection = LegacyRedis({"legacy:first": '{"level": 1}', "legacy:second": '{"level": 2}'})
+    repository = AsyncRedisManager()
+    repository.connection = connection
+
+    assert await repository.get_by_id("legacy", "first") == {"level": 1}
+    assert await repository.update("legacy", "second", title="second")
+    assert await repository.get_by_id("legacy", "second") == {"level": 2, "title": "second"}
+    assert connection.data["legacy:first"] == {"level": "1"}
+
+
+@pytest.mark.asyncio
+async def test_redis_repository_updates_indexes_with_script(monkeypatch):
+    """
+    Индексы в редисе обновляются скриптом, а значения, измененные после чтения, перечитываются.
+    """
+    repository = AsyncRedisManager()
+    repository.connection = FakeAsyncRedis()
+    await repository.set_many(
+        CHARACTER_MODEL_NAME, {f"game5:character{character}": character_data("player5") for character in range(2)}
+    )
+    assert await repository.find_by_index(CHARACTER_MODEL_NAME, "player", "player5") == (
+        ["game5:character0", "game5:character1"],
+        None,
+    )
+
+    read_index_values = repository._read_index_values
+    reads = []
+
+    async def read_stale_index_values(keys: list[str], connection: Redis) -> list[dict[str, str]]:
+        values = await read_index_values(keys, connection=connection)
+        reads.append(keys)
+        return [{**value, "player": "stale"} for value in values] if len(reads) == 1 else values
+
+    monkeypatch.setattr(repository, "_read_index_values", read_stale_index_values)
+    await repository.update(CHARACTER_MODEL_NAME, "game5:character1", player=character_data("player6")["player"])
+    await repository.delete(CHARACTER_MODEL_NAME, "game5:character0")
+
+    assert len(reads) == 3
+    assert await repository.find_by_index(CHARACTER_MODEL_NAME, "player", "player5") == ([], None)
+    assert await repository.find_by_index(CHARACTER_MODEL_NAME, "player", "player6") == (["game5:character1"], None)
+    assert await repository.find_by_index(CHARACTER_MODEL_NAME, "game", "game5") == (["game5:character1"], None)
+    assert await repository.connection.hgetall(f"index_values:{CHARACTER_MODEL_NAME}:game5:character1") == {
+        b"game": b"game5",
+        b"player": b"player6",
+    }
+
+
+@pytest.mark.asyncio
+async def test_redis_repository_reuses_and_closes_shared_pool():
+    """
+    Команды репозитория берут подключения из одного пула, а закрытие менеджера отключает их.
+    """
+    repository = AsyncRedisManager()
+    pool = FakeAsyncRedis(connection_pool_class=BlockingConnectionPool, max_connections=2).connection_pool
+    repository.pool = pool
+
+    await asyncio.gather(*(repository.create("pooled", {"value": index}, f"object{index}") for index in range(10)))
+    assert repository.connection.connection_pool is pool
+    assert await repository.get_by_id("pooled", "object9") == {"value": 9}
+    connections = list(pool._available_connections)
+    assert len(connections) == 2
+    assert all(connection.is_connected for connection in connections)
+
+    await repository.close()
+    assert not any(connection.is_connected for connection in connections)
+    assert "connection" not in repository.__dict__
+    assert "pool" not in repository.__dict__
+
+
+def get_redis_repository() -> AsyncRedisManager:
+    """
+    Репозиторий редиса поверх fakeredis.
+    """
+    repository = AsyncRedisManager()
+    repository.connection = FakeAsyncRedis()
+    return repository
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("get_repository", [AsyncLocalRedisManager, get_redis_repository])
+async def test_repository_batches_round_trip(get_repository: Callable):
+    """
+    Пакетные чтение, запись и удаление возвращают значения по порядку идентификаторов и None для отсутствующих.
+    """
+    repository = get_repository()
+    first, second, missing = (uuid.uuid4().hex for _ in range(3))
+
+    assert await repository.set_many("batch", {first: {"level": 1}, second: {"level": 2, "title": "second"}})
+    assert await repository.get_many("batch", [second, missing, first]) == [
+        {"level": 2, "title": "second"},
+        None,
+        {"level": 1},
+    ]
+
+    assert await repository.set_many("batch", {first: {"level": 3}})
+    assert await repository.get_many("batch", [first]) == [{"level": 3}]
+
+    assert await repository.delete_many("batch", [first, missing]) == 1
+    assert await repository.get_many("batch", [first, second]) == [None, {"level": 2, "title": "second"}]
+    assert (await repository.get_many("batch", []), await repository.delete_many("batch", [])) == ([], 0)
+
+
+@pytest.mark.asyncio
+async def test_pool_statistics_count_checkouts(tmp_path):
+    """
+    Статистика пула считает открытые и выданные подключения и время их ожидания.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", pool_size=2)
+    statistics = PoolStatistics()
+    statistics.track(engine)
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("select 1"))
+            assert statistics.stats()["checked_out"] == 1
+        async with engine.connect() as connection:
+            await connection.execute(text("select 1"))
+        statistics.add_acquire_time(0.002)
+        statistics.add_acquire_time(0.004)
+
+        stats = statistics.stats()
+        assert (stats["connects"], stats["checkouts"], stats["invalidations"]) == (1, 2, 0)
+        assert (stats["size"], stats["checked_in"], stats["checked_out"], stats["overflow"]) == (2, 1, 0, -1)
+        assert stats["acquire_time_avg_ms"] == pytest.approx(3)
+        assert stats["acquire_time_max_ms"] == pytest.approx(4)
+    finally:
+        await engine.dispose()
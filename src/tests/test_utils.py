@@ -0,0 +1,683 @@
+"""
+Тесты утилит.
+"""
+
+import asyncio
+import uuid
+from collections import deque
+from typing import Any
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import settings
+from logic.utils import character_utils
+from logic.utils.catalog_utils import ClassRecord
+from logic.utils.catalog_utils import RaceRecord
+from logic.utils.catalog_utils import SkillRecord
+from logic.utils.character_utils import get_character_repository_id
+from logic.utils.character_utils import load_character
+from logic.utils.character_utils import load_characters
+from logic.utils.dungeon_utils import generate_dungeon_floor
+from logic.utils.dungeon_utils import get_dungeon_floor
+from logic.utils.json_utils import from_json
+from logic.utils.persistence_utils import CHARACTER_COLUMNS
+from logic.utils.persistence_utils import CharacterFlusher
+from logic.utils.persistence_utils import build_characters_values_update
+from logic.utils.rate_limit_utils import TokenBucket
+from logic.utils.state_utils import DELETED
+from logic.utils.state_utils import apply_delta
+from logic.utils.state_utils import diff_state
+from managers.actions.action_routes import ActionRoute
+from managers.actions.action_routes import ActionRoutes
+from managers.actions.action_routes import action_routes
+from managers.game_loop import GameRoomManager
+from managers.game_loop import GameRoom
+from managers.repository.main_manager import MainRepositoryManager
+from managers.socket_store import WORKER_ID
+from managers.socket_store import socket_store
+from models import exceptions
+from models.base import BaseRequestActionDataModel
+from models.base import BaseResponseActionDataModel
+from models.constants.character import CHARACTER_MODEL_NAME
+from models.constants.dungeon import Tile
+from models.constants.game import GameMode
+from models.constants.race import RaceType
+from models.db.base import Buff
+from models.db.base import Character
+from models.db.base import Class
+from models.db.base import Debuff
+from models.db.base import Effect
+from models.db.base import Player
+from models.db.base import Race
+from models.db.base import Skill
+from models.db.base import get_connect_args
+
+
+async def create_player(session: AsyncSession, characters_count: int) -> uuid.UUID:
+    """
+    Создание игрока с персонажами, у каждого свой класс, раса и скиллы.
+    """
+    player = Player(username=f"player{characters_count}", email=f"player{characters_count}@mail.ru", password="hash")
+    for index in range(characters_count):
+        class_ = Class(
+            name=f"class{index}",
+            effects=[Effect(name="class effect")],
+            buffs=[Buff(name="class buff")],
+            debuffs=[Debuff(name="class debuff")],
+        )
+        race = Race(type="elf", effects=[Effect(name="race effect")], buffs=[Buff(name="race buff")])
+        skills = [Skill(name=f"skill{index}{number}", effects=[Effect(name="skill effect")]) for number in range(3)]
+        player.characters.append(
+            Character(game_name=f"character{index}", character_class=class_, race=race, skills=skills)
+        )
+    session.add(player)
+    await session.commit()
+    session.expunge_all()
+    return player.id
+
+
+@pytest.mark.asyncio
+async def test_load_characters_query_count_does_not_grow(db_session, query_counter):
+    """
+    Число запросов при загрузке персонажей не зависит от их количества.
+    """
+    one_player_id = await create_player(db_session, 1)
+    many_player_id = await create_player(db_session, 10)
+
+    query_counter.count = 0
+    characters = await load_characters(db_session, one_player_id)
+    one_count = query_counter.count
+    assert len(characters) == 1
+
+    db_session.expunge_all()
+    query_counter.count = 0
+    characters = await load_characters(db_session, many_player_id)
+    assert len(characters) == 10
+    assert query_counter.count == one_count
+    assert query_counter.count <= 9
+
+
+@pytest.mark.asyncio
+async def test_load_characters_maps_relationships(db_session):
+    """
+    Класс, раса, скиллы и их эффекты переносятся в модель репозитория.
+    """
+    player_id = await create_player(db_session, 1)
+
+    character = (await load_characters(db_session, player_id))[0]
+
+    assert character.player.player_configuration.uid == player_id
+    assert character.player.player_configuration.password != "hash"
+    assert character.character_configuration.game_name == "character0"
+    assert character.class_.class_configuration.name == "class0"
+    assert [buff.name for buff in character.class_.effects.buffs] == ["class buff"]
+    assert [debuff.name for debuff in character.class_.effects.debuffs] == ["class debuff"]
+    assert character.race.race_configuration.race == RaceType.elf
+    assert [effect.name for effect in character.race.effects.effects] == ["race effect"]
+    assert sorted(skill.skill_configuration.name for skill in character.skills) == ["skill00", "skill01", "skill02"]
+    assert all(skill.effects[0].name == "skill effect" for skill in character.skills)
+
+
+@pytest.mark.asyncio
+async def test_load_characters_from_catalog(db_session, query_counter, monkeypatch):
+    """
+    С загруженным каталогом данные каталога не запрашиваются из базы данных.
+    """
+    player_id = await create_player(db_session, 3)
+    characters = await load_characters(db_session, player_id)
+    db_session.expunge_all()
+
+    catalog = {}
+    for character in characters:
+        catalog[character.class_.id] = ClassRecord(
+            id=character.class_.id,
+            name=character.class_.class_configuration.name,
+            description="",
+            effects=(),
+            buffs=(),
+            debuffs=(),
+            created_at=character.created_at,
+            updated_at=character.updated_at,
+        )
+        catalog[character.race.id] = RaceRecord(
+            id=character.race.id,
+            type="elf",
+            description="",
+            effects=(),
+            buffs=(),
+            debuffs=(),
+            created_at=character.created_at,
+            updated_at=character.updated_at,
+        )
+        for skill in character.skills:
+            catalog[skill.id()] = SkillRecord(
+                id=skill.id(),
+                type="active",
+                name=skill.skill_configuration.name,
+                description="",
+                level=1,
+                required_level=1,
+                cooldown=0,
+                effects=(),
+                created_at=character.created_at,
+                updated_at=character.updated_at,
+            )
+
+    monkeypatch.setattr(character_utils.game_catalog, "_loaded", True)
+    for getter in ("get_class", "get_race", "get_skill"):
+        monkeypatch.setattr(character_utils.game_catalog, getter, catalog.__getitem__)
+
+    query_counter.count = 0
+    from_catalog = await load_characters(db_session, player_id)
+
+    assert query_counter.count == 2
+    assert [character.class_.id for character in from_catalog] == [character.class_.id for character in characters]
+
+
+@pytest.mark.asyncio
+async def test_load_character_not_found(db_session):
+    """
+    Отсутствующий персонаж приводит к ошибке.
+    """
+    player_id = await create_player(db_session, 1)
+
+    with pytest.raises(exceptions.PythonError):
+        await load_character(db_session, player_id, uuid.uuid4())
+
+
+async def get_dirty_ids(repository: MainRepositoryManager) -> tuple[set[str], set[str]]:
+    """
+    Измененные и извлеченные для записи персонажи.
+    """
+    return (
+        set(await repository.connection.smembers(repository._get_dirty_key(CHARACTER_MODEL_NAME))),
+        set(await repository.connection.smembers(repository._get_processing_key(CHARACTER_MODEL_NAME))),
+    )
+
+
+@pytest.mark.asyncio
+async def test_character_flusher_writes_dirty_characters(db_engine, db_session):
+    """
+    Измененные в репозитории персонажи записываются в базу данных, множество измененных очищается.
+    """
+    player_id = await create_player(db_session, 3)
+    characters = await load_characters(db_session, player_id)
+    db_session.expunge_all()
+
+    repository = MainRepositoryManager()
+    game_id = uuid.uuid4()
+    character_repo_ids = []
+    for character in characters:
+        character.character_configuration.level = 7
+        character.character_configuration.experience = 150.5
+        character_repo_id = get_character_repository_id(game_id=game_id, character_id=character.id)
+        await repository.create(CHARACTER_MODEL_NAME, character, character_repo_id)
+        character_repo_ids.append(character_repo_id)
+    await repository.mark_dirty(CHARACTER_MODEL_NAME, character_repo_ids)
+
+    flusher = CharacterFlusher(sessionmaker(bind=db_engine, class_=AsyncSession))
+    flusher._batch_size = 2
+    await flusher.flush()
+
+    flushed = await load_characters(db_session, player_id)
+    assert {character.character_configuration.level for character in flushed} == {7}
+    assert {character.character_configuration.experience for character in flushed} == {150}
+    assert flusher.stats() == {"flushed": 3, "failed": 0, "quarantined": 0}
+    assert await get_dirty_ids(repository) == (set(), set())
+
+
+@pytest.mark.asyncio
+async def test_character_flusher_quarantines_failing_character(db_engine, db_session, monkeypatch):
+    """
+    Ошибочная строка не блокирует пачку: остальные персонажи записываются,
+    а ошибочный повторяется при следующих записях и после исчерпания попыток откладывается в карантин.
+    """
+    player_id = await create_player(db_session, 3)
+    characters = await load_characters(db_session, player_id)
+    db_session.expunge_all()
+
+    repository = MainRepositoryManager()
+    game_id = uuid.uuid4()
+    character_repo_ids = []
+    for character in characters:
+        character.character_configuration.level = 9
+        character_repo_id = get_character_repository_id(game_id=game_id, character_id=character.id)
+        await repository.create(CHARACTER_MODEL_NAME, character, character_repo_id)
+        character_repo_ids.append(character_repo_id)
+    await repository.mark_dirty(CHARACTER_MODEL_NAME, character_repo_ids)
+
+    flusher = CharacterFlusher(sessionmaker(bind=db_engine, class_=AsyncSession))
+    flusher._max_attempts = 2
+    bad_id = characters[0].id
+    write = flusher._write
+
+    async def failing_write(rows):
+        if any(row["id"] == bad_id for row in rows):
+            raise RuntimeError("bad row")
+        await write(rows)
+
+    monkeypatch.setattr(flusher, "_write", failing_write)
+    await flusher.flush()
+
+    flushed = await load_characters(db_session, player_id)
+    assert {character.id for character in flushed if character.character_configuration.level == 9} == {
+        character.id for character in characters[1:]
+    }
+    assert flusher.stats() == {"flushed": 2, "failed": 1, "quarantined": 0}
+    assert await get_dirty_ids(repository) == ({character_repo_ids[0]}, set())
+
+    await flusher.flush()
+    assert flusher.stats() == {"flushed": 2, "failed": 2, "quarantined": 1}
+    assert await get_dirty_ids(repository) == (set(), {character_repo_ids[0]})
+
+    await repository.mark_dirty(CHARACTER_MODEL_NAME, [character_repo_ids[0]])
+    await flusher.flush()
+    assert flusher.stats() == {"flushed": 2, "failed": 2, "quarantined": 1}
+    assert await get_dirty_ids(repository) == (set(), {character_repo_ids[0]})
+
+    flusher.quarantined[character_repo_ids[0]] = 0
+    await flusher.flush()
+    assert flusher.stats() == {"flushed": 2, "failed": 2, "quarantined": 0}
+    assert await get_dirty_ids(repository) == ({character_repo_ids[0]}, set())
+
+    await flusher.flush()
+    assert flusher.stats() == {"flushed": 2, "failed": 3, "quarantined": 1}
+
+
+@pytest.mark.asyncio
+async def test_character_flusher_restores_unflushed_characters(monkeypatch):
+    """
+    Персонажи, извлеченные процессом, упавшим до записи, возвращаются в множество измененных при запуске.
+    """
+    repository = MainRepositoryManager()
+    await repository.connection.delete(
+        repository._get_dirty_key(CHARACTER_MODEL_NAME), repository._get_processing_key(CHARACTER_MODEL_NAME)
+    )
+    await repository.mark_dirty(CHARACTER_MODEL_NAME, ["game:1", "game:2"])
+    assert sorted(await repository.pop_dirty(CHARACTER_MODEL_NAME, 10)) == ["game:1", "game:2"]
+    assert await get_dirty_ids(repository) == (set(), {"game:1", "game:2"})
+
+    async def stop(delay: float) -> None:
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(asyncio, "sleep", stop)
+    with pytest.raises(asyncio.CancelledError):
+        await CharacterFlusher().run()
+    assert await get_dirty_ids(repository) == ({"game:1", "game:2"}, set())
+    await repository.connection.delete(repository._get_dirty_key(CHARACTER_MODEL_NAME))
+
+
+def test_character_values_update_compiles_for_postgresql():
+    """
+    Для PostgreSQL пачка персонажей обновляется одним запросом UPDATE ... FROM (VALUES ...).
+    """
+    rows = [
+        {"id": uuid.UUID(int=index), **dict.fromkeys(CHARACTER_COLUMNS, index), "game_name": f"name-{index}"}
+        for index in range(1, 3)
+    ]
+
+    compiled = build_characters_values_update(rows).compile(dialect=postgresql.dialect())
+
+    sql = " ".join(str(compiled).split())
+    assert sql.startswith("UPDATE character SET")
+    assert "FROM (VALUES" in sql
+    assert "WHERE character.id = character_values.id" in sql
+    assert list(compiled.params.values()) == [value for row in rows for value in row.values()]
+
+
+@pytest.mark.asyncio
+async def test_connect_args_are_passed_only_to_asyncpg():
+    """
+    Параметры asyncpg не передаются другим драйверам, и SQLite подключается с параметрами по адресу.
+    """
+    assert set(get_connect_args("postgresql+asyncpg://user@localhost/db")) == {
+        "prepared_statement_cache_size",
+        "server_settings",
+    }
+    assert get_connect_args("postgresql+psycopg://user@localhost/db") == {}
+
+    engine = create_async_engine("sqlite+aiosqlite://", connect_args=get_connect_args("sqlite+aiosqlite://"))
+    try:
+        async with engine.connect() as connection:
+            assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+    finally:
+        await engine.dispose()
+
+
+def test_diff_state_contains_only_changes():
+    """
+    Изменение состояния содержит только измененные вложенные ключи и отметки удаленных ключей.
+    """
+    old = {"tick": 1, "players": {"a": {"hp": 10, "pos": [0, 0]}, "b": {"hp": 5}}}
+    new = {"tick": 2, "players": {"a": {"hp": 10, "pos": [1, 0]}, "c": {"hp": 7}}}
+
+    delta = diff_state(old, new)
+
+    assert delta == {"tick": 2, "players": {"a": {"pos": [1, 0]}, "b": DELETED, "c": {"hp": 7}}}
+    assert diff_state(new, new) == {}
+
+
+def test_apply_delta_restores_state():
+    """
+    Применение изменения к старому состоянию дает новое состояние.
+    """
+    old = {"players": {"a": {"hp": 10, "buffs": {"x": 1}}, "b": {}}, "map": "cave"}
+    new = {"players": {"a": {"hp": 8, "buffs": {}}, "c": {"hp": 1}}, "map": "cave"}
+
+    assert apply_delta(old, diff_state(old, new)) == new
+
+
+class MoveRequestModel(BaseRequestActionDataModel):
+    """
+    Данные тестового действия.
+    """
+
+    x: int
+    y: int
+
+
+class MoveResponseModel(BaseResponseActionDataModel):
+    """
+    Ответ тестового действия.
+    """
+
+    position: tuple[int, int]
+
+
+@pytest.mark.asyncio
+async def test_action_routes_validate_request_and_response():
+    """
+    Данные действия проверяются моделями, указанными при регистрации, ошибки учитываются в статистике.
+    """
+    routes = ActionRoutes()
+
+    @routes.register_action("move", request_model=MoveRequestModel, response_model=MoveResponseModel)
+    async def move(sid: str, data: MoveRequestModel) -> dict:
+        return {"position": (data.x, data.y)}
+
+    request = routes.parse_request({"action": "move_client", "data": {"x": 1, "y": 2}})
+    result = await routes[request.action]("sid", request.data)
+
+    assert request.action == "move"
+    assert routes.build_response(request.action, result) == {
+        "action": "move_server",
+        "data": {"delta": None, "position": [1, 2]},
+    }
+    with pytest.raises(ValidationError):
+        routes.parse_request({"action": "move", "data": {}})
+    with pytest.raises(ValidationError):
+        await routes["move"]("sid", {"x": 1, "y": 2, "z": 3})
+    assert routes.stats()["move"]["calls"] == 2
+    assert routes.stats()["move"]["errors"] == 1
+
+
+def test_token_bucket_drops_messages_over_limit():
+    """
+    Сообщения сверх емкости корзины отбрасываются, пока корзина не пополнится.
+    """
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = bucket.updated
+
+    assert [bucket.consume(now) for _ in range(3)] == [True, True, False]
+    assert bucket.consume(now + 0.2)
+
+
+@pytest.mark.asyncio
+async def test_game_room_coalesces_inputs_within_tick(monkeypatch):
+    """
+    Из нескольких объединяемых действий клиента за тик применяется только последнее.
+    """
+    applied = []
+
+    async def move(sid: str, data: dict) -> dict:
+        applied.append((sid, data))
+        return data
+
+    monkeypatch.setitem(action_routes, "move", ActionRoute("move", move, coalesce=True))
+    room = GameRoom(None, GameMode.realtime, max_players=2)
+    room.add_player("a")
+    room.add_player("b")
+
+    for x in range(3):
+        assert room.submit("a", "move", {"x": x})
+    assert room.submit("b", "move", {"x": 10})
+    await room._apply_inputs()
+
+    assert applied == [("a", {"x": 2}), ("b", {"x": 10})]
+    assert room.statistics.coalesced_inputs == 2
+    assert room.state["players"]["a"] == {"x": 2}
+
+
+class FakeSocketServer:
+    """
+    Сервер SocketIO, запоминающий отправленные сообщения.
+    """
+
+    def __init__(self) -> None:
+        self.emitted: list[tuple[str, dict, str]] = []
+
+    async def emit(self, event: str, data: dict, to: str, namespace: str | None = None) -> None:
+        """
+        Отправка сообщения.
+        """
+        self.emitted.append((event, data, to))
+
+    async def enter_room(self, sid: str, room: str, namespace: str | None = None) -> None:
+        """
+        Добавление клиента в комнату SocketIO.
+        """
+
+    async def leave_room(self, sid: str, room: str, namespace: str | None = None) -> None:
+        """
+        Удаление клиента из комнаты SocketIO.
+        """
+
+    async def close_room(self, room: str, namespace: str | None = None) -> None:
+        """
+        Закрытие комнаты SocketIO.
+        """
+
+
+class FakeMessageConnection:
+    """
+    Канал пересылки сообщений, доставляющий их менеджерам комнат других процессов.
+    """
+
+    def __init__(self, workers: dict[str, GameRoomManager]) -> None:
+        self.workers = workers
+
+    async def publish(self, channel: str, message: str) -> None:
+        """
+        Доставка сообщения процессу канала.
+        """
+        await self.workers[channel.removeprefix("game_worker:")]._handle(from_json(message))
+
+
+def get_room_manager() -> GameRoomManager:
+    """
+    Менеджер комнат с сервером, запоминающим сообщения.
+    """
+    manager = GameRoomManager()
+    manager.bind(FakeSocketServer(), "/socket")
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_game_room_loop_broadcasts_and_removes_idle_room(monkeypatch):
+    """
+    Игровой цикл применяет действия и рассылает изменения, а опустевшая комната удаляется.
+    """
+    monkeypatch.setattr(settings, "game_tick_rate", 100)
+    monkeypatch.setattr(settings, "game_room_idle_timeout", 0.05)
+    monkeypatch.setitem(action_routes, "move", ActionRoute("move", lambda sid, data: asyncio.sleep(0, data)))
+    manager = get_room_manager()
+    room = await manager.create_room(GameMode.realtime, max_players=2)
+    room.add_player("a")
+    room.submit("a", "move", {"x": 1})
+
+    await asyncio.sleep(0.05)
+    assert ("delta", {"room_id": room.room_id, "tick": 1, "delta": {"players": {"a": {"x": 1}}}}, room.room_id) in (
+        manager.server.emitted
+    )
+
+    room.remove("a")
+    await asyncio.wait_for(room._task, 1)
+    assert manager.get_room(room.room_id) is None
+    assert not await manager.connection.exists(manager._room_key(room.room_id))
+
+
+@pytest.mark.asyncio
+async def test_game_room_manager_forwards_to_owner_worker():
+    """
+    Подключение и действия клиента другого процесса пересылаются процессу-владельцу комнаты,
+    а после удаления комнаты действия отбрасываются.
+    """
+    owner, worker = get_room_manager(), get_room_manager()
+    worker.message_connection = FakeMessageConnection({"owner": owner})
+    room = await owner.create_room(GameMode.realtime, max_players=2)
+    await owner.connection.hset(owner._room_key(room.room_id), "owner", "owner")
+    await owner.connection.setex(owner._worker_key("owner"), settings.game_worker_ttl, 1)
+    try:
+        await worker.join(room.room_id, "sid")
+        assert room.players == {"sid"}
+        assert owner.server.emitted[-1][0] == "keyframe"
+
+        assert await worker.submit("sid", "move", {"x": 1})
+        assert worker.forwarded_messages == 2
+        assert room.stats()["queue_depth"] == 1
+    finally:
+        await room.stop()
+        await owner.remove_room(room)
+
+    assert not await worker.submit("sid", "move", {"x": 2})
+    assert worker.get_sid_room("sid") is None
+    assert worker._owners == {}
+
+
+@pytest.mark.asyncio
+async def test_game_room_manager_removes_rooms_of_dead_worker():
+    """
+    Комната процесса, отметка которого истекла, удаляется из открытых комнат и больше не выдается игрокам.
+    """
+    manager = get_room_manager()
+    room = await manager.create_room(GameMode.realtime, max_players=2)
+    await room.stop()
+    del manager.rooms[room.room_id]
+    await manager.connection.hset(manager._room_key(room.room_id), "owner", "dead")
+    try:
+        room_id = await manager.find_or_create_room(GameMode.realtime)
+
+        assert room_id != room.room_id
+        assert not await manager.connection.exists(manager._room_key(room.room_id))
+        assert room.room_id not in await manager.connection.smembers(manager._open_rooms_key(GameMode.realtime))
+    finally:
+        await manager.stop_all()
+    assert not await manager.connection.exists(manager._worker_key(WORKER_ID))
+
+
+class InterleavingConnection:
+    """
+    Подключение, переключающее задачи перед каждой командой, как при обращении к редису по сети.
+    """
+
+    def __init__(self, connection: Any) -> None:
+        self.connection = connection
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Команда подключения, переключающая задачи перед выполнением.
+        """
+        method = getattr(self.connection, name)
+
+        async def call(*args, **kwargs) -> Any:
+            await asyncio.sleep(0)
+            return await method(*args, **kwargs)
+
+        return call
+
+
+@pytest.mark.asyncio
+async def test_game_room_manager_join_respects_capacity(monkeypatch):
+    """
+    Одновременные подключения не занимают больше мест, чем есть в комнате.
+    """
+    monkeypatch.setattr(socket_store, "connection", InterleavingConnection(socket_store.connection))
+    owner = get_room_manager()
+    room = await owner.create_room(GameMode.realtime, max_players=2)
+    try:
+        results = await asyncio.gather(
+            *(owner.join(room.room_id, f"sid-{index}") for index in range(4)), return_exceptions=True
+        )
+        assert await socket_store.count_players(room.room_id) == 2
+        assert len(room.players) == 2
+        assert sum(isinstance(result, exceptions.PythonError) for result in results) == 2
+
+        await owner.leave(next(iter(room.players)))
+        await owner.join(room.room_id, "sid-4")
+        assert len(room.players) == 2
+    finally:
+        await room.stop()
+        await owner.remove_room(room)
+
+
+def test_dungeon_floor_is_deterministic_per_seed():
+    """
+    Этаж зависит только от seed, глубины и сложности.
+    """
+    floor = generate_dungeon_floor(42, 3, 5)
+
+    assert np.array_equal(floor.tiles, generate_dungeon_floor(42, 3, 5).tiles)
+    assert floor.rooms == generate_dungeon_floor(42, 3, 5).rooms
+    assert not np.array_equal(floor.tiles, generate_dungeon_floor(43, 3, 5).tiles)
+    assert not floor.tiles.flags.writeable
+
+
+def test_dungeon_floor_exit_is_reachable():
+    """
+    Выход с этажа достижим от входа.
+    """
+    floor = generate_dungeon_floor(7, 10, 10)
+    assert floor.tiles[floor.entrance[1], floor.entrance[0]] == Tile.stairs_up
+    assert floor.tiles[floor.exit[1], floor.exit[0]] == Tile.stairs_down
+
+    visited = {floor.entrance}
+    queue = deque(visited)
+    while queue:
+        x, y = queue.popleft()
+        for cell in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if cell not in visited and floor.tiles[cell[1], cell[0]] != Tile.wall:
+                visited.add(cell)
+                queue.append(cell)
+
+    assert floor.exit in visited
+    assert all(room.center in visited for room in floor.rooms)
+
+
+def test_dungeon_floor_cache():
+    """
+    Повторный запрос этажа возвращается из кэша.
+    """
+    get_dungeon_floor.cache_clear()
+
+    assert get_dungeon_floor(1, 1, 1) is get_dungeon_floor(1, 1, 1)
+    assert get_dungeon_floor.cache_info().hits == 1
+    with pytest.raises(exceptions.PythonError):
+        get_dungeon_floor(1, 0, 1)
+
+
+def test_dungeon_floor_compares_by_parameters():
+    """
+    Этажи с одинаковыми параметрами равны и имеют одинаковый хэш, карта в сравнении не участвует.
+    """
+    floor = generate_dungeon_floor(1, 1, 1)
+
+    assert floor == generate_dungeon_floor(1, 1, 1)
+    assert floor != generate_dungeon_floor(2, 1, 1)
+    assert len({floor, generate_dungeon_floor(1, 1, 1)}) == 1